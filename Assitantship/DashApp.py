@@ -1,4 +1,8 @@
 # ================================= Imports =================================
+# For measuring the time from import to the first response
+import time
+startup_started = time.perf_counter()
+
 # For web application
 import dash
 # For further designing each tab
@@ -11,22 +15,71 @@ from dash.dash_table.Format import Group
 # Input and Output for callbacks
 from dash.dependencies import Input, Output, State
 
-# For ingesting logistic regression model
-import joblib
+# For reading settings from the environment
+import os
+# For the filter and sort of the export links
+import json
+from urllib.parse import urlencode
+# For starting the cleaning pipeline from the dashboard
+import sys
+
+# For the batch prediction route on the Flask server
+from flask import request, Response, jsonify
 
 # For handling data
 import pandas as pd
 import numpy as np
 
-# For interactive plotting
-import plotly.express as px
-
-# For statistical functions
-from scipy import stats
-# For One-way ANOVA test
-from scipy.stats import f_oneway
-# For Pearson correlation coefficient function
-from scipy.stats import pearsonr
+# For interactive plotting, loaded the first time a figure is drawn
+from lazy_imports import lazy_import
+px = lazy_import('plotly.express')
+
+# For caching results that only depend on their inputs (table pages, precomputed matrices)
+from functools import lru_cache
+
+# For the cohorts that can be picked, each with its frames and precomputed artifacts
+from cohort_registry import CohortRegistry, all_cohorts
+# For reporting the memory of the loaded frames
+from data_model import memory_report
+# For filtering, sorting and paging the Sample Data table on the server
+from table_query import filter_and_sort_positions, page_records, page_count
+# For streaming the filtered and sorted table as CSV or Parquet
+from table_export import export_chunks, export_formats
+# For running SQL queries over the cohort's frames
+from sql_engine import DEFAULT_ROWS, MAX_ROWS
+# For looking up the precomputed Pearson correlation matrix
+from correlation_engine import pair_correlation, pair_trendline, correlations_with
+# For the WebGL / downsampled scatter plot with its closed-form OLS line
+from scatter_rendering import scatter_figure, scatter_modes, zoom_ranges
+# For looking up the precomputed Cramer's V matrix
+from cramers_v_engine import cramers_v_row
+# For the confidence intervals shown as error bars
+from bootstrap_ci import CONFIDENCE_LEVEL
+# For scoring whole cohorts with the logistic regression pipeline
+from batch_prediction import (read_upload, read_json_students, stream_scored_csv, save_upload, load_upload,
+                              numerical_features)
+# For scoring a grid of what-if inputs with one call
+from sensitivity_grid import sweep_values, grid_probabilities
+# For the success rate drilldowns from the cohort's cube
+from aggregate_cube import cube_dimensions, dimension_values, slice_cube, has_gpa, MAX_CUBE_DIMENSIONS
+# For loading the logistic regression model lazily and picking up new versions
+from model_registry import ModelRegistry
+# For the variable that weights each county on the map
+from geo_aggregation import weight_columns, weight_column
+# For the correlation blocks of the cached one-hot encodings
+from onehot_engine import dummy_dummy_block, dummy_numeric_block, first_column_correlations, full_correlations
+# For sharing callback results between workers
+from callback_cache import ResultCache
+# For running the heavy statistics as background callbacks in separate processes
+from background_jobs import background_manager, run_limited
+# For timing every callback
+from callback_timing import CallbackTimer
+# For sending figures as partial updates with binary arrays, and compressing the responses
+from figure_payload import figure_update
+# For the admin routes: the token check, the allowed folders and one run of each job at a time
+from admin_jobs import SingleRunJob, authorized, path_inside, RETRAIN_JOBS, MAX_RETRAIN_FOLDS
+from clean_pipeline import SOURCE_DIR, OUTPUT_DIR
+from response_compression import compress_responses
 
 # ================================= Imports =================================
 
@@ -36,19 +89,22 @@ from scipy.stats import pearsonr
 
 # ================================= Read Excel File =================================
 file_path = '/Users/udoychowdhury/Documents/Assitantship/Conditionally Admitted Students Updated.xlsx'
-df = pd.read_excel(file_path)
 merge_file_path = '/Users/udoychowdhury/Documents/Assitantship/Full Conditionally Admitted Students.xlsx'
-mergedf = pd.read_excel(merge_file_path)
 
-# Replace NaN with NULL
-df.replace({pd.NA: 'NULL', pd.NaT: 'NULL'}, inplace=True)
+# Cohorts that can be picked: the two workbooks above (All Terms), the ones in cohorts.json and every term
+# cleaned by clean_pipeline.py
+    # The workbooks are parsed once, later starts memory-map the cached Arrow files
+    # Each cohort's matrices, county points and encodings are computed once and saved under cache/cohorts
+    # Only MAX_LOADED_COHORTS cohorts are kept in memory, the least recently used one is dropped
+    # The list is read again when cohorts.json or the cleaned terms change, so new cohorts show without a restart
+cohort_registry = CohortRegistry(lambda: all_cohorts(file_path, merge_file_path))
 
-# Create only Numeric and Object columns for later use
-numerical_columns = df.select_dtypes(include=['float64', 'int64']).columns
-object_columns = df.select_dtypes(include='object').columns
-object_df = df[object_columns]
-cat_cols = pd.DataFrame(mergedf[mergedf.select_dtypes(include=['object']).columns])
-num_cols = pd.DataFrame(mergedf[mergedf.select_dtypes(include = ['float', 'int']).columns])
+# Load the default cohort now so the first page can be built from it
+cohort_registry.get()
+
+# Results of the statistics callbacks, shared by every worker and kept per cohort version, so a changed cohort is
+# computed again while the results of the other cohorts stay
+result_cache = ResultCache(cohort_registry.cohort_version, version_arg='cohort_name')
 # ================================= Read Excel File =================================
 
 
@@ -93,8 +149,18 @@ label_style = {
     'fontWeight': 'bold'
 }
 
-# Load trained pipeline for logistic regression
-pipeline = joblib.load('/Users/udoychowdhury/Documents/DataScience/Assitantship/logistic_regression_pipeline.pkl')
+# Function to create the progress bar and cancel button shown while a heavy plot is computed
+def progress_bar(prefix):
+    return html.Div([
+        html.Progress(id=f'{prefix}-progress', style={'width': '80%'}),
+        html.Button('Cancel', id=f'{prefix}-cancel', n_clicks=0, style={'marginLeft': '10px'})
+    ], id=f'{prefix}-running', style={'display': 'none'})
+
+# Trained pipeline for logistic regression, loaded on the first prediction
+model_registry = ModelRegistry()
+# With gunicorn --preload set PRELOAD_MODEL=1 so the master loads it once and the workers share it
+if os.environ.get('PRELOAD_MODEL'):
+    model_registry.get()
 # ================================= Create The About Text For The App =================================
 
 
@@ -102,44 +168,37 @@ pipeline = joblib.load('/Users/udoychowdhury/Documents/DataScience/Assitantship/
 
 
 # ================================= Functions To Aid Later Graph Code =================================
-# Function to Calulcate Cramers V values for categorical variables
-def calculate_cramers_v(x, y):
-    # Create a contingency table
-    contingency_table = pd.crosstab(x, y)
-    
-    # Calculate the chi-squared test statistic, p-value, degrees of freedom, and expected frequencies
-    chi2, p, dof, expected = stats.chi2_contingency(contingency_table, correction=False)
-    
-    # Total number of observations
-    N = np.sum(contingency_table.values)
-    
-    # Calculate the minimum dimension minus one (for Cramer's V formula)
-    min_dim = min(contingency_table.shape) - 1
-    
-    # Actual Cramer's V calculation
-    result = np.sqrt((chi2 / N) / min_dim)
-    
-    return result
+# Function to correlate the dummies of two categorical columns, computed once per pair
+    # Keyed on the cohort version as well so a reloaded cohort is not mixed up with an older one
+@lru_cache(maxsize=1024)
+def dummy_block(cohort_name, version, col_a, col_b):
+    # The block the other way round is the same numbers transposed
+    if col_b < col_a:
+        return dummy_block(cohort_name, version, col_b, col_a).T
+    cohort = cohort_registry.get(cohort_name)
+    return dummy_dummy_block(cohort.encoding(col_a), cohort.encoding(col_b))
+
+# Function to correlate the dummies of a categorical column with a numeric column, computed once per pair
+@lru_cache(maxsize=1024)
+def numeric_block(cohort_name, version, col, numeric_col):
+    cohort = cohort_registry.get(cohort_name)
+    return dummy_numeric_block(cohort.encoding(col), cohort.mergedf[numeric_col])
+
+# Function to create the map of the East Coast, one weighted point per county
+@lru_cache(maxsize=64)
+def geo_figure(cohort_name, version, x_var):
+    counties = cohort_registry.get(cohort_name).counties()
+    weight = weight_column(counties, x_var)
+
+    # Create a heatmap of the students using the latitude and longitude coordinates of each county
+    fig = px.density_mapbox(counties, lat='HS_LAT', lon='HS_LONG', z=weight, radius=10,
+                            mapbox_style="carto-positron",
+                            title='Geography of Student High Schools',
+                            hover_data=['HS_STATE', 'HS_COUNTY', 'Count'])
 
-# Function to calculate Cramer's V values for all variables when y is picked
-def cramer_v_for_all_vars(df, y_var):
-    # Initialize results df, make y variable first
-    results = [{'Variable': y_var, 'Cramers_V': 1.0}]
-    
-    # Iterate over each column in the DataFrame
-    for col in df.columns:
-        # Skip the 'ID' column since it shows inaccurate result
-        if col != 'ID':
-            # Get the values of the current column and the target variable
-            x = df[col]
-            y = df[y_var]
-            
-            # Calculate the Cramer's V value for the current column and add it to the results
-            cramers_v_value = calculate_cramers_v(x, y)
-            results.append({'Variable': col, 'Cramers_V': cramers_v_value})
-    
-    # Create a DataFrame from results
-    return pd.DataFrame(results)
+    fig.update_layout(height=800)
+
+    return fig
 # ================================= Functions To Aid Later Graph Code =================================
 
 
@@ -148,7 +207,19 @@ def cramer_v_for_all_vars(df, y_var):
 
 # ================================= Initialize Dash App =================================
 # Bootstrap used to allow more display options
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+    # Heavy statistics run as background callbacks so they do not block the worker
+    # Tab contents are added after the page loads, so callbacks may refer to components not in the first layout
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP],
+                background_callback_manager=background_manager,
+                suppress_callback_exceptions=True)
+
+# Time every callback registered below (wall, CPU, serialize time and payload size)
+callback_timer = CallbackTimer()
+callback_timer.instrument(app)
+
+# Compress callback responses with brotli or gzip, and the scripts once each (registered after the timer so the
+# timer sees both sizes)
+compress_responses(app.server)
 # ================================= Initialize Dash App =================================
 
 
@@ -156,8 +227,404 @@ app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
 
 # ================================= Dashboard Layout =================================
+# The contents of each tab are built the first time the tab is opened (see render_tab), so the server can
+# answer before every tab exists
+    # Each tab builder gets the picked cohort and reads its columns from it
+
+# Function to build the About tab
+def about_tab(cohort):
+    return [
+        html.Div([
+
+            # Information about the dashboard
+            html.H3("About this App"),
+
+            # Style the contents
+            dcc.Markdown(about_text, style={'padding': '20px'})
+        ])
+    ]
+
+# Function to build the Sample Data tab
+def sample_data_tab(cohort):
+    return [
+
+        # Row for organizing components horizontally
+        dbc.Row([
+
+            # Column for displaying the DataTable
+            dbc.Col(html.Div([
+
+                # Display the sample data in a DataTable
+                    # Rows are sent one page at a time by update_sample_table instead of all at once
+                dash_table.DataTable(
+                    id='sample-data-table',
+
+                    # Define DataTable columns
+                    columns=[{"name": i, "id": i} for i in cohort.df.columns],
+
+                    # Start on the first page
+                    page_current=0,
+                    page_size=25,
+                    page_action='custom',
+
+                    # Enable filtering on the server
+                    filter_action='custom',
+                    filter_query='',
+
+                    # Enable sorting on the server
+                    sort_action='custom',
+                    sort_by=[]
+                ),
+
+                # Download every row that matches the filter, in the current sort order
+                html.Div([
+                    html.A('Download CSV', id='export-csv', href='/api/export?format=csv', download='',
+                           style={'marginRight': '20px'}),
+                    html.A('Download Parquet', id='export-parquet', href='/api/export?format=parquet', download='')
+                ], style={'padding': '10px'})
+                # Set column width (12 is full)
+            ]), width=12),
+        ]),
+    ]
+
+# Function to build the SQL Query tab
+def sql_tab(cohort):
+    return [
+
+        html.Div([
+            # Title for the tab content
+            html.H3("SQL Query"),
+            html.P(f"Query the cohort as the tables df and mergedf. Only SELECT queries run, quote column names "
+                   f"with spaces in double quotes. Columns of df: {', '.join(cohort.df.columns)}"),
+
+            # Query box with an example query
+            dcc.Textarea(
+                id='sql-query',
+                value=('SELECT HS_COUNTY, COUNT(*) AS students,\n'
+                       '       AVG(CASE WHEN Overall_GPA >= 3.0 THEN 1.0 ELSE 0.0 END) AS gpa_3_rate\n'
+                       'FROM mergedf\nGROUP BY HS_COUNTY\nORDER BY students DESC'),
+                style={'width': '100%', 'height': '150px', 'fontFamily': 'monospace'}
+            ),
+
+            # Most rows returned
+            dcc.Input(id='sql-row-limit', type='number', value=DEFAULT_ROWS, min=1, max=MAX_ROWS,
+                      style={'marginRight': '10px', 'borderRadius': '5px'}),
+            html.Button('Run Query', id='sql-run', n_clicks=0),
+
+            # Placeholder for the status or the error of the query
+            html.Div(id='sql-status', style={'marginTop': '10px'}),
+
+            # Result of the query, paged in the browser since it is at most MAX_ROWS rows
+            dash_table.DataTable(id='sql-results', page_size=25, sort_action='native',
+                                 style_table={'overflowX': 'auto'})
+        ], style={'padding': '20px'})
+    ]
+
+# Function to build the Pearson's Coefficient Correlation tab
+def pearson_tab(cohort):
+    return [
+
+        # Dropdowns and graphs for scatterplot for given x and y variable (numerical)
+        html.Div([
+
+            # Dropdown for x
+            dcc.Dropdown(
+                id='x-variable-dropdown-pearson',
+                options=[{'label': col, 'value': col} for col in cohort.numerical_columns],
+                placeholder='Select X Variable'
+            ),
+
+            # Dropdown for y
+            dcc.Dropdown(
+                id='y-variable-dropdown-pearson',
+                options=[{'label': col, 'value': col} for col in cohort.numerical_columns],
+                placeholder='Select Y Variable'
+            ),
+
+            # Dropdown for how the points are drawn (all points, downsampled or binned)
+            dcc.Dropdown(
+                id='scatter-mode-pearson',
+                options=scatter_modes,
+                value='auto',
+                clearable=False
+            ),
+
+            # Graph for displaying the XY scatter plot for pearson
+            progress_bar('xy-scatter'),
+            dcc.Graph(id='xy-scatter-plot-pearson'),
+            # Traces shown in the graph, so the next figure of the same kind is sent as a Patch
+            dcc.Store(id='xy-scatter-plot-pearson-shape')
+        ]),
+
+        # Dropdowns and graphs for given y variable against all other variables (numerical)
+        html.Div([
+
+            # Dropdown for target variable (y)
+            dcc.Dropdown(
+                id='y-variable-dropdown-pearson-all',
+                options=[{'label': col, 'value': col} for col in cohort.numerical_columns],
+                placeholder='Select Y Variable'
+            ),
+
+            # Graph for displaying the correlation scatter plot for pearson
+            progress_bar('pearson-all'),
+            dcc.Graph(id='correlation-scatter-plot-pearson-all'),
+            # Traces shown in the graph, so the next figure of the same kind is sent as a Patch
+            dcc.Store(id='correlation-scatter-plot-pearson-all-shape')
+        ]),
+    ]
+
+# Function to build the Cramer's V tab
+def cramers_v_tab(cohort):
+    return [
+
+        # Dropdown for target variable (y)
+        dcc.Dropdown(
+            id='y-variable-dropdown-cramers-v',
+
+            # Do not use ID column because it shows incorrect value as each value is unique
+            options=[{'label': i, 'value': i} for i in cohort.object_columns if i != 'ID'],
+            placeholder='Select Y Variable'
+        ),
+
+        # Graph for displaying the correlation scatter plot for Cramers V
+        progress_bar('cramers-v'),
+        dcc.Graph(id='correlation-scatter-plot-cramers-v'),
+        # Traces shown in the graph, so the next figure of the same kind is sent as a Patch
+        dcc.Store(id='correlation-scatter-plot-cramers-v-shape')
+    ]
+
+# Function to build the Geographical Visualization tab
+def geo_tab(cohort):
+    return [
+
+        # Row for organizing components horizontally
+        dbc.Row([
+
+            # Column for displaying map
+            dbc.Col([
+
+                # Dropdown for the variable that weights each county (number of students if empty)
+                dcc.Dropdown(
+                    id='variable-selector-geo', 
+                    options=[{'label': col, 'value': col} for col in weight_columns(cohort.df)],
+                    placeholder="Weight by number of students"
+                ),
+
+                # Graph the east coast map
+                dcc.Graph(id='eastcoast-plot-geo'),
+                # Traces shown in the graph, so the next figure of the same kind is sent as a Patch
+                dcc.Store(id='eastcoast-plot-geo-shape')
+            ], width=12),
+        ]),
+    ]
+
+# Function to build the One-Hot Encoding tab
+def one_hot_tab(cohort):
+    return [
+
+        html.Div([
+            # Multi-value dropdown for selecting columns to encode
+            dcc.Dropdown(
+                id='variable-selector-encoded-columns',
+                options=[{'label': col, 'value': col} for col in cohort.merge_categorical_columns],
+                multi=True,  # Allow multiple selections
+                placeholder="Select categorical columns to encode",
+            ),
+            dcc.Dropdown(
+                id='numerical-variable-selector-encoded-columns',
+                options=[{'label': col, 'value': col} for col in cohort.merge_numerical_columns],
+                placeholder="Select a numeric column"
+            ),
+            dcc.Dropdown(
+                id='display-option-encoded-columns',
+                options=[
+                    {'label': 'Full View', 'value': 'full'},
+                    {'label': 'First Column Only', 'value': 'first_col'}
+                ],
+                placeholder="Select view mode"
+            ),
+
+            # Placeholder for the heatmap
+            progress_bar('heatmap'),
+            dcc.Graph(id='heatmap-encoded-columns'),
+            # Traces shown in the graph, so the next figure of the same kind is sent as a Patch
+            dcc.Store(id='heatmap-encoded-columns-shape')
+        ], style={'padding': '20px'}),  # Adjust overall padding as needed
+    ]
+
+# Function to build the Success Drilldown tab
+def drilldown_tab(cohort):
+    cube = cohort.cube()
+    values = dimension_values(cube)
+    # Cohorts without GPAs are shown as student counts
+    measure = ("Share of students with a GPA of 3.0 or higher." if has_gpa(cube)
+               else "This cohort has no Overall_GPA column, so the students are counted instead.")
+    return [
+
+        html.Div([
+            # Title for the tab content
+            html.H3("Success Rate Drilldown"),
+            html.P(f"{measure} Group by and filter on up to "
+                   f"{MAX_CUBE_DIMENSIONS} categories at once, remove a category to roll it up."),
+
+            # Categories the students are grouped by
+            html.Label('Group by', style=label_style),
+            dcc.Dropdown(
+                id='cube-group-by',
+                options=[{'label': col, 'value': col} for col in values],
+                value=list(values)[:1],
+                multi=True,
+                style={'marginBottom': '10px', 'borderRadius': '5px'},
+            ),
+
+            # One filter per category
+            html.Label('Filter', style=label_style),
+            dbc.Row([
+                dbc.Col(dcc.Dropdown(
+                    id=f'cube-filter-{col}',
+                    options=[{'label': value, 'value': value} for value in values.get(col, [])],
+                    placeholder=f"All {col}",
+                    style={'marginBottom': '10px', 'borderRadius': '5px'},
+                ), width=3)
+                for col in cube_dimensions
+            ]),
+
+            # Placeholder for an error message
+            html.Div(id='cube-status'),
+            dcc.Graph(id='cube-plot'),
+            # Traces shown in the graph, so the next figure of the same kind is sent as a Patch
+            dcc.Store(id='cube-plot-shape'),
+
+            # Count, GPA mean and variance, and success rate of every group
+            dash_table.DataTable(id='cube-table', page_size=25, sort_action='native',
+                                 style_table={'overflowX': 'auto'})
+        ], style={'padding': '20px'})
+    ]
+
+# Function to build the Predicting Student Success tab
+def prediction_tab(cohort):
+    return [
+
+        html.Div([
+            # Title for the tab content
+            html.H1("Student GPA Prediction"),
+
+            # Widgets for numerical values
+            dcc.Input(id='total_credit_hours', type='number', placeholder='Total Credit Hours',style={'marginBottom': '10px', 'borderRadius': '5px'}),
+            dcc.Input(id='inst_hours_earned', type='number', placeholder='Institution Hours Earned',style={'marginBottom': '10px', 'borderRadius': '5px'}),
+            dcc.Input(id='overall_hours_attempted', type='number', placeholder='Overall Hours Attempted',style={'marginBottom': '10px', 'borderRadius': '5px'}),
+            dcc.Input(id='overall_hours_earned', type='number', placeholder='Overall Hours Earned',style={'marginBottom': '10px', 'borderRadius': '5px'}),
+            dcc.Input(id='age', type='number', placeholder='Age',style={'marginBottom': '10px', 'borderRadius': '5px'}),
+            dcc.Input(id='sat_math', type='number', placeholder='SAT Math Score',style={'marginBottom': '10px', 'borderRadius': '5px'}),
+            dcc.Input(id='act_composite', type='number', placeholder='ACT Composite Score',style={'marginBottom': '10px', 'borderRadius': '5px'}),
+            dcc.Input(id='total_credits_enrolled', type='number', placeholder='Total Credits Enrolled',style={'marginBottom': '10px', 'borderRadius': '5px'}),
+
+            # Widgets for categorical values
+            dcc.Dropdown(
+                id='ethnicity',
+                options=[{'label': label, 'value': label} for label in [
+                    'Hispanic or Latino', 'Caucasian or White', 'Black or African American',
+                    'Asian', 'More Than 1 Race', 'Non Resident Alien',
+                    'Hawaiian or Pacific Islander', 'Unknown or Not Specified'
+                ]],
+                placeholder="Select Ethnicity",
+                style={'marginBottom': '10px', 'borderRadius': '5px'},
+            ),
+            dcc.Dropdown(
+                id='major_x',
+                options=[{'label': label, 'value': label} for label in [
+                    'BIOL', 'HLSC', 'ENSC', 'PHYS', 'ENVL', 'MARS', 'CSCI', 'EXSC', 'MATH', 'SSTB',
+                    'BCMB', 'BSNS', 'ARTS', 'HIST', 'CHEM', 'CRIM', 'SOWK', 'COMM', 'LIBA', 'ARTV'
+                ]],
+                placeholder="Select Major",
+                style={'marginBottom': '10px', 'borderRadius': '5px'},
+            ),
+            dcc.Dropdown(
+                id='instructional_method',
+                options=[{'label': label, 'value': label} for label in [
+                    'LEC', 'ONL', 'TUT', 'SEM', 'IND', 'LAB', 'L/L', 'DEHYB', 'STU'
+                ]],
+                placeholder="Select Instructional Method",
+                style={'marginBottom': '10px', 'borderRadius': '5px'},
+            ),
+            dcc.Dropdown(
+                id='math_readiness_ind',
+                options=[{'label': label, 'value': label} for label in ['Y', 'N']],
+                placeholder="Select Math Readiness",
+                style={'marginBottom': '10px', 'borderRadius': '5px'},
+            ),
+            dcc.Dropdown(
+                id='first_gen_ind',
+                options=[{'label': label, 'value': label} for label in [
+                    'Null', 'FGNY: High School diploma or GED', 'FGNN: Graduate school',
+                    'FGNN: Graduated from college: Bachelors degree',
+                    'FGNY: Some trade school or community college', 'FGNY: Some college',
+                    'FGNY: Graduated from community college: Asso. degree',
+                    'FGNY: Did not finish High School', 'FGNY: Some grade school',
+                    'FGNY: Completed grade school'
+                ]],
+                placeholder="Select First Generation Indicator",
+                style={'marginBottom': '10px', 'borderRadius': '5px'},
+            ),
+
+            # Submit button Widget
+            html.Button('Submit', id='submit-val', n_clicks=0),
+
+            # Placeholder for output
+            html.Div(id='container-button-basic'),
+
+            # Sweep one or two features over their range for the student entered above
+            html.H3("What-If Sensitivity", style={'marginTop': '20px'}),
+            dcc.Dropdown(
+                id='sensitivity-x',
+                options=[{'label': col, 'value': col} for col in numerical_features],
+                placeholder="Select a feature to sweep",
+                style={'marginBottom': '10px', 'borderRadius': '5px'},
+            ),
+            dcc.Dropdown(
+                id='sensitivity-y',
+                options=[{'label': col, 'value': col} for col in numerical_features],
+                placeholder="Select a second feature (optional)",
+                style={'marginBottom': '10px', 'borderRadius': '5px'},
+            ),
+            html.Button('Run Sensitivity', id='sensitivity-run', n_clicks=0),
+            dcc.Graph(id='sensitivity-plot'),
+            # Traces shown in the graph, so the next figure of the same kind is sent as a Patch
+            dcc.Store(id='sensitivity-plot-shape'),
+
+            # Score a whole cohort at once from a CSV or Excel file
+            html.H3("Batch Prediction", style={'marginTop': '20px'}),
+            dcc.Upload(
+                id='batch-upload',
+                children=html.Div(['Drag and drop or ', html.A('select a CSV or Excel file')]),
+                style={'width': '100%', 'height': '60px', 'lineHeight': '60px', 'borderWidth': '1px',
+                       'borderStyle': 'dashed', 'borderRadius': '5px', 'textAlign': 'center'},
+                multiple=False
+            ),
+
+            # Placeholder for the batch status and the link to the scored file
+            html.Div(id='batch-status')
+            ])
+    ]
+
+# Tabs whose contents are built when first opened, by tab_id
+lazy_tabs = {
+    'about': about_tab,
+    'sample-data': sample_data_tab,
+    'sql': sql_tab,
+    'pearson': pearson_tab,
+    'cramers-v': cramers_v_tab,
+    'geo': geo_tab,
+    'one-hot': one_hot_tab,
+    'drilldown': drilldown_tab,
+    'prediction': prediction_tab
+}
+
 # Set up the layout of the dashboard using Bootstrap containers and tabs
 app.layout = dbc.Container([
+    # Address of the page, ?perf=1 shows the Performance tab
+    dcc.Location(id='url'),
     # Image at the top of dashboard
     html.Img(src='/assets/official-stockton-logo.png', 
              style={'width': '55%', 'height': '100px', 'position': 'relative',  'display': 'block', 'margin': 'auto'}),
@@ -191,241 +658,69 @@ app.layout = dbc.Container([
             'zIndex': -1}
     ),
 
-    # Tabs for different sections of the dashboard
-    dbc.Tabs([
-        # Tab for About section
-        dbc.Tab(label="About", children=[
-            html.Div([
+    # Cohort shown in every tab, picking another one rebuilds the tabs from its data
+    html.Div([
+        html.Label('Cohort', style=label_style),
+        dcc.Dropdown(
+            id='cohort-selector',
+            options=[{'label': name, 'value': name} for name in cohort_registry.names()],
+            value=cohort_registry.default,
+            clearable=False
+        )
+    ], style={**tab_style, 'padding': '10px', 'marginTop': '10px'}),
 
-                # Information about the dashboard
-                html.H3("About this App"),
+    # Tabs already built, so opening them again does not build them again
+    dcc.Store(id='built-tabs', data=[]),
 
-                # Style the contents
-                dcc.Markdown(about_text, style={'padding': '20px'})
-            ])
-        ], 
-        style=tab_style,
-        label_style= label_style),
+    # Tabs for different sections of the dashboard
+    dbc.Tabs(id='tabs', active_tab='about', children=[
+        # Tab for About section
+        dbc.Tab(label="About", tab_id='about', children=html.Div(id='about-content'),
+                style=tab_style, label_style=label_style),
 
         # Tab for Sample Data
-        dbc.Tab(label="Sample Data", children=[
-
-            # Row for organizing components horizontally
-            dbc.Row([
+        dbc.Tab(label="Sample Data", tab_id='sample-data', children=html.Div(id='sample-data-content'),
+                style=tab_style, label_style=label_style),
 
-                # Column for displaying the DataTable
-                dbc.Col(html.Div([
-
-                    # Display the sample data in a DataTable
-                    dash_table.DataTable(
-
-                        # Convert df to dict
-                        df.to_dict('records'), 
-
-                        # Define DataTable columns
-                        [{"name": i, "id": i} for i in df.columns],
-
-                        # Enable filtering
-                        filter_action='native', 
-
-                        # Enable sorting
-                        sort_action='native',
-                        page_size=25 
-                    )
-                    # Set column width (12 is full)
-                ]), width=12),
-            ]),
-        ], 
-        style=tab_style,
-        label_style= label_style),
+        # Tab for SQL queries over the cohort
+        dbc.Tab(label="SQL Query", tab_id='sql', children=html.Div(id='sql-content'),
+                style=tab_style, label_style=label_style),
 
         # Tab for Pearson's Coefficient Correlation
-        dbc.Tab(label='Pearson\'s Coefficient Correlation', children=[
-
-            # Dropdowns and graphs for scatterplot for given x and y variable (numerical)
-            html.Div([
-
-                # Dropdown for x
-                dcc.Dropdown(
-                    id='x-variable-dropdown-pearson',
-                    options=[{'label': col, 'value': col} for col in numerical_columns],
-                    placeholder='Select X Variable'
-                ),
-
-                # Dropdown for y
-                dcc.Dropdown(
-                    id='y-variable-dropdown-pearson',
-                    options=[{'label': col, 'value': col} for col in numerical_columns],
-                    placeholder='Select Y Variable'
-                ),
-
-                # Graph for displaying the XY scatter plot for pearson
-                dcc.Graph(id='xy-scatter-plot-pearson')
-            ]),
-
-            # Dropdowns and graphs for given y variable against all other variables (numerical)
-            html.Div([
-
-                # Dropdown for target variable (y)
-                dcc.Dropdown(
-                    id='y-variable-dropdown-pearson-all',
-                    options=[{'label': col, 'value': col} for col in numerical_columns],
-                    placeholder='Select Y Variable'
-                ),
-
-                # Graph for displaying the correlation scatter plot for pearson
-                dcc.Graph(id='correlation-scatter-plot-pearson-all')
-            ]),
-        ],
-        style=tab_style,
-        label_style= label_style),
+        dbc.Tab(label='Pearson\'s Coefficient Correlation', tab_id='pearson', children=html.Div(id='pearson-content'),
+                style=tab_style, label_style=label_style),
 
         # Tab for Cramer's V Calculation
-        dbc.Tab(label='Cramers V Calculation', children=[
-
-            # Dropdown for target variable (y)
-            dcc.Dropdown(
-                id='y-variable-dropdown-cramers-v',
-
-                # Do not use ID column because it shows incorrect value as each value is unique
-                options=[{'label': i, 'value': i} for i in df.columns if df[i].dtype == 'object' and i != 'ID'],
-                placeholder='Select Y Variable'
-            ),
-
-            # Graph for displaying the correlation scatter plot for Cramers V
-            dcc.Graph(id='correlation-scatter-plot-cramers-v')
-        ],
-        style=tab_style,
-        label_style= label_style),
+        dbc.Tab(label='Cramers V Calculation', tab_id='cramers-v', children=html.Div(id='cramers-v-content'),
+                style=tab_style, label_style=label_style),
 
         # Tab for Geographical Visualization
-        dbc.Tab(label="Geographical Visualization", children=[
-
-            # Row for organizing components horizontally
-            dbc.Row([
-
-                # Column for displaying map
-                dbc.Col([
-
-                    # Dropdown for list of variables 
-                        # Tried this but it doesnt do anything work but taking it out also messes with it so I just left it
-                    dcc.Dropdown(
-                        id='variable-selector-geo', 
-                        options=[{'label': col, 'value': col} for col in df.columns],
-                        placeholder="List of variables"
-                    ),
-
-                    # Graph the east coast map
-                    dcc.Graph(id='eastcoast-plot-geo')
-                ], width=12),
-            ]),
-        ], 
-        style=tab_style,
-        label_style= label_style),
+        dbc.Tab(label="Geographical Visualization", tab_id='geo', children=html.Div(id='geo-content'),
+                style=tab_style, label_style=label_style),
 
         # Tab for One-Hot Encoding and Heatmap
-        dbc.Tab(label='One-Hot Encoding Visualization', children=[
+        dbc.Tab(label='One-Hot Encoding Visualization', tab_id='one-hot', children=html.Div(id='one-hot-content'),
+                style=tab_style, label_style=label_style),
 
-            html.Div([
-                # Multi-value dropdown for selecting columns to encode
-                dcc.Dropdown(
-                    id='variable-selector-encoded-columns',
-                    options=[{'label': col, 'value': col} for col in cat_cols.columns],
-                    multi=True,  # Allow multiple selections
-                    placeholder="Select categorical columns to encode",
-                ),
-                dcc.Dropdown(
-                    id='numerical-variable-selector-encoded-columns',
-                    options=[{'label': col, 'value': col} for col in num_cols.columns],
-                    placeholder="Select a numeric column"
-                ),
-                dcc.Dropdown(
-                    id='display-option-encoded-columns',
-                    options=[
-                        {'label': 'Full View', 'value': 'full'},
-                        {'label': 'First Column Only', 'value': 'first_col'}
-                    ],
-                    placeholder="Select view mode"
-                ),
-
-                # Placeholder for the heatmap
-                dcc.Graph(id='heatmap-encoded-columns')
-            ], style={'padding': '20px'}),  # Adjust overall padding as needed
-
-        ], style=tab_style, label_style=label_style),
+        # Tab for the success rate drilldowns
+        dbc.Tab(label='Success Drilldown', tab_id='drilldown', children=html.Div(id='drilldown-content'),
+                style=tab_style, label_style=label_style),
 
         # Tab for Predicting Student Success
-        dbc.Tab(label='Predicting Student Success', children=[
+        dbc.Tab(label='Predicting Student Success', tab_id='prediction', children=html.Div(id='prediction-content'),
+                style=tab_style, label_style=label_style),
 
+        # Hidden tab with the latency of every callback, shown with ?perf=1
+        dbc.Tab(label="Performance", id='performance-tab', tab_id='performance', children=[
             html.Div([
-                # Title for the tab content
-                html.H1("Student GPA Prediction"),
-
-                # Widgets for numerical values
-                dcc.Input(id='total_credit_hours', type='number', placeholder='Total Credit Hours',style={'marginBottom': '10px', 'borderRadius': '5px'}),
-                dcc.Input(id='inst_hours_earned', type='number', placeholder='Institution Hours Earned',style={'marginBottom': '10px', 'borderRadius': '5px'}),
-                dcc.Input(id='overall_hours_attempted', type='number', placeholder='Overall Hours Attempted',style={'marginBottom': '10px', 'borderRadius': '5px'}),
-                dcc.Input(id='overall_hours_earned', type='number', placeholder='Overall Hours Earned',style={'marginBottom': '10px', 'borderRadius': '5px'}),
-                dcc.Input(id='age', type='number', placeholder='Age',style={'marginBottom': '10px', 'borderRadius': '5px'}),
-                dcc.Input(id='sat_math', type='number', placeholder='SAT Math Score',style={'marginBottom': '10px', 'borderRadius': '5px'}),
-                dcc.Input(id='act_composite', type='number', placeholder='ACT Composite Score',style={'marginBottom': '10px', 'borderRadius': '5px'}),
-                dcc.Input(id='total_credits_enrolled', type='number', placeholder='Total Credits Enrolled',style={'marginBottom': '10px', 'borderRadius': '5px'}),
-
-                # Widgets for categorical values
-                dcc.Dropdown(
-                    id='ethnicity',
-                    options=[{'label': label, 'value': label} for label in [
-                        'Hispanic or Latino', 'Caucasian or White', 'Black or African American',
-                        'Asian', 'More Than 1 Race', 'Non Resident Alien',
-                        'Hawaiian or Pacific Islander', 'Unknown or Not Specified'
-                    ]],
-                    placeholder="Select Ethnicity",
-                    style={'marginBottom': '10px', 'borderRadius': '5px'},
-                ),
-                dcc.Dropdown(
-                    id='major_x',
-                    options=[{'label': label, 'value': label} for label in [
-                        'BIOL', 'HLSC', 'ENSC', 'PHYS', 'ENVL', 'MARS', 'CSCI', 'EXSC', 'MATH', 'SSTB',
-                        'BCMB', 'BSNS', 'ARTS', 'HIST', 'CHEM', 'CRIM', 'SOWK', 'COMM', 'LIBA', 'ARTV'
-                    ]],
-                    placeholder="Select Major",
-                    style={'marginBottom': '10px', 'borderRadius': '5px'},
-                ),
-                dcc.Dropdown(
-                    id='instructional_method',
-                    options=[{'label': label, 'value': label} for label in [
-                        'LEC', 'ONL', 'TUT', 'SEM', 'IND', 'LAB', 'L/L', 'DEHYB', 'STU'
-                    ]],
-                    placeholder="Select Instructional Method",
-                    style={'marginBottom': '10px', 'borderRadius': '5px'},
-                ),
-                dcc.Dropdown(
-                    id='math_readiness_ind',
-                    options=[{'label': label, 'value': label} for label in ['Y', 'N']],
-                    placeholder="Select Math Readiness",
-                    style={'marginBottom': '10px', 'borderRadius': '5px'},
-                ),
-                dcc.Dropdown(
-                    id='first_gen_ind',
-                    options=[{'label': label, 'value': label} for label in [
-                        'Null', 'FGNY: High School diploma or GED', 'FGNN: Graduate school',
-                        'FGNN: Graduated from college: Bachelors degree',
-                        'FGNY: Some trade school or community college', 'FGNY: Some college',
-                        'FGNY: Graduated from community college: Asso. degree',
-                        'FGNY: Did not finish High School', 'FGNY: Some grade school',
-                        'FGNY: Completed grade school'
-                    ]],
-                    placeholder="Select First Generation Indicator",
-                    style={'marginBottom': '10px', 'borderRadius': '5px'},
-                ),
-
-                # Submit button Widget
-                html.Button('Submit', id='submit-val', n_clicks=0),
-
-                # Placeholder for output
-                html.Div(id='container-button-basic')
-                ])
-        ], style=tab_style, label_style=label_style),
+                html.H3("Callback Latency"),
+                html.P("Percentiles of the last calls of each callback. Start the server with PROFILE_CALLBACKS=1 "
+                       "to save a cProfile of every callback, listed at /debug/profiles (needs the admin token)."),
+                dash_table.DataTable(id='performance-table', sort_action='native'),
+                # Refresh the table every 5 seconds while the tab is shown
+                dcc.Interval(id='performance-interval', interval=5000, disabled=True)
+            ], style={'padding': '20px'})
+        ], style=tab_style, label_style=label_style, tab_style={'display': 'none'}),
 
         # Styling the tabs
     ], style={'padding': '20px', 'backgroundColor': 'transparent', 'border': 'none'}) 
@@ -437,82 +732,242 @@ app.layout = dbc.Container([
 
 
 # ================================= Call Backs And Functions =================================
-# Pearson's Correlation Coefficient
-# Callback to update x and y scatter plot
+# Cohorts
+# Callback to list the cohorts again when the page is opened, so cohorts added since the start can be picked
+@app.callback(
+    Output('cohort-selector', 'options'),
+    [Input('url', 'pathname')]
+)
+
+def update_cohort_options(pathname):
+    return [{'label': name, 'value': name} for name in cohort_registry.names()]
+
+# Tabs
+# Callback to build a tab's contents the first time it is opened, or again for another cohort
 @app.callback(
-    Output('xy-scatter-plot-pearson', 'figure'),
-    [Input('x-variable-dropdown-pearson', 'value'), Input('y-variable-dropdown-pearson', 'value')]
+    [Output(f'{key}-content', 'children') for key in lazy_tabs] + [Output('built-tabs', 'data')],
+    [Input('tabs', 'active_tab'), Input('cohort-selector', 'value')],
+    [State('built-tabs', 'data')]
 )
 
-def update_xy_scatter(x_var, y_var):
+def render_tab(active_tab, cohort_name, built_tabs):
+    # A new cohort may have other columns, so every tab is built again when it is next opened
+    built_tabs = [] if dash.ctx.triggered_id == 'cohort-selector' else built_tabs or []
+    # Already built (or the Performance tab, which is always there), leave every tab as it is
+    if active_tab not in lazy_tabs or active_tab in built_tabs:
+        return [dash.no_update] * len(lazy_tabs) + [built_tabs]
+
+    cohort = cohort_registry.get(cohort_name)
+    contents = [lazy_tabs[key](cohort) if key == active_tab else dash.no_update for key in lazy_tabs]
+    return contents + [built_tabs + [active_tab]]
+
+# Sample Data
+# Function to get the row positions for a filter and sort, cached so changing pages does not filter again
+@lru_cache(maxsize=32)
+def sample_table_positions(cohort_name, version, filter_query, sort_by):
+    df = cohort_registry.get(cohort_name).df
+    return filter_and_sort_positions(df, filter_query, [dict(sort) for sort in sort_by])
+
+# Callback to send only the requested page of the sample data
+@app.callback(
+    [Output('sample-data-table', 'data'), Output('sample-data-table', 'page_count')],
+    [Input('sample-data-table', 'page_current'),
+     Input('sample-data-table', 'page_size'),
+     Input('sample-data-table', 'sort_by'),
+     Input('sample-data-table', 'filter_query')],
+    [State('cohort-selector', 'value')]
+)
+
+def update_sample_table(page_current, page_size, sort_by, filter_query, cohort_name=None):
+    cohort = cohort_registry.get(cohort_name)
+    # Make sort_by hashable so it can be used as a cache key
+    sort_by = tuple(tuple(sorted(sort.items())) for sort in sort_by or [])
+    positions = sample_table_positions(cohort.name, cohort.version, filter_query or '', sort_by)
+
+    return page_records(cohort.df, positions, page_current or 0, page_size), page_count(positions, page_size)
+
+# Callback to point the download links at the current cohort, filter and sort
+@app.callback(
+    [Output('export-csv', 'href'), Output('export-parquet', 'href')],
+    [Input('sample-data-table', 'sort_by'),
+     Input('sample-data-table', 'filter_query')],
+    [State('cohort-selector', 'value')]
+)
+
+def update_export_links(sort_by, filter_query, cohort_name):
+    query = {'cohort': cohort_name or '', 'filter': filter_query or '', 'sort': json.dumps(sort_by or [])}
+    return [f'/api/export?{urlencode({**query, "format": export_format})}' for export_format in export_formats]
+
+# Route to stream the rows of the Sample Data table that match a filter, as CSV or Parquet
+    # e.g. curl -o cohort.parquet 'http://localhost:8050/api/export?format=parquet&filter={AGE} s> 20'
+    # The rows are written and sent in chunks, so the whole file is never held in memory
+@app.server.route('/api/export')
+def export_route():
+    export_format = request.args.get('format', 'csv')
+    try:
+        sort_by = json.loads(request.args.get('sort') or '[]')
+    except ValueError:
+        return jsonify({'error': 'sort must be a JSON list like [{"column_id": "AGE", "direction": "asc"}]'}), 400
+    if export_format not in export_formats:
+        return jsonify({'error': f"Export as one of: {', '.join(export_formats)}"}), 400
+
+    cohort = cohort_registry.get(request.args.get('cohort'))
+    # Same rows and order as the table shows (cached, so a filter that was just shown is not run again)
+    sort_by = tuple(tuple(sorted(sort.items())) for sort in sort_by)
+    positions = sample_table_positions(cohort.name, cohort.version, request.args.get('filter', ''), sort_by)
+
+    filename = f"{cohort.name.replace(' ', '_')}_sample_data.{export_format}"
+    return Response(export_chunks(cohort.df, positions, export_format), mimetype=export_formats[export_format],
+                    headers={'Content-Disposition': f'attachment; filename={filename}',
+                             'X-Row-Count': str(len(positions))})
+
+# SQL Query
+# Function to run a query over the cohort, the result is cached per query, row limit and cohort version
+@result_cache.memoize
+def run_sql_query(sql, limit, cohort_name=None):
+    cohort = cohort_registry.get(cohort_name)
+    result, truncated, seconds = cohort.sql_engine().query(sql, limit)
+    return {'columns': [{'name': col, 'id': col} for col in result.columns],
+            'records': result.to_dict('records'),
+            'truncated': truncated,
+            'seconds': seconds,
+            'engine': cohort.sql.engine}
+
+# Callback to run the query and show its result
+@app.callback(
+    [Output('sql-results', 'columns'), Output('sql-results', 'data'), Output('sql-status', 'children')],
+    Input('sql-run', 'n_clicks'),
+    [State('sql-query', 'value'), State('sql-row-limit', 'value'), State('cohort-selector', 'value')],
+    prevent_initial_call=True
+)
+
+def update_sql_results(n_clicks, sql, limit, cohort_name):
+    try:
+        result = run_sql_query(sql, limit, cohort_name)
+    except ValueError as error:
+        return [], [], dbc.Alert(str(error), color="danger", dismissable=True)
+
+    # Tell when more rows matched than the limit
+    rows = len(result['records'])
+    message = f"{rows} rows in {result['seconds'] * 1000:.1f} ms ({result['engine']})"
+    if result['truncated']:
+        message += f', more rows matched, raise the limit (up to {MAX_ROWS}) to see them'
+    return result['columns'], result['records'], dbc.Alert(message, color="secondary")
+
+# Pearson's Correlation Coefficient
+# Function to create the x and y scatter plot with its OLS line
+@result_cache.memoize
+def update_xy_scatter(x_var, y_var, mode='auto', x_range=None, y_range=None, cohort_name=None):
     if x_var and y_var:
-        # Calculate Pearson correlation coefficient
-        corr, _ = pearsonr(df[x_var], df[y_var])  
-
-        # Create scatter plot with user input variables
-        fig = px.scatter(df, x=x_var, y=y_var, title=f'{x_var} vs {y_var} (Correlation: {corr:.2f})',
-                         # Add OLS line
-                         trendline="ols")
-
-        # Update scatter points to black and OLS line to red
-        fig.update_traces(marker=dict(color='black'), selector=dict(mode='markers'))
-        fig.update_traces(line=dict(color='red'), selector=dict(type='scatter', mode='lines'),
-                          # Configure the hover option to not show anything only show coordinates
-                            # Extra removes additional information since there was excess information before
-                          hovertemplate='(%{x}, %{y:.2f})<extra></extra>')
-        return fig
+        cohort = cohort_registry.get(cohort_name)
+        # Look up Pearson correlation coefficient and the OLS line in the cohort's precomputed matrix
+        matrix = cohort.pearson()
+        corr, _ = pair_correlation(matrix, x_var, y_var)
+        slope, intercept = pair_trendline(matrix, x_var, y_var)
+        # Not defined when one of the variables is constant
+        corr_text = 'n/a' if np.isnan(corr) else f'{corr:.2f}'
+
+        # Create scatter plot with user input variables, large cohorts are downsampled and drawn with WebGL
+        return scatter_figure(cohort.df, x_var, y_var, f'{x_var} vs {y_var} (Correlation: {corr_text})',
+                              slope, intercept, mode or 'auto', x_range, y_range)
     
     return px.scatter()
 
-# Callback to update Pearson's correlation coefficient scatter plot for all variables
+# Callback to update x and y scatter plot, the OLS fit runs in the background
 @app.callback(
-    Output('correlation-scatter-plot-pearson-all', 'figure'),
-    [Input('y-variable-dropdown-pearson-all', 'value')]
+    [Output('xy-scatter-plot-pearson', 'figure'), Output('xy-scatter-plot-pearson-shape', 'data')],
+    [Input('x-variable-dropdown-pearson', 'value'), Input('y-variable-dropdown-pearson', 'value'),
+     Input('scatter-mode-pearson', 'value')],
+    [State('xy-scatter-plot-pearson-shape', 'data'), State('cohort-selector', 'value')],
+    background=True,
+    running=[(Output('xy-scatter-running', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('xy-scatter-progress', 'value'), Output('xy-scatter-progress', 'max')],
+    # Changing a dropdown again also cancels the running job
+    cancel=[Input('xy-scatter-cancel', 'n_clicks')]
 )
 
-# Function for Pearson's correlation coefficient scatter plot for all variables
-def update_correlation_plot(y_var):
-    if y_var:
+def xy_scatter_background(set_progress, x_var, y_var, mode, previous_shape, cohort_name):
+    figure = run_limited(set_progress, update_xy_scatter, x_var, y_var, mode, None, None, cohort_name)
+    return figure_update(figure, previous_shape)
 
-        # Initialize results list 
-        results = []
+# Callback to draw the zoomed part of the scatter plot at full resolution
+@app.callback(
+    [Output('xy-scatter-plot-pearson', 'figure', allow_duplicate=True),
+     Output('xy-scatter-plot-pearson-shape', 'data', allow_duplicate=True)],
+    Input('xy-scatter-plot-pearson', 'relayoutData'),
+    [State('x-variable-dropdown-pearson', 'value'), State('y-variable-dropdown-pearson', 'value'),
+     State('scatter-mode-pearson', 'value'), State('xy-scatter-plot-pearson-shape', 'data'),
+     State('cohort-selector', 'value')],
+    prevent_initial_call=True
+)
 
-        # Iterate over numerical columns
-        for col in numerical_columns:
+def update_xy_scatter_zoom(relayout_data, x_var, y_var, mode, previous_shape, cohort_name):
+    ranges = zoom_ranges(relayout_data)
+    # Nothing to redraw unless the axes were zoomed or reset
+    if ranges is None or not (x_var and y_var):
+        return dash.no_update, dash.no_update
+    return figure_update(update_xy_scatter(x_var, y_var, mode, *ranges, cohort_name), previous_shape)
 
-            # Calculate Pearson correlation coefficient
-            corr, _ = pearsonr(df[y_var], df[col])
+# Function for Pearson's correlation coefficient scatter plot for all variables
+@result_cache.memoize
+def update_correlation_plot(y_var, cohort_name=None):
+    if y_var:
 
-            # Append correlation result to results list
-            results.append({'Variable': col, 'Correlation': corr})
+        # Look up the correlations with y in the cohort's precomputed matrix
+            # Variables the correlation is not defined for (constant or no shared rows) are left out
+        cohort = cohort_registry.get(cohort_name)
+        results_df, undefined = correlations_with(cohort.pearson(), y_var)
 
-        # Create df from correlation results
-        results_df = pd.DataFrame(results)
+        # Bootstrap interval of each correlation, computed once per target and cohort version
+        results_df = results_df.join(cohort.pearson_intervals(y_var), on='Variable')
 
         # Create scatter plot with user input on y
         fig = px.scatter(results_df, x='Variable', y='Correlation', color='Correlation',
-                         title=f'Correlation with {y_var}',
-                         
-                        # Format hover text to display Cramer's V with two decimal points
-                        hover_data={'Variable': True, 'Correlation': ':.2f'},
+                         title=f'Correlation with {y_var} ({CONFIDENCE_LEVEL:.0%} bootstrap intervals)',
+
+                        # Error bars from the correlation to the ends of its interval
+                        error_y=results_df['Upper'] - results_df['Correlation'],
+                        error_y_minus=results_df['Correlation'] - results_df['Lower'],
+
+                        # Format hover text to display the correlation, its interval and p-value with two/three decimal points
+                        hover_data={'Variable': True, 'Correlation': ':.2f', 'Lower': ':.2f', 'Upper': ':.2f',
+                                    'P_Value': ':.3f'},
                         color_continuous_scale=color_scale)
+
+        # List the variables that were left out under the plot
+        if undefined:
+            fig.add_annotation(text=f"Not defined (constant or missing): {', '.join(undefined)}",
+                               xref='paper', yref='paper', x=0, y=-0.3, showarrow=False)
         
         return fig 
     
     # Return empty scatter plot if no Y variable is selected
     return px.scatter()  
 
-# Callback to update Cramer's V scatter plot for all vairblaes
+# Callback to update Pearson's correlation coefficient scatter plot for all variables, the bootstrap runs in the background
 @app.callback(
-    Output('correlation-scatter-plot-cramers-v', 'figure'),
-    [Input('y-variable-dropdown-cramers-v', 'value')]
+    [Output('correlation-scatter-plot-pearson-all', 'figure'), Output('correlation-scatter-plot-pearson-all-shape', 'data')],
+    [Input('y-variable-dropdown-pearson-all', 'value')],
+    [State('correlation-scatter-plot-pearson-all-shape', 'data'), State('cohort-selector', 'value')],
+    background=True,
+    running=[(Output('pearson-all-running', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('pearson-all-progress', 'value'), Output('pearson-all-progress', 'max')],
+    cancel=[Input('pearson-all-cancel', 'n_clicks')]
 )
 
+def correlation_background(set_progress, y_var, previous_shape, cohort_name):
+    return figure_update(run_limited(set_progress, update_correlation_plot, y_var, cohort_name), previous_shape)
+
 # Function for Cramer's V scatter plot for all vairblaes
-def update_cramers_v_plot(y_variable):
+@result_cache.memoize
+def update_cramers_v_plot(y_variable, cohort_name=None):
     if y_variable:
-        # Calculate Cramer's V for all object columns with function defined earlier
-        results_df = cramer_v_for_all_vars(object_df, y_variable)
+        # Look up Cramer's V for all object columns in the cohort's precomputed matrix
+        cohort = cohort_registry.get(cohort_name)
+        results_df = cramers_v_row(cohort.cramers_v(), y_variable)
+
+        # Bootstrap interval of each Cramer's V, computed once per target and cohort version
+        results_df = results_df.join(cohort.cramers_v_intervals(y_variable), on='Variable')
 
         # Replace NaN values in 'Cramers_V' with a default size
         min_valid_value = results_df['Cramers_V'].min(skipna=True)
@@ -520,10 +975,15 @@ def update_cramers_v_plot(y_variable):
 
         # Create scatter plot with user input on y
         fig = px.scatter(results_df, x='Variable', y='Cramers_V', color='Cramers_V',
-                        title=f"Cramer's V Across Categorical Variables with {y_variable}",
+                        title=f"Cramer's V Across Categorical Variables with {y_variable} "
+                              f"({CONFIDENCE_LEVEL:.0%} bootstrap intervals)",
 
-                        # Format hover text to display Cramer's V with two decimal points
-                        hover_data={'Variable': True, 'Cramers_V': ':.2f'},
+                        # Error bars from Cramer's V to the ends of its interval
+                        error_y=results_df['Upper'] - results_df['Cramers_V'],
+                        error_y_minus=results_df['Cramers_V'] - results_df['Lower'],
+
+                        # Format hover text to display Cramer's V and its interval with two decimal points
+                        hover_data={'Variable': True, 'Cramers_V': ':.2f', 'Lower': ':.2f', 'Upper': ':.2f'},
                         color_continuous_scale=color_scale,
         
                         # Use 'Cramers_V' for marker size
@@ -536,64 +996,57 @@ def update_cramers_v_plot(y_variable):
     # Return empty scatter plot if no Y variable is selected
     return px.scatter()
 
-# Callback to update the geographical heatmap plot for the East Coast
+# Callback to update Cramer's V scatter plot for all vairblaes, computed in the background
 @app.callback(
-    Output('eastcoast-plot-geo', 'figure'),
-    [Input('variable-selector-geo', 'value')]
+    [Output('correlation-scatter-plot-cramers-v', 'figure'), Output('correlation-scatter-plot-cramers-v-shape', 'data')],
+    [Input('y-variable-dropdown-cramers-v', 'value')],
+    [State('correlation-scatter-plot-cramers-v-shape', 'data'), State('cohort-selector', 'value')],
+    background=True,
+    running=[(Output('cramers-v-running', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('cramers-v-progress', 'value'), Output('cramers-v-progress', 'max')],
+    cancel=[Input('cramers-v-cancel', 'n_clicks')]
 )
 
-def update_geo_plot(x_var):
-
-    # Filter to include only the East Coast portion of United States
-    east_coast_states = ['ME', 'NH', 'MA', 'RI', 'CT', 'NY', 'NJ', 'PA', 'DE', 'MD', 'VA', 'NC', 'SC', 'GA', 'FL']
-    filtered_df = df[df['HS_STATE'].isin(east_coast_states)]
-
-    # Convert index to a column for hover data
-    filtered_df['Count'] = filtered_df.index
+def cramers_v_background(set_progress, y_variable, previous_shape, cohort_name):
+    # Only the target changes between plots, so after the first plot only the arrays and the title are sent
+    return figure_update(run_limited(set_progress, update_cramers_v_plot, y_variable, cohort_name), previous_shape)
 
-    # Create a heatmap of the count of records using the latitude and longitude coordinates
-    fig = px.density_mapbox(filtered_df, lat='HS_LAT', lon='HS_LONG', z='Count', radius=10,
-                            mapbox_style="carto-positron",
-                            title='Geography of Student High Schools',
-                            hover_data=['HS_STATE', 'HS_COUNTY', 'Count'])
-                                # Tried to change the color but it didnt work
-                            # color_continuous_scale=["green", "red"]))
+# Function to get the geographical heatmap plot for the East Coast
+def update_geo_plot(x_var, cohort_name=None):
+    cohort = cohort_registry.get(cohort_name)
+    # Built once per cohort version and weighting variable
+    return geo_figure(cohort.name, cohort.version, x_var)
 
-    fig.update_layout(height=800)
-    
-
-    return fig 
-
-# Callback to update the one hot encode heat map
+# Callback to update the geographical heatmap plot for the East Coast
 @app.callback(
-    Output('heatmap-encoded-columns', 'figure'),
-    [Input('variable-selector-encoded-columns', 'value'),
-     Input('numerical-variable-selector-encoded-columns', 'value'),
-     Input('display-option-encoded-columns', 'value')]
+    [Output('eastcoast-plot-geo', 'figure'), Output('eastcoast-plot-geo-shape', 'data')],
+    [Input('variable-selector-geo', 'value')],
+    [State('eastcoast-plot-geo-shape', 'data'), State('cohort-selector', 'value')]
 )
 
+def send_geo_plot(x_var, previous_shape, cohort_name):
+    return figure_update(update_geo_plot(x_var, cohort_name), previous_shape)
 
-def update_custom_heatmap(selected_columns, selected_numeric_col, view_mode):
+# Function to create the one hot encode heat map
+@result_cache.memoize
+def update_custom_heatmap(selected_columns, selected_numeric_col, view_mode, cohort_name=None):
     if not selected_columns or not selected_numeric_col:
         # Return an empty figure if selections are incomplete
-        return px.figure()
-    
-    # Filter cat_cols DataFrame to include only selected columns for encoding
-    filtered_cat_cols = cat_cols[selected_columns]
-
-    # Perform one-hot encoding
-    encoded_cat_cols = pd.get_dummies(filtered_cat_cols)
+        return px.scatter()
 
-    # Merge the one-hot encoded categorical columns with the selected numeric column
-    cat_cols_corr = pd.concat([encoded_cat_cols, num_cols[selected_numeric_col]], axis=1)
+    # Correlations of each selected column's dummies with the numeric column (cached per column)
+    cohort = cohort_registry.get(cohort_name)
+    numeric_blocks = {col: numeric_block(cohort.name, cohort.version, col, selected_numeric_col)
+                      for col in selected_columns}
 
-    # Creates correlation matrix
-    corr = cat_cols_corr.corr().sort_values(by=selected_numeric_col, axis=1, ascending=False)
-    corr = corr.sort_values(by=selected_numeric_col, axis=0, ascending=True)
-
-    # Slice the DataFrame to only include the selected view mode
     if view_mode == 'first_col':
-        corr = corr[[selected_numeric_col]]
+        # Only the numeric column is shown, so only its correlations are needed
+        corr = first_column_correlations(list(numeric_blocks.values()), selected_numeric_col)
+    else:
+        # Put the full matrix together from cached blocks, only newly added columns are computed
+        dummy_blocks = {(a, b): dummy_block(cohort.name, cohort.version, a, b)
+                        for a in selected_columns for b in selected_columns}
+        corr = full_correlations(selected_columns, dummy_blocks, numeric_blocks, selected_numeric_col)
 
     # Use plotly express to create the heatmap
     fig = px.imshow(
@@ -609,6 +1062,66 @@ def update_custom_heatmap(selected_columns, selected_numeric_col, view_mode):
 
     return fig
 
+# Callback to update the one hot encode heat map, computed in the background
+@app.callback(
+    [Output('heatmap-encoded-columns', 'figure'), Output('heatmap-encoded-columns-shape', 'data')],
+    [Input('variable-selector-encoded-columns', 'value'),
+     Input('numerical-variable-selector-encoded-columns', 'value'),
+     Input('display-option-encoded-columns', 'value')],
+    [State('heatmap-encoded-columns-shape', 'data'), State('cohort-selector', 'value')],
+    background=True,
+    running=[(Output('heatmap-running', 'style'), {'display': 'block'}, {'display': 'none'})],
+    progress=[Output('heatmap-progress', 'value'), Output('heatmap-progress', 'max')],
+    cancel=[Input('heatmap-cancel', 'n_clicks')]
+)
+
+def heatmap_background(set_progress, selected_columns, selected_numeric_col, view_mode, previous_shape, cohort_name):
+    figure = run_limited(set_progress, update_custom_heatmap, selected_columns, selected_numeric_col, view_mode,
+                         cohort_name)
+    return figure_update(figure, previous_shape)
+
+# Success Drilldown
+# Callback to slice or roll up the cohort's cube, the groups are looked up instead of grouped from the rows
+@app.callback(
+    [Output('cube-plot', 'figure'), Output('cube-plot-shape', 'data'), Output('cube-table', 'columns'),
+     Output('cube-table', 'data'), Output('cube-status', 'children')],
+    [Input('cube-group-by', 'value')] + [Input(f'cube-filter-{col}', 'value') for col in cube_dimensions],
+    [State('cube-plot-shape', 'data'), State('cohort-selector', 'value')]
+)
+
+def update_drilldown(group_by, *args):
+    *filter_values, previous_shape, cohort_name = args
+    group_by = group_by or []
+    cube = cohort_registry.get(cohort_name).cube()
+    try:
+        cells = slice_cube(cube, group_by, dict(zip(cube_dimensions, filter_values)))
+    except ValueError as error:
+        return (dash.no_update, dash.no_update, dash.no_update, dash.no_update,
+                dbc.Alert(str(error), color="danger", dismissable=True))
+
+    # Success rate, or the number of students for a cohort without GPAs
+    gpa = has_gpa(cube)
+    measure, measure_name = ('success_rate', 'Success rate') if gpa else ('students', 'Students')
+
+    # Bars of the first category, colored by the second and split by the third
+    if group_by:
+        fig = px.bar(cells, x=group_by[0], y=measure,
+                     color=group_by[1] if len(group_by) > 1 else None,
+                     facet_col=group_by[2] if len(group_by) > 2 else None,
+                     barmode='group', hover_data=['students', 'gpa_mean'],
+                     labels={'success_rate': 'Success rate (GPA >= 3.0)', 'gpa_mean': 'GPA mean'},
+                     title=f"{measure_name} by {', '.join(group_by)}")
+    else:
+        fig = px.bar(cells.assign(group='All students'), x='group', y=measure,
+                     hover_data=['students', 'gpa_mean'], title=f'{measure_name} of the selected students')
+    if gpa:
+        fig.update_yaxes(range=[0, 1], tickformat='.0%')
+
+    # Table of the groups with rounded statistics
+    table = cells[group_by + ['students', 'gpa_mean', 'gpa_variance', 'success_rate']].round(3)
+    return (*figure_update(fig, previous_shape), [{'name': col, 'id': col} for col in table.columns],
+            table.to_dict('records'), None)
+
 
 # Callback to update the logistic regression model prediction
 @app.callback(
@@ -634,8 +1147,8 @@ def update_output(n_clicks, total_credit_hours, inst_hours_earned, overall_hours
                   ethnicity, major_x, instructional_method, math_readiness_ind, first_gen_ind):
     # Check if submit button has been clicked
     if n_clicks > 0:
-        # Create DataFrame with the input values
-        test_input = pd.DataFrame([{
+        # Collect the input values of the student
+        student = {
             'Total_Credit_Hours': total_credit_hours,
             'Inst_Hours_Earned': inst_hours_earned,
             'Overall_Hours_Attempted': overall_hours_attempted,
@@ -649,12 +1162,14 @@ def update_output(n_clicks, total_credit_hours, inst_hours_earned, overall_hours
             'Instructional_Method': instructional_method,
             'Math_Readiness_Ind': math_readiness_ind,
             'FIRST_GEN_IND': first_gen_ind
-        }])
+        }
         
-        # Use logistic regression model to predict (success_by_gpa) based on the inputs
-        predicted_class = pipeline.predict(test_input)[0]
-        # Get predicted probabilities of class labels
-        predicted_proba = pipeline.predict_proba(test_input)[0]
+        # Get predicted probabilities of class labels from the compiled scorer (same numbers as the pipeline
+        # without building a DataFrame)
+        scorer = model_registry.scorer()
+        predicted_proba = scorer.predict_proba_one(student)
+        # Use logistic regression model to predict (success_by_gpa), the most likely class, from the same call
+        predicted_class = scorer.classes_[int(np.argmax(predicted_proba))]
         # Calculate probability of predicted class
         probability_of_predicted_class = predicted_proba[predicted_class] * 100
         
@@ -678,6 +1193,344 @@ def update_output(n_clicks, total_credit_hours, inst_hours_earned, overall_hours
         )
     # Default output if nothing is submitted
     return "Enter values and press submit."
+
+# Function to create the what-if plot for a student, cached per student, swept features, cohort and model
+    # The sweep ranges come from the cohort's students, the whole grid is scored with one predict_proba call
+@result_cache.memoize
+def update_sensitivity_plot(student, x_feature, y_feature, cohort_name, model_version):
+    mergedf = cohort_registry.get(cohort_name).mergedf
+    scorer = model_registry.scorer()
+    x_values = sweep_values(mergedf[x_feature])
+
+    if y_feature and y_feature != x_feature:
+        y_values = sweep_values(mergedf[y_feature])
+        probabilities = grid_probabilities(scorer, student, x_feature, x_values, y_feature, y_values)
+
+        # Heatmap of the probability for every pair of values
+        fig = px.imshow(probabilities * 100, x=x_values, y=y_values, origin='lower', aspect='auto',
+                        zmin=0, zmax=100, color_continuous_scale=color_scale,
+                        labels={'x': x_feature, 'y': y_feature, 'color': 'P(GPA >= 3.0) %'},
+                        title=f'Chance of a GPA of 3.0 or higher by {x_feature} and {y_feature}')
+        # Mark the values entered in the form
+        fig.add_scatter(x=[student[x_feature]], y=[student[y_feature]], mode='markers', showlegend=False,
+                        marker={'color': 'black', 'size': 12, 'symbol': 'x'}, name='Entered values')
+    else:
+        probabilities = grid_probabilities(scorer, student, x_feature, x_values)
+
+        # Probability curve with the 50% line where the predicted class changes
+        fig = px.line(x=x_values, y=probabilities * 100, markers=True,
+                      labels={'x': x_feature, 'y': 'P(GPA >= 3.0) %'},
+                      title=f'Chance of a GPA of 3.0 or higher by {x_feature}')
+        fig.add_hline(y=50, line_dash='dash', line_color='gray')
+        fig.add_vline(x=student[x_feature], line_dash='dot', line_color='black')
+        fig.update_yaxes(range=[0, 100])
+
+    return fig
+
+# Callback to sweep the chosen features for the student in the form
+@app.callback(
+    [Output('sensitivity-plot', 'figure'), Output('sensitivity-plot-shape', 'data')],
+    Input('sensitivity-run', 'n_clicks'),
+    State('total_credit_hours', 'value'),
+    State('inst_hours_earned', 'value'),
+    State('overall_hours_attempted', 'value'),
+    State('overall_hours_earned', 'value'),
+    State('age', 'value'),
+    State('sat_math', 'value'),
+    State('act_composite', 'value'),
+    State('total_credits_enrolled', 'value'),
+    State('ethnicity', 'value'),
+    State('major_x', 'value'),
+    State('instructional_method', 'value'),
+    State('math_readiness_ind', 'value'),
+    State('first_gen_ind', 'value'),
+    State('sensitivity-x', 'value'),
+    State('sensitivity-y', 'value'),
+    State('sensitivity-plot-shape', 'data'),
+    State('cohort-selector', 'value'),
+    prevent_initial_call=True
+)
+
+def send_sensitivity_plot(n_clicks, total_credit_hours, inst_hours_earned, overall_hours_attempted,
+                          overall_hours_earned, age, sat_math, act_composite, total_credits_enrolled,
+                          ethnicity, major_x, instructional_method, math_readiness_ind, first_gen_ind,
+                          x_feature, y_feature, previous_shape, cohort_name):
+    # Same columns as the prediction above
+    student = {
+        'Total_Credit_Hours': total_credit_hours,
+        'Inst_Hours_Earned': inst_hours_earned,
+        'Overall_Hours_Attempted': overall_hours_attempted,
+        'Overall_Hours_Earned': overall_hours_earned,
+        'AGE': age,
+        'SAT_MATH': sat_math,
+        'ACT_COMPOSITE': act_composite,
+        'Total Credits Enrolled': total_credits_enrolled,
+        'Ethnicity': ethnicity,
+        'Major_x': major_x,
+        'Instructional_Method': instructional_method,
+        'Math_Readiness_Ind': math_readiness_ind,
+        'FIRST_GEN_IND': first_gen_ind
+    }
+
+    # Every value except the swept ones is needed to score the grid
+    missing = [col for col, value in student.items() if value is None and col not in (x_feature, y_feature)]
+    if not x_feature or missing:
+        message = 'Select a feature to sweep' if not x_feature else f"Fill in: {', '.join(missing)}"
+        return figure_update(px.scatter(title=message), previous_shape)
+
+    # The swept features are shown at the values entered, or at the first value of the sweep if left empty
+    mergedf = cohort_registry.get(cohort_name).mergedf
+    for col in (x_feature, y_feature):
+        if col and student[col] is None:
+            student[col] = float(sweep_values(mergedf[col])[0])
+
+    # Load the model first so its version is known, the cached plots of an older model are not reused
+    model_registry.get()
+    model_version = model_registry.report()['current_version']
+    fig = update_sensitivity_plot(student, x_feature, y_feature, cohort_name, model_version)
+    return figure_update(fig, previous_shape)
+
+# Callback to check an uploaded cohort and link to its scored file, which is scored while it downloads
+@app.callback(
+    Output('batch-status', 'children'),
+    Input('batch-upload', 'contents'),
+    State('batch-upload', 'filename'),
+    prevent_initial_call=True
+)
+
+def update_batch_prediction(contents, filename):
+    try:
+        cohort = read_upload(contents, filename)
+        token = save_upload(cohort, filename)
+    except ValueError as error:
+        return dbc.Alert(str(error), color="danger", dismissable=True)
+
+    return dbc.Alert([f"Ready to score {len(cohort)} students: ",
+                      html.A('Download predictions', href=f'/api/predict/{token}', download='')],
+                     color="success", dismissable=True)
+
+# Route to stream the scored CSV of a cohort uploaded on the Prediction tab, scored one chunk at a time
+    # The link is made by update_batch_prediction and works for UPLOAD_SECONDS
+@app.server.route('/api/predict/<token>')
+def batch_download_route(token):
+    upload = load_upload(token)
+    if upload is None:
+        return jsonify({'error': 'This upload has expired, upload the file again'}), 404
+    filename, cohort = upload
+
+    try:
+        chunks = stream_scored_csv(model_registry.get(), cohort)
+        # Score the first chunk now so bad input is reported as an error instead of a broken file
+        first_chunk = next(chunks, '')
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+
+    def generate():
+        yield first_chunk
+        yield from chunks
+
+    # Only plain characters from the uploaded file's name go in the header
+    output_name = ''.join(char if char.isalnum() or char in '-_.' else '_' for char in filename.rsplit('.', 1)[0])
+    return Response(generate(), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={output_name}_predictions.csv'})
+
+# Route to score a cohort sent as JSON, the scored cohort streams back as a CSV file
+    # e.g. curl -X POST -H 'Content-Type: application/json' -d @cohort.json http://localhost:8050/api/predict
+@app.server.route('/api/predict', methods=['POST'])
+def batch_predict_route():
+    try:
+        cohort = read_json_students(request.get_json(force=True))
+        chunks = stream_scored_csv(model_registry.get(), cohort)
+        # Score the first chunk now so bad input is reported as an error instead of a broken file
+        first_chunk = next(chunks, '')
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+
+    def generate():
+        yield first_chunk
+        yield from chunks
+
+    return Response(generate(), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=predictions.csv'})
+
+# Callback to show the Performance tab only when the address has ?perf=1
+@app.callback(
+    [Output('performance-tab', 'tab_style'), Output('performance-interval', 'disabled')],
+    [Input('url', 'search')]
+)
+
+def show_performance_tab(search):
+    if 'perf=1' in (search or ''):
+        return {}, False
+    return {'display': 'none'}, True
+
+# Callback to fill the Performance tab with the percentiles of every callback
+@app.callback(
+    [Output('performance-table', 'data'), Output('performance-table', 'columns')],
+    [Input('performance-interval', 'n_intervals')]
+)
+
+def update_performance_table(n_intervals):
+    rows = []
+    for callback, measurements in callback_timer.report().items():
+        row = {'Callback': callback, 'Calls': measurements.get('wall_seconds', {}).get('count', 0)}
+        for metric, values in measurements.items():
+            for percentile in ['p50', 'p95', 'p99']:
+                # Seconds as milliseconds and bytes as kilobytes so the table is easy to read
+                if metric.endswith('_seconds'):
+                    row[f"{metric.replace('_seconds', '')} ms {percentile}"] = round(values[percentile] * 1000, 1)
+                else:
+                    row[f"{metric.replace('_bytes', '')} KB {percentile}"] = round(values[percentile] / 1024, 1)
+        rows.append(row)
+
+    # Slowest callbacks first
+    rows.sort(key=lambda row: row.get('wall ms p95', 0), reverse=True)
+    # Background callbacks have no serialize time or payload, so take the columns from every row
+    names = list(dict.fromkeys(name for row in rows for name in row)) or ['Callback']
+    columns = [{'name': name, 'id': name} for name in names]
+    return rows, columns
+
+# Seconds from the start of the import to the end of the import and to the first request being answered
+startup = {'import_seconds': None, 'import_to_first_response_seconds': None}
+
+# Function to record when the server starts answering its first request
+    # Stamped before the request is handled, so a /health check that is the first request already reports it
+@app.server.before_request
+def record_first_response():
+    if startup['import_to_first_response_seconds'] is None:
+        startup['import_to_first_response_seconds'] = time.perf_counter() - startup_started
+
+# Route for health checks, answers without touching the data or the model
+@app.server.route('/health')
+def health_route():
+    return jsonify({'status': 'ok', **startup})
+
+# Route with the callback latencies and the startup times in the Prometheus text format
+@app.server.route('/metrics')
+def metrics_route():
+    lines = [callback_timer.prometheus_text()]
+    for name, seconds in startup.items():
+        if seconds is not None:
+            lines.append(f'# TYPE dash_startup_{name} gauge\ndash_startup_{name} {seconds}\n')
+    return Response(''.join(lines), mimetype='text/plain; version=0.0.4')
+
+# Function to get the answer of an admin route called without the admin token
+def admin_forbidden():
+    return jsonify({'error': 'Set ADMIN_TOKEN on the server and send it as "Authorization: Bearer <token>"'}), 403
+
+# Function to check the admin token on every /debug route, they show the server's data and internals
+@app.server.before_request
+def check_debug_token():
+    if request.path.startswith('/debug/') and not authorized(request.headers.get('Authorization')):
+        return admin_forbidden()
+
+# Route to list the saved callback profiles, or show the slowest functions of one
+    # e.g. curl -H "Authorization: Bearer $ADMIN_TOKEN" http://localhost:8050/debug/profiles
+@app.server.route('/debug/profiles')
+@app.server.route('/debug/profiles/<name>')
+def profiles_route(name=None):
+    if name is None:
+        return jsonify(callback_timer.profiles())
+    if name not in callback_timer.profiles():
+        return jsonify({'error': f'No profile named {name}'}), 404
+    return Response(callback_timer.profile_summary(name), mimetype='text/plain')
+
+# Route to report the hits and misses of the shared callback cache
+@app.server.route('/debug/cache')
+def cache_report_route():
+    return jsonify(result_cache.report())
+
+# Route to report the bytes of every column of the frames of the cohorts in memory
+@app.server.route('/debug/memory')
+def memory_report_route():
+    frames = {}
+    for name, cohort in list(cohort_registry.loaded.items()):
+        frames[f'{name} df'] = cohort.df
+        frames[f'{name} mergedf'] = cohort.mergedf
+    return jsonify(memory_report(frames))
+
+# Route to list the cohorts with their data version and whether they are in memory
+@app.server.route('/debug/cohorts')
+def cohort_report_route():
+    return jsonify(cohort_registry.report())
+
+# Route to report the loaded model versions with their load time and size
+@app.server.route('/debug/models')
+def model_report_route():
+    return jsonify(model_registry.report())
+
+# Route to load the newest model pickle now instead of waiting for the next check
+    # e.g. curl -X POST -H "Authorization: Bearer $ADMIN_TOKEN" http://localhost:8050/api/models/reload
+@app.server.route('/api/models/reload', methods=['POST'])
+def model_reload_route():
+    if not authorized(request.headers.get('Authorization')):
+        return admin_forbidden()
+    model_registry.reload()
+    return jsonify(model_registry.report())
+
+# The cleaning pipeline and the retraining started from the dashboard, one run of each at a time
+etl_job = SingleRunJob('clean_pipeline')
+retrain_job = SingleRunJob('retrain_model')
+
+# Route to retrain the model in its own process, the new version is loaded by the model registry when it is saved
+    # e.g. curl -X POST -H "Authorization: Bearer $ADMIN_TOKEN" -H 'Content-Type: application/json' \
+    #      -d '{"folds": 5}' http://localhost:8050/api/models/retrain
+    # Needs ADMIN_TOKEN set on the server, runs once at a time on RETRAIN_JOBS cores and only reads data in OUTPUT_DIR
+@app.server.route('/api/models/retrain', methods=['POST'])
+def model_retrain_route():
+    if not authorized(request.headers.get('Authorization')):
+        return admin_forbidden()
+
+    options = request.get_json(silent=True) or {}
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'retrain_model.py'),
+               '--jobs', str(RETRAIN_JOBS)]
+    if options.get('folds') is not None:
+        try:
+            folds = int(options['folds'])
+        except (TypeError, ValueError):
+            folds = 0
+        if not 2 <= folds <= MAX_RETRAIN_FOLDS:
+            return jsonify({'error': f'folds must be a whole number from 2 to {MAX_RETRAIN_FOLDS}'}), 400
+        command += ['--folds', str(folds)]
+    if options.get('data'):
+        data = path_inside(options['data'], OUTPUT_DIR)
+        if data is None:
+            return jsonify({'error': f"Not a file in {OUTPUT_DIR}: {options['data']}"}), 400
+        command += ['--data', data]
+
+    try:
+        pid = retrain_job.start(command)
+    except RuntimeError as error:
+        return jsonify({'error': str(error)}), 409
+    return jsonify({'started': True, 'pid': pid}), 202
+
+# Route to run the cleaning pipeline in its own process, only new terms or changed workbooks are processed
+    # e.g. curl -X POST -H "Authorization: Bearer $ADMIN_TOKEN" -H 'Content-Type: application/json' \
+    #      -d '{"terms": ["Fall 2022.xlsx"]}' http://localhost:8050/api/etl/run
+    # Needs ADMIN_TOKEN set on the server, runs once at a time and only reads workbooks in SOURCE_DIR
+@app.server.route('/api/etl/run', methods=['POST'])
+def etl_run_route():
+    if not authorized(request.headers.get('Authorization')):
+        return admin_forbidden()
+
+    options = request.get_json(silent=True) or {}
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'clean_pipeline.py')]
+    if options.get('terms'):
+        terms = options['terms'] if isinstance(options['terms'], list) else [options['terms']]
+        outside = [str(term) for term in terms if path_inside(term, SOURCE_DIR) is None]
+        if outside:
+            return jsonify({'error': f"Not a workbook in {SOURCE_DIR}: {', '.join(outside)}"}), 400
+        # Passed relative to SOURCE_DIR, the same names the pipeline's manifest is keyed on
+        command += ['--terms'] + [os.path.relpath(path_inside(term, SOURCE_DIR), os.path.realpath(SOURCE_DIR))
+                                  for term in terms]
+    if options.get('force'):
+        command.append('--force')
+
+    try:
+        pid = etl_job.start(command)
+    except RuntimeError as error:
+        return jsonify({'error': str(error)}), 409
+    return jsonify({'started': True, 'pid': pid}), 202
 # ================================= Call Backs And Functions =================================
 
 
@@ -685,6 +1538,9 @@ def update_output(n_clicks, total_credit_hours, inst_hours_earned, overall_hours
 
 
 # ================================= Run the App =================================
+# Everything above is loaded, the server can answer from here on
+startup['import_seconds'] = time.perf_counter() - startup_started
+
 if __name__ == '__main__':
     app.run_server(debug=True)
 # ================================= Run the App =================================q
\ No newline at end of file
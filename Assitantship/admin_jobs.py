@@ -0,0 +1,127 @@
+# ================================= Imports =================================
+# For the token, the pid files, starting the jobs and waiting for them to finish
+import os
+import hmac
+import json
+import threading
+import subprocess
+# For the start time of the process that holds a job
+import psutil
+
+# For keeping the pid files with the rest of the cache
+from data_cache import CACHE_DIR
+# For checking whether the process that holds a job is still running
+from background_jobs import holder_alive
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Admin Settings =================================
+# Token the admin routes (cleaning pipeline, retraining) require as "Authorization: Bearer <token>"
+    # The routes are turned off when it is not set
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Folder for the pid file of each running job, shared by every worker on the machine
+JOBS_DIR = os.path.join(CACHE_DIR, 'jobs')
+
+# Cores a retrain started from the dashboard may use, the server keeps the rest
+RETRAIN_JOBS = int(os.environ.get('RETRAIN_JOBS', 1))
+
+# Most cross-validation folds a retrain started from the dashboard may ask for
+MAX_RETRAIN_FOLDS = 10
+# ================================= Admin Settings =================================
+
+
+
+
+
+# ================================= Checks =================================
+# Function to check the Authorization header of a request against the admin token
+def authorized(header, token=ADMIN_TOKEN):
+    if not token:
+        return False
+    return hmac.compare_digest((header or '').encode(), f'Bearer {token}'.encode())
+
+# Function to get the full path of a file inside a folder, None if the path points outside it or is not a file
+def path_inside(path, folder):
+    folder = os.path.realpath(folder)
+    full_path = os.path.realpath(os.path.join(folder, str(path)))
+    if os.path.commonpath([full_path, folder]) != folder or not os.path.isfile(full_path):
+        return None
+    return full_path
+# ================================= Checks =================================
+
+
+
+
+
+# ================================= Single Run Jobs =================================
+# Command line job that only runs once at a time across all workers, its process is waited on when it ends
+class SingleRunJob:
+    def __init__(self, name, jobs_dir=JOBS_DIR):
+        self.name = name
+        self.pid_path = os.path.join(jobs_dir, f'{name}.pid')
+        self.lock = threading.Lock()
+
+    # Function to get the pid of the running job, None if it is not running
+    def running(self):
+        try:
+            with open(self.pid_path) as pid_file:
+                holder = json.load(pid_file)
+        except (OSError, ValueError):
+            return None
+        return holder['pid'] if holder_alive(holder['pid'], holder['started']) else None
+
+    # Function to write the pid file, only if there is none yet (claim) or replacing it (after the start)
+    def write_pid(self, process, claim):
+        temp_path = f'{self.pid_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as pid_file:
+            json.dump({'pid': process.pid, 'started': process.create_time()}, pid_file)
+        try:
+            # A hard link fails when the pid file exists, so only one worker can claim the job
+            if claim:
+                os.link(temp_path, self.pid_path)
+            else:
+                os.replace(temp_path, self.pid_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    # Function to start the job, raises RuntimeError if it is already running
+    def start(self, command):
+        os.makedirs(os.path.dirname(self.pid_path), exist_ok=True)
+        with self.lock:
+            # Claim the job for this server process first, a pid file left by a finished or killed job is removed
+            try:
+                self.write_pid(psutil.Process(), claim=True)
+            except FileExistsError:
+                pid = self.running()
+                if pid is not None:
+                    raise RuntimeError(f'{self.name} is already running (pid {pid})')
+                os.remove(self.pid_path)
+                self.write_pid(psutil.Process(), claim=True)
+
+            try:
+                process = subprocess.Popen(command)
+            except OSError:
+                os.remove(self.pid_path)
+                raise
+            self.write_pid(psutil.Process(process.pid), claim=False)
+
+        # Wait for the process in the background so it does not stay a zombie, then free the job
+        threading.Thread(target=self.reap, args=(process,), daemon=True).start()
+        return process.pid
+
+    # Function to wait for the job to end and remove its pid file
+    def reap(self, process):
+        process.wait()
+        try:
+            with open(self.pid_path) as pid_file:
+                finished = json.load(pid_file)['pid'] == process.pid
+        except (OSError, ValueError):
+            finished = False
+        if finished:
+            os.remove(self.pid_path)
+# ================================= Single Run Jobs =================================
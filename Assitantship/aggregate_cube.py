@@ -0,0 +1,133 @@
+# ================================= Imports =================================
+# For every combination of dimensions
+from itertools import combinations
+
+# For handling data
+import pandas as pd
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Cube Settings =================================
+# Categorical columns the notebooks split the students by
+cube_dimensions = ['Ethnicity', 'Major_x', 'Math_Readiness_Ind', 'FIRST_GEN_IND']
+
+# Most dimensions grouped or filtered on at once
+MAX_CUBE_DIMENSIONS = 3
+
+# A student counts as successful with an overall GPA of 3.0 or higher (success_by_gpa in the notebooks)
+GPA_COLUMN = 'Overall_GPA'
+GPA_THRESHOLD = 3.0
+
+# Value of a dimension that is rolled up, and of a student with no value
+ALL = '(All)'
+MISSING = '(Missing)'
+
+# Sums kept for every cell, the shown statistics are computed from them
+sum_columns = ['students', 'gpa_students', 'gpa_sum', 'gpa_square_sum', 'successes']
+# ================================= Cube Settings =================================
+
+
+
+
+
+# ================================= Building The Cube =================================
+# Function to get the dimensions of the cube that are in the frame
+def available_dimensions(frame, dimensions=cube_dimensions):
+    return [col for col in dimensions if col in frame.columns]
+
+# Function to name the cuboid grouped by a set of dimensions, in the cube's dimension order
+def cuboid_name(dimensions, grouped):
+    return '|'.join(col for col in dimensions if col in grouped) or ALL
+
+# Function to build the cube: the sums for every combination of up to max_dimensions of the dimensions
+    # One row per cell, the dimensions not grouped on hold ALL, so any slice or roll-up is a lookup
+    # The cuboids are summed from the finest grouping, the raw rows are only grouped once
+def build_cube(frame, dimensions=cube_dimensions, max_dimensions=MAX_CUBE_DIMENSIONS):
+    dimensions = available_dimensions(frame, dimensions)
+    # A cohort without GPAs still gets the student counts, its GPA measures are left undefined
+    if GPA_COLUMN in frame.columns:
+        gpa = pd.to_numeric(frame[GPA_COLUMN], errors='coerce')
+    else:
+        gpa = pd.Series(index=frame.index, dtype='float64')
+
+    # One row per student with the values that are summed
+    cells = pd.DataFrame({col: frame[col].astype(object).fillna(MISSING).astype(str) for col in dimensions})
+    cells['students'] = 1
+    cells['gpa_students'] = gpa.notna().astype('int64')
+    cells['gpa_sum'] = gpa.fillna(0.0)
+    cells['gpa_square_sum'] = gpa.fillna(0.0) ** 2
+    cells['successes'] = (gpa >= GPA_THRESHOLD).astype('int64')
+    finest = cells.groupby(dimensions, sort=False).sum().reset_index() if dimensions else cells
+
+    cuboids = []
+    for size in range(min(max_dimensions, len(dimensions)) + 1):
+        for grouped in combinations(dimensions, size):
+            if grouped:
+                cuboid = finest.groupby(list(grouped), sort=False)[sum_columns].sum().reset_index()
+            else:
+                cuboid = finest[sum_columns].sum().to_frame().T
+            for col in dimensions:
+                if col not in grouped:
+                    cuboid[col] = ALL
+            cuboid['cuboid'] = cuboid_name(dimensions, grouped)
+            cuboids.append(cuboid[['cuboid'] + dimensions + sum_columns])
+
+    # Stored compactly: the dimensions as categories and the counts as 32-bit integers
+    cube = pd.concat(cuboids, ignore_index=True)
+    for col in ['cuboid'] + dimensions:
+        cube[col] = cube[col].astype('category')
+    for col in ['students', 'gpa_students', 'successes']:
+        cube[col] = cube[col].astype('int32')
+    return cube
+# ================================= Building The Cube =================================
+
+
+
+
+
+# ================================= Querying The Cube =================================
+# Function to get the values of every dimension in the cube, for the filter dropdowns
+def dimension_values(cube):
+    return {col: sorted(value for value in cube[col].cat.categories if value != ALL)
+            for col in cube.columns if col not in ['cuboid'] + sum_columns}
+
+# Function to check whether the cube has GPA measures, a cohort without the GPA column only has counts
+def has_gpa(cube):
+    return bool(cube['gpa_students'].sum() > 0)
+
+# Function to add the count, GPA mean, GPA variance and success rate of the cells
+def cell_statistics(cells):
+    gpa_students = cells['gpa_students'].astype('float64')
+    mean = cells['gpa_sum'] / gpa_students.where(gpa_students > 0)
+    # Sample variance from the sums, not defined for a single student
+    variance = (cells['gpa_square_sum'] - gpa_students * mean ** 2) / (gpa_students - 1).where(gpa_students > 1)
+    return cells.assign(gpa_mean=mean,
+                        gpa_variance=variance.clip(lower=0),
+                        success_rate=cells['successes'] / gpa_students.where(gpa_students > 0))
+
+# Function to slice the cube: cells grouped by group_by, only the students with the filtered values
+    # filters is {dimension: value}, a filtered dimension is kept at its value instead of rolled up
+def slice_cube(cube, group_by=(), filters=None):
+    filters = {col: value for col, value in (filters or {}).items() if value is not None}
+    dimensions = [col for col in cube.columns if col not in ['cuboid'] + sum_columns]
+    used = set(group_by) | set(filters)
+    unknown = used - set(dimensions)
+    if unknown:
+        raise ValueError(f"Not a dimension of the cube: {', '.join(sorted(unknown))}")
+    if len(used) > MAX_CUBE_DIMENSIONS:
+        raise ValueError(f'Group and filter on at most {MAX_CUBE_DIMENSIONS} dimensions at once')
+
+    # The cuboid grouped on every used dimension holds the answer
+    mask = (cube['cuboid'] == cuboid_name(dimensions, used)).to_numpy()
+    for col, value in filters.items():
+        mask &= (cube[col] == value).to_numpy()
+
+    cells = cube.loc[mask, list(group_by) + sum_columns]
+    cells = cells.sort_values('students', ascending=False, kind='stable').reset_index(drop=True)
+    for col in group_by:
+        cells[col] = cells[col].astype(str)
+    return cell_statistics(cells)
+# ================================= Querying The Cube =================================
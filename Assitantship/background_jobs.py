@@ -0,0 +1,98 @@
+# ================================= Imports =================================
+# For paths and settings from the environment, the lease names and waiting for a free slot
+import os
+import time
+import uuid
+# For checking whether the process holding a slot is still running
+import psutil
+
+# For the disk cache the background callbacks run through
+import diskcache
+# For running callbacks in separate processes
+from dash import DiskcacheManager
+
+# For keeping the job store in the same folder as the data cache
+from data_cache import CACHE_DIR
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Background Settings =================================
+# Folder for the queue and results of the background callbacks
+BACKGROUND_DIR = os.path.join(CACHE_DIR, 'background')
+
+# Most heavy statistics allowed to run at once across all workers (default one per core)
+    # Each background callback still runs in its own process started for the job by DiskcacheManager, this caps
+    # how many of them compute at once, it is not a pool of workers that are reused
+BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', os.cpu_count() or 1))
+
+# Key of the slots held in the shared cache, and how often a waiting job checks for a free one (seconds)
+SLOTS_KEY = 'heavy-statistics-leases'
+SLOT_POLL_SECONDS = 0.1
+
+# Shared cache and the manager passed to dash.Dash
+background_cache = diskcache.Cache(BACKGROUND_DIR)
+background_manager = DiskcacheManager(background_cache)
+
+# Progress steps shown while a job runs: waiting for a slot, computing, done
+PROGRESS_STEPS = 3
+# ================================= Background Settings =================================
+
+
+
+
+
+# ================================= Running Heavy Statistics =================================
+# Function to check whether the process that took a slot is still running
+    # The start time guards against a new process that was given the same pid
+def holder_alive(pid, started):
+    try:
+        process = psutil.Process(pid)
+        return process.create_time() == started and process.status() != psutil.STATUS_ZOMBIE
+    except psutil.Error:
+        return False
+
+# Function to take a slot if one is free, returns the lease name or None
+    # Every job holds its own lease keyed by its pid, so the slot of a job Dash killed (Cancel or a new
+    # dropdown value) is given back as soon as its process is gone, instead of never
+def take_slot(workers=BACKGROUND_WORKERS, cache=background_cache):
+    process = psutil.Process()
+    with cache.transact():
+        leases = {lease: holder for lease, holder in cache.get(SLOTS_KEY, {}).items() if holder_alive(*holder)}
+        lease = None
+        if len(leases) < workers:
+            lease = f'{process.pid}-{uuid.uuid4().hex}'
+            leases[lease] = (process.pid, process.create_time())
+        cache.set(SLOTS_KEY, leases)
+    return lease
+
+# Function to give a slot back
+def release_slot(lease, cache=background_cache):
+    with cache.transact():
+        leases = cache.get(SLOTS_KEY, {})
+        leases.pop(lease, None)
+        cache.set(SLOTS_KEY, leases)
+
+# Function to run a heavy callback once a slot is free, reporting progress along the way
+    # set_progress is the function Dash passes to background callbacks with progress outputs
+def run_limited(set_progress, func, *args):
+    # Show that the job is waiting for a free slot
+    set_progress((1, PROGRESS_STEPS))
+
+    # Shared between all processes through the disk cache, so the limit holds across workers
+    lease = take_slot()
+    while lease is None:
+        time.sleep(SLOT_POLL_SECONDS)
+        lease = take_slot()
+
+    try:
+        set_progress((2, PROGRESS_STEPS))
+        result = func(*args)
+    finally:
+        release_slot(lease)
+
+    set_progress((PROGRESS_STEPS, PROGRESS_STEPS))
+    return result
+# ================================= Running Heavy Statistics =================================
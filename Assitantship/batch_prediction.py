@@ -0,0 +1,142 @@
+# ================================= Imports =================================
+# For decoding uploaded files, and keeping them until they are downloaded
+import io
+import os
+import time
+import base64
+import pickle
+import secrets
+import zipfile
+
+# For handling data
+import pandas as pd
+import numpy as np
+
+# For keeping the uploads with the rest of the cache
+from data_cache import CACHE_DIR, atomic_write
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Batch Settings =================================
+# Columns the logistic regression pipeline was trained on
+numerical_features = ['Total_Credit_Hours', 'Inst_Hours_Earned', 'Overall_Hours_Attempted', 'Overall_Hours_Earned',
+                      'AGE', 'SAT_MATH', 'ACT_COMPOSITE', 'Total Credits Enrolled']
+categorical_features = ['Ethnicity', 'Major_x', 'Instructional_Method', 'Math_Readiness_Ind', 'FIRST_GEN_IND']
+feature_columns = numerical_features + categorical_features
+
+# Number of students scored per pipeline call
+CHUNK_SIZE = 5000
+
+# Folder for the uploaded cohorts waiting to be scored, shared by every worker
+UPLOAD_DIR = os.path.join(CACHE_DIR, 'uploads')
+# Seconds an uploaded cohort can be downloaded scored, older uploads are removed with the next upload
+UPLOAD_SECONDS = 60 * 60
+# ================================= Batch Settings =================================
+
+
+
+
+
+# ================================= Scoring =================================
+# Function to check that a cohort has every column the pipeline needs
+def check_columns(frame):
+    missing = [col for col in feature_columns if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+# Function to score a frame of students with a single predict_proba call
+    # The predicted class is the most likely class, the same answer pipeline.predict gives
+def score_frame(pipeline, frame):
+    predicted_proba = pipeline.predict_proba(frame[feature_columns])
+    predicted_index = predicted_proba.argmax(axis=1)
+
+    scored = frame.copy()
+    scored['predicted_success_by_gpa'] = pipeline.classes_[predicted_index]
+    scored['probability_gpa_3_or_higher'] = predicted_proba[:, list(pipeline.classes_).index(1)]
+    scored['probability_of_predicted_class'] = predicted_proba[np.arange(len(frame)), predicted_index]
+    return scored
+
+# Function to score a cohort one chunk at a time
+def score_in_chunks(pipeline, frame, chunk_size=CHUNK_SIZE):
+    check_columns(frame)
+    for start in range(0, len(frame), chunk_size):
+        yield score_frame(pipeline, frame.iloc[start: start + chunk_size])
+
+# Function to score a cohort and stream the results as CSV text, header only in the first chunk
+def stream_scored_csv(pipeline, frame, chunk_size=CHUNK_SIZE):
+    for number, scored in enumerate(score_in_chunks(pipeline, frame, chunk_size)):
+        yield scored.to_csv(index=False, header=(number == 0))
+# ================================= Scoring =================================
+
+
+
+
+
+# ================================= Reading Cohorts =================================
+# Function to read a file from dcc.Upload (a base64 data URL) into a frame
+def read_upload(contents, filename):
+    _, encoded = contents.split(',', 1)
+    decoded = base64.b64decode(encoded)
+
+    if filename.lower().endswith('.csv'):
+        reader, kind = pd.read_csv, 'a CSV file'
+    elif filename.lower().endswith(('.xls', '.xlsx')):
+        reader, kind = pd.read_excel, 'an Excel workbook'
+    else:
+        raise ValueError('Upload a .csv or .xlsx file')
+
+    # A corrupt, renamed or badly encoded file fails inside the reader, reported as a ValueError so the upload
+    # shows a message (other errors are bugs and are raised as they are)
+    try:
+        return reader(io.BytesIO(decoded))
+    except (pd.errors.ParserError, UnicodeDecodeError, ValueError, zipfile.BadZipFile) as error:
+        raise ValueError(f'Could not read {filename} as {kind}: {error}') from error
+
+# Function to read the students from a JSON request body
+    # Either a list of students or {"students": [...]}
+def read_json_students(payload):
+    if isinstance(payload, dict):
+        payload = payload.get('students')
+    if not isinstance(payload, list):
+        raise ValueError('Send a list of students or {"students": [...]}')
+    return pd.DataFrame(payload)
+# ================================= Reading Cohorts =================================
+
+
+
+
+
+# ================================= Uploaded Cohorts =================================
+# Function to keep an uploaded cohort until it is downloaded scored, returns the token of its download link
+def save_upload(frame, filename, upload_dir=UPLOAD_DIR):
+    check_columns(frame)
+    os.makedirs(upload_dir, exist_ok=True)
+
+    # Remove the uploads that were not downloaded in time
+    for name in os.listdir(upload_dir):
+        try:
+            if time.time() - os.path.getmtime(os.path.join(upload_dir, name)) > UPLOAD_SECONDS:
+                os.remove(os.path.join(upload_dir, name))
+        except FileNotFoundError:
+            # Removed by another worker
+            continue
+
+    token = secrets.token_urlsafe(16)
+    atomic_write(os.path.join(upload_dir, f'{token}.pkl'),
+                 lambda temp_path: pd.to_pickle({'filename': filename, 'frame': frame}, temp_path))
+    return token
+
+# Function to get an uploaded cohort by its token, returns (filename, frame) or None when it is gone
+def load_upload(token, upload_dir=UPLOAD_DIR):
+    # Tokens are URL-safe base64, anything else cannot be one of ours
+    if not token or not all(char.isalnum() or char in '-_' for char in token):
+        return None
+    try:
+        upload = pd.read_pickle(os.path.join(upload_dir, f'{token}.pkl'))
+    except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+        return None
+    return upload['filename'], upload['frame']
+# ================================= Uploaded Cohorts =================================
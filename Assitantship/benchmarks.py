@@ -0,0 +1,284 @@
+# ================================= Imports =================================
+# For timing, the command line and saving the results
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import platform
+
+# For handling data
+import pandas as pd
+import numpy as np
+import sklearn
+
+# The code being timed
+from data_model import compact_frame, text_columns, number_columns
+from cramers_v_engine import calculate_cramers_v, cramer_v_for_all_vars
+from correlation_engine import pearson_matrix, correlations_with
+from onehot_engine import encode_column, dummy_dummy_block, dummy_numeric_block, full_correlations
+from batch_prediction import feature_columns
+from model_registry import ModelRegistry
+from compiled_scorer import CompiledScorer, compile_pipeline
+from clean_pipeline import county_coordinates
+from cohort_registry import Cohort
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Benchmark Settings =================================
+# Cohort sizes timed by default
+SIZES = [1000, 10000, 100000, 1000000]
+
+# Each benchmark runs until it took this long in total (at least once, at most MAX_REPEATS times)
+MIN_SECONDS = 1.0
+MAX_REPEATS = 20
+
+# Folder the results are saved to, one JSON file per run
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_results')
+
+# A benchmark this many times slower than the baseline is reported as a regression
+REGRESSION_RATIO = 1.2
+
+# Values used for the synthetic students (the same values the prediction tab offers)
+ethnicities = ['Hispanic or Latino', 'Caucasian or White', 'Black or African American', 'Asian', 'More Than 1 Race',
+               'Non Resident Alien', 'Hawaiian or Pacific Islander', 'Unknown or Not Specified']
+majors = ['BIOL', 'HLSC', 'ENSC', 'PHYS', 'ENVL', 'MARS', 'CSCI', 'EXSC', 'MATH', 'SSTB',
+          'BCMB', 'BSNS', 'ARTS', 'HIST', 'CHEM', 'CRIM', 'SOWK', 'COMM', 'LIBA', 'ARTV']
+instructional_methods = ['LEC', 'ONL', 'TUT', 'SEM', 'IND', 'LAB', 'L/L', 'DEHYB', 'STU']
+first_gen = ['Null', 'FGNY: High School diploma or GED', 'FGNN: Graduate school',
+             'FGNN: Graduated from college: Bachelors degree', 'FGNY: Some trade school or community college',
+             'FGNY: Some college', 'FGNY: Graduated from community college: Asso. degree',
+             'FGNY: Did not finish High School', 'FGNY: Some grade school', 'FGNY: Completed grade school']
+# ================================= Benchmark Settings =================================
+
+
+
+
+
+# ================================= Synthetic Cohorts =================================
+# Function to create a synthetic cohort with the same columns as both workbooks the dashboard reads
+    # Returns (df, mergedf) stored in the same compact types the dashboard uses
+def synthetic_cohort(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    county = county_coordinates.iloc[rng.integers(0, len(county_coordinates), rows)].reset_index(drop=True)
+    ids = np.arange(100000, 100000 + rows)
+
+    # Same columns as 'Conditionally Admitted Students Updated.xlsx'
+    df = pd.DataFrame({
+        'ID': ids,
+        'ETHNICITY': rng.choice(ethnicities, rows),
+        'GENDER': rng.choice(['M', 'F'], rows),
+        'HS_STATE': county['HS_STATE'],
+        'HS_COUNTY': county['HS_COUNTY'],
+        'HS_LAT': county['HS_LAT'],
+        'HS_LONG': county['HS_LONG'],
+        'AGE': rng.integers(17, 25, rows),
+        'SAT_MATH': rng.normal(520, 60, rows).round(),
+        'SAT_TOTAL': rng.normal(1050, 100, rows).round(),
+        'HS_GPA': rng.normal(3.0, 0.4, rows),
+        'FIRST_GEN_IND': rng.choice(first_gen, rows),
+        'HOUSING_INTEREST': rng.choice(['Y', 'N'], rows),
+        'REC_COMPLETED_DATE': pd.Timestamp('2022-01-01') + pd.to_timedelta(rng.integers(0, 200, rows), 'D')
+    })
+    # Some students have no SAT total
+    df.loc[rng.random(rows) < 0.05, 'SAT_TOTAL'] = np.nan
+
+    # Same columns as 'Full Conditionally Admitted Students.xlsx' that the dashboard uses
+    mergedf = pd.DataFrame({
+        'ID': ids,
+        'Total_Credit_Hours': rng.integers(12, 18, rows),
+        'Inst_Hours_Earned': rng.integers(0, 18, rows),
+        'Overall_Hours_Attempted': rng.integers(12, 40, rows),
+        'Overall_Hours_Earned': rng.integers(0, 40, rows),
+        'AGE': df['AGE'],
+        'SAT_MATH': df['SAT_MATH'],
+        'ACT_COMPOSITE': rng.integers(0, 30, rows),
+        'Total Credits Enrolled': rng.integers(12, 18, rows),
+        'Ethnicity': df['ETHNICITY'],
+        'Major_x': rng.choice(majors, rows),
+        'Instructional_Method': rng.choice(instructional_methods, rows),
+        'Math_Readiness_Ind': rng.choice(['Y', 'N'], rows),
+        'FIRST_GEN_IND': df['FIRST_GEN_IND'],
+        'Overall_GPA': rng.uniform(1.5, 4.0, rows),
+        'Term_GPA': rng.uniform(1.5, 4.0, rows),
+        'HS_STATE': df['HS_STATE'],
+        'HS_COUNTY': df['HS_COUNTY'],
+        'Gender': df['GENDER']
+    })
+
+    return compact_frame(df), compact_frame(mergedf)
+# ================================= Synthetic Cohorts =================================
+
+
+
+
+
+# ================================= Timing =================================
+# Function to time a function, setup runs before every call and is not timed
+def time_call(func, *args, setup=None, min_seconds=MIN_SECONDS, max_repeats=MAX_REPEATS):
+    times = []
+    while not times or (sum(times) < min_seconds and len(times) < max_repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+
+    return {'runs': len(times),
+            'best_seconds': min(times),
+            'median_seconds': float(np.median(times)),
+            'mean_seconds': float(np.mean(times))}
+
+# Function to build the one-hot heatmap matrix from scratch (what update_custom_heatmap does on a cold cache)
+def onehot_heatmap(frame, columns, numeric_col):
+    encodings = {col: encode_column(frame[col]) for col in columns}
+    numeric_blocks = {col: dummy_numeric_block(encodings[col], frame[numeric_col]) for col in columns}
+    dummy_blocks = {(a, b): dummy_dummy_block(encodings[a], encodings[b]) for a in columns for b in columns}
+    return full_correlations(columns, dummy_blocks, numeric_blocks, numeric_col)
+
+# Function to time the statistics and the model on one cohort
+def benchmark_statistics(df, mergedf, pipeline=None):
+    categorical = [col for col in text_columns(df) if col != 'ID']
+    results = {
+        'calculate_cramers_v': time_call(calculate_cramers_v, df['ETHNICITY'], df['HS_COUNTY']),
+        'cramer_v_for_all_vars': time_call(cramer_v_for_all_vars, df[categorical], 'ETHNICITY'),
+        'pearson_all_variables': time_call(
+            lambda: correlations_with(pearson_matrix(df, number_columns(df)), 'SAT_MATH')),
+        'onehot_heatmap': time_call(onehot_heatmap, mergedf, ['Ethnicity', 'Major_x', 'Instructional_Method'],
+                                    'Overall_GPA')
+    }
+
+    if pipeline is not None:
+        features = mergedf[feature_columns]
+        results['predict_proba_single'] = time_call(pipeline.predict_proba, features.iloc[[0]])
+        results['predict_proba_batch'] = time_call(pipeline.predict_proba, features)
+
+        # The same predictions through the compiled scorer update_output uses
+        scorer = CompiledScorer(compile_pipeline(pipeline))
+        results['compiled_proba_single'] = time_call(scorer.predict_proba_one, features.iloc[0].to_dict())
+        results['compiled_proba_batch'] = time_call(scorer.predict_proba, features)
+    return results
+# ================================= Timing =================================
+
+
+
+
+
+# ================================= Callbacks Without A Browser =================================
+# Function to make a cohort the app's default cohort and empty every cached result
+    # The artifacts are kept in memory only, so every run computes them again
+def load_cohort(app_module, df, mergedf, version):
+    app_module.cohort_registry.add(Cohort(version, df, mergedf, version))
+    clear_caches(app_module)
+
+# Function to empty the in-process caches of the app (lru_cache functions and the cohorts' artifacts)
+def clear_caches(app_module):
+    for value in vars(app_module).values():
+        # Checked on the type so proxies like flask.request are not touched outside a request
+        if hasattr(type(value), 'cache_clear'):
+            value.cache_clear()
+    for cohort in app_module.cohort_registry.loaded.values():
+        cohort.artifacts.clear()
+
+# Function to time the callbacks of the app called directly, each call starts from empty caches
+    # The shared SQLite result cache and the timing wrapper are skipped by calling the undecorated functions
+def benchmark_callbacks(app_module):
+    def reset():
+        clear_caches(app_module)
+
+    def run(name, *args):
+        return time_call(inspect.unwrap(getattr(app_module, name)), *args, setup=reset)
+
+    sort_by = [{'column_id': 'SAT_MATH', 'direction': 'desc'}]
+    return {
+        'update_sample_table': run('update_sample_table', 0, 25, sort_by, '{GENDER} = F && {AGE} > 18'),
+        'update_xy_scatter': run('update_xy_scatter', 'SAT_MATH', 'HS_GPA', 'auto'),
+        'update_correlation_plot': run('update_correlation_plot', 'SAT_MATH'),
+        'update_cramers_v_plot': run('update_cramers_v_plot', 'ETHNICITY'),
+        'update_geo_plot': run('update_geo_plot', None),
+        'update_custom_heatmap': run('update_custom_heatmap', ['Ethnicity', 'Major_x', 'Instructional_Method'],
+                                     'Overall_GPA', 'full'),
+        'update_output': run('update_output', 1, 15, 12, 15, 12, 18, 520, 21, 15,
+                             'Asian', 'BIOL', 'LEC', 'Y', 'FGNY: Some college')
+    }
+# ================================= Callbacks Without A Browser =================================
+
+
+
+
+
+# ================================= Saving And Comparing =================================
+# Function to save the results with the library versions they were measured with
+def save_results(results, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f'benchmarks-{time.strftime("%Y%m%d-%H%M%S")}.json')
+    with open(path, 'w') as results_file:
+        json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'machine': platform.platform(),
+                   'python': platform.python_version(),
+                   'versions': {'pandas': pd.__version__, 'numpy': np.__version__, 'sklearn': sklearn.__version__},
+                   'results': results}, results_file, indent=2)
+    return path
+
+# Function to compare results with an earlier run, returns the benchmarks that got slower
+def compare_results(results, baseline_path, ratio=REGRESSION_RATIO):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, timing in benchmarks.items():
+            before = baseline.get(size, {}).get(name)
+            if before and timing['best_seconds'] > ratio * before['best_seconds']:
+                regressions.append((size, name, before['best_seconds'], timing['best_seconds']))
+    return regressions
+# ================================= Saving And Comparing =================================
+
+
+
+
+
+# ================================= Command Line =================================
+# Usage: python benchmarks.py --sizes 1000 10000 --callbacks --compare benchmark_results/benchmarks-20240501-120000.json
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the dashboard's statistics and callbacks on synthetic cohorts.")
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help='number of students in each cohort')
+    parser.add_argument('--callbacks', action='store_true',
+                        help='also time the callbacks of DashApp.py (needs the workbooks DashApp.py reads)')
+    parser.add_argument('--no-model', action='store_true', help='skip the predict_proba benchmarks')
+    parser.add_argument('--compare', help='earlier results file to check for regressions')
+    args = parser.parse_args(argv)
+
+    pipeline = None if args.no_model else ModelRegistry().get()
+    app_module = None
+    if args.callbacks:
+        import DashApp as app_module
+
+    results = {}
+    for rows in args.sizes:
+        df, mergedf = synthetic_cohort(rows)
+        results[str(rows)] = benchmark_statistics(df, mergedf, pipeline)
+        if app_module is not None:
+            load_cohort(app_module, df, mergedf, f'benchmark-{rows}')
+            results[str(rows)].update(benchmark_callbacks(app_module))
+
+        for name, timing in results[str(rows)].items():
+            print(f"{rows:>9} rows  {name:<25} {timing['best_seconds'] * 1000:10.2f} ms  ({timing['runs']} runs)")
+
+    print(f'Saved to {save_results(results)}')
+
+    if args.compare:
+        regressions = compare_results(results, args.compare)
+        for size, name, before, after in regressions:
+            print(f'Slower: {name} at {size} rows, {before * 1000:.2f} ms -> {after * 1000:.2f} ms')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
+# ================================= Command Line =================================
@@ -0,0 +1,187 @@
+# ================================= Imports =================================
+# For settings from the environment and the all-NaN warnings of the percentiles
+import os
+import warnings
+
+# For handling data
+import pandas as pd
+import numpy as np
+# For spreading the columns across a process pool, joblib (and loky) load the first time the pool is used
+from lazy_imports import lazy_import
+joblib = lazy_import('joblib')
+
+# Same rules as the point estimates: fewest shared rows and the integer codes of the categories
+from correlation_engine import MIN_PAIRED_ROWS
+from cramers_v_engine import factorize_columns
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Bootstrap Settings =================================
+# Resampled cohorts per interval
+BOOTSTRAP_REPLICATES = int(os.environ.get('BOOTSTRAP_REPLICATES', 1000))
+
+# Share of the resampled values inside the interval (percentile interval)
+CONFIDENCE_LEVEL = 0.95
+
+# Fixed seed so an interval is the same every time it is computed
+BOOTSTRAP_SEED = 0
+
+# Processes the columns are spread across (default one per core)
+BOOTSTRAP_JOBS = int(os.environ.get('BOOTSTRAP_JOBS', os.cpu_count() or 1))
+
+# Replicates x rows x columns below which everything runs in this process, starting the pool costs more
+POOL_MIN_WORK = 50_000_000
+
+# Most replicates x rows (or table cells) held at once, the replicates are drawn in batches of this size
+BATCH_CELLS = 4_000_000
+# ================================= Bootstrap Settings =================================
+
+
+
+
+
+# ================================= Resampling =================================
+# Function to draw the replicates in batches: how many times each row is drawn in each replicate
+    # Every batch is one (replicates, rows) index matrix turned into counts with a single bincount
+    # The same seed gives the same replicates in every process, so all columns share the same resamples
+def resample_counts(rows, replicates, seed=BOOTSTRAP_SEED, width=None):
+    rng = np.random.default_rng(seed)
+    batch = max(BATCH_CELLS // max(rows, width or 0, 1), 1)
+    for start in range(0, replicates, batch):
+        size = min(batch, replicates - start)
+        indices = rng.integers(0, rows, size=(size, rows))
+        # Offset each replicate's indices so one bincount counts every replicate separately
+        indices += rows * np.arange(size)[:, None]
+        yield np.bincount(indices.ravel(), minlength=size * rows).reshape(size, rows).astype('float64')
+
+# Function to get the percentile interval of every column of the replicates (undefined replicates are skipped)
+def percentile_interval(values, level=CONFIDENCE_LEVEL):
+    tail = (1 - level) / 2 * 100
+    # Columns with no defined replicate give NaN without a warning
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanpercentile(values, [tail, 100 - tail], axis=0)
+
+# Function to run the interval of every chunk of columns, across the process pool when the work is large enough
+def run_chunks(func, chunks, work, n_jobs=BOOTSTRAP_JOBS):
+    if n_jobs == 1 or len(chunks) == 1 or work < POOL_MIN_WORK:
+        return [func(*chunk) for chunk in chunks]
+    return joblib.Parallel(n_jobs=n_jobs, backend='loky')(joblib.delayed(func)(*chunk) for chunk in chunks)
+
+# Function to split the columns into one chunk per process
+def column_chunks(columns, n_jobs=BOOTSTRAP_JOBS):
+    return [list(chunk) for chunk in np.array_split(columns, max(min(n_jobs, len(columns)), 1)) if len(chunk)]
+# ================================= Resampling =================================
+
+
+
+
+
+# ================================= Pearson Intervals =================================
+# Function to get the correlation of every column of x with y in every replicate
+    # Each replicate weights the rows by their draw counts, so all replicates are a few matrix products
+def pearson_replicates(x, y, counts):
+    # Rows where both values are present, per column (like the point estimate)
+    present = ~np.isnan(x) & ~np.isnan(y)[:, None]
+    xv = np.where(present, x, 0.0)
+    yv = np.where(present, y[:, None], 0.0)
+
+    n = counts @ present.astype('float64')
+    sum_x = counts @ xv
+    sum_y = counts @ yv
+    sum_xx = counts @ xv ** 2
+    sum_yy = counts @ yv ** 2
+    sum_xy = counts @ (xv * yv)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_xy - sum_x * sum_y / n
+        var_x = sum_xx - sum_x ** 2 / n
+        var_y = sum_yy - sum_y ** 2 / n
+        r = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+
+    # Not defined when a column is constant in the replicate or there are too few rows
+    r[(n < MIN_PAIRED_ROWS) | (var_x <= 1e-12 * sum_xx) | (var_y <= 1e-12 * sum_yy)] = np.nan
+    return r
+
+# Function to get the interval of a chunk of columns
+def pearson_chunk(x, y, replicates, level, seed):
+    r = np.vstack([pearson_replicates(x, y, counts) for counts in resample_counts(len(y), replicates, seed)])
+    return percentile_interval(r, level)
+
+# Function to get the bootstrap interval of the correlation of every numeric column with y
+def pearson_intervals(frame, columns, y_var, replicates=BOOTSTRAP_REPLICATES, level=CONFIDENCE_LEVEL,
+                      seed=BOOTSTRAP_SEED, n_jobs=BOOTSTRAP_JOBS):
+    columns = list(columns)
+    if not columns:
+        return pd.DataFrame({'Lower': [], 'Upper': []}, index=columns, dtype='float64')
+    values = frame[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64')
+    y = pd.to_numeric(frame[y_var], errors='coerce').to_numpy(dtype='float64')
+
+    # Center first so large values (e.g. IDs) do not lose precision
+    values = values - np.nanmean(values, axis=0) if len(values) else values
+    y = y - np.nanmean(y) if len(y) else y
+
+    chunks = [(values[:, positions], y, replicates, level, seed)
+              for positions in column_chunks(np.arange(len(columns)), n_jobs)]
+    intervals = np.hstack(run_chunks(pearson_chunk, chunks, replicates * values.size, n_jobs))
+    return pd.DataFrame({'Lower': intervals[0], 'Upper': intervals[1]}, index=columns)
+# ================================= Pearson Intervals =================================
+
+
+
+
+
+# ================================= Cramer's V Intervals =================================
+# Function to get Cramer's V of a coded pair of columns in every replicate
+    # Each replicate's contingency table is the draw counts summed per cell, all replicates in one reduceat
+def cramers_v_replicates(x_codes, x_size, y_codes, y_size, counts):
+    # Rows where either value is missing are left out (like the point estimate)
+    both = (x_codes >= 0) & (y_codes >= 0)
+    cells = x_codes[both].astype('int64') * y_size + y_codes[both]
+    if len(cells) == 0:
+        return np.full(len(counts), np.nan)
+
+    # Sum the counts of the rows in each cell, with the rows sorted by cell
+    order = np.argsort(cells, kind='stable')
+    cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+    tables = np.zeros((len(counts), x_size * y_size))
+    tables[:, cells[starts]] = np.add.reduceat(counts[:, both][:, order], starts, axis=1)
+    tables = tables.reshape(len(counts), x_size, y_size)
+
+    # Chi-squared of every table, categories not drawn in a replicate are left out of its table
+    row_totals = tables.sum(axis=2, keepdims=True)
+    column_totals = tables.sum(axis=1, keepdims=True)
+    total = row_totals.sum(axis=(1, 2))
+    expected = row_totals * column_totals / total[:, None, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        chi2 = np.where(expected > 0, (tables - expected) ** 2 / expected, 0.0).sum(axis=(1, 2))
+        min_dim = np.minimum((row_totals[:, :, 0] > 0).sum(axis=1), (column_totals[:, 0, :] > 0).sum(axis=1)) - 1
+        # A single category gives 0 / 0 which is NaN, the same as the point estimate
+        return np.sqrt((chi2 / total) / min_dim)
+
+# Function to get the interval of a chunk of coded columns against the coded y
+def cramers_v_chunk(coded_columns, y_codes, y_size, replicates, level, seed):
+    width = max((x_size * y_size for _, x_size in coded_columns), default=0)
+    v = np.vstack([np.column_stack([cramers_v_replicates(x_codes, x_size, y_codes, y_size, counts)
+                                    for x_codes, x_size in coded_columns])
+                   for counts in resample_counts(len(y_codes), replicates, seed, width)])
+    return percentile_interval(v, level)
+
+# Function to get the bootstrap interval of Cramer's V of every categorical column against y
+def cramers_v_intervals(frame, columns, y_var, replicates=BOOTSTRAP_REPLICATES, level=CONFIDENCE_LEVEL,
+                        seed=BOOTSTRAP_SEED, n_jobs=BOOTSTRAP_JOBS):
+    columns = list(columns)
+    if not columns:
+        return pd.DataFrame({'Lower': [], 'Upper': []}, index=columns, dtype='float64')
+    coded = factorize_columns(frame, columns if y_var in columns else columns + [y_var])
+    y_codes, y_size = coded[y_var]
+
+    chunks = [([coded[col] for col in chunk], y_codes, y_size, replicates, level, seed)
+              for chunk in column_chunks(columns, n_jobs)]
+    intervals = np.hstack(run_chunks(cramers_v_chunk, chunks, replicates * len(frame) * len(columns), n_jobs))
+    return pd.DataFrame({'Lower': intervals[0], 'Upper': intervals[1]}, index=columns)
+# ================================= Cramer's V Intervals =================================
@@ -0,0 +1,201 @@
+# ================================= Imports =================================
+# For the key, timing and the shared store
+import os
+import json
+import time
+import pickle
+import sqlite3
+import inspect
+import hashlib
+import threading
+# For keeping the callback's name when it is wrapped
+from functools import wraps
+
+# For keeping the store in the same folder as the data cache
+from data_cache import CACHE_DIR
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Cache Settings =================================
+# SQLite file shared by every gunicorn worker on the machine
+CACHE_PATH = os.path.join(CACHE_DIR, 'callback_cache.sqlite')
+
+# Entries older than this are computed again (seconds)
+DEFAULT_TTL = 24 * 60 * 60
+# Total size of the stored results before the least recently used are removed (bytes)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Seconds between writes of the hit counts and access times, so a cache hit does not take the write lock
+    # (counts not written yet are lost if the worker stops, they are only statistics)
+FLUSH_SECONDS = 5
+# ================================= Cache Settings =================================
+
+
+
+
+
+# ================================= Shared Result Cache =================================
+# Cache of callback results keyed on (callback, inputs, dataset version), stored in SQLite
+    # Results of older versions are never read again, they are removed by the TTL and the size cap
+class ResultCache:
+    def __init__(self, version, path=CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, version_arg=None):
+        # Function that returns the current dataset version, given the value of the callback's version_arg
+        # argument when it is set (e.g. the cohort, so a change to one cohort keeps the results of the others)
+        self.version = version
+        self.version_arg = version_arg
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # One connection per thread (and per process after a fork)
+        self.local = threading.local()
+        # Counts for this process, the shared counts are kept in the store
+        self.hits = 0
+        self.misses = 0
+
+        # Hit and miss counts and access times not written to the store yet
+        self.pending_lock = threading.Lock()
+        self.pending_counts = {}
+        self.pending_access = {}
+        self.last_flush = time.monotonic()
+
+    # Function to get this thread's connection, creating the tables the first time
+    def connection(self):
+        if getattr(self.local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            # WAL lets workers read while another worker writes
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, callback TEXT, version TEXT, '
+                         'value BLOB, size INTEGER, created REAL, accessed REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            conn.execute('CREATE TABLE IF NOT EXISTS counters (callback TEXT PRIMARY KEY, '
+                         'hits INTEGER DEFAULT 0, misses INTEGER DEFAULT 0)')
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return self.local.conn
+
+    # Function to build the key for a call
+    def make_key(self, callback, args, version):
+        inputs = json.dumps(args, sort_keys=True, default=str)
+        return hashlib.sha256(f'{callback}|{version}|{inputs}'.encode()).hexdigest()
+
+    # Function to count a hit or miss for a callback, written to the store with the next flush
+    def count(self, callback, hit):
+        with self.pending_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            counts = self.pending_counts.setdefault(callback, [0, 0])
+            counts[0 if hit else 1] += 1
+        if time.monotonic() - self.last_flush >= FLUSH_SECONDS:
+            self.flush()
+
+    # Function to write the pending counts and access times in one transaction
+    def flush(self):
+        with self.pending_lock:
+            counts, self.pending_counts = self.pending_counts, {}
+            access, self.pending_access = self.pending_access, {}
+            self.last_flush = time.monotonic()
+        if not counts and not access:
+            return
+
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('INSERT INTO counters (callback, hits, misses) VALUES (?, ?, ?) '
+                             'ON CONFLICT(callback) DO UPDATE SET hits = hits + excluded.hits, '
+                             'misses = misses + excluded.misses',
+                             [(callback, hits, misses) for callback, (hits, misses) in counts.items()])
+            conn.executemany('UPDATE entries SET accessed = ? WHERE key = ?',
+                             [(accessed, key) for key, accessed in access.items()])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    # Function to look up a stored result, returns (found, value)
+    def get(self, key):
+        conn = self.connection()
+        row = conn.execute('SELECT value, created FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return False, None
+
+        # Expired, remove it and compute again
+        now = time.time()
+        if now - row[1] > self.ttl:
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            return False, None
+
+        # The access time is only kept in memory here, it is written with the next flush
+        with self.pending_lock:
+            self.pending_access[key] = now
+        return True, pickle.loads(row[0])
+
+    # Function to store a result, then remove expired entries and the least recently used ones over the size cap
+        # Runs on every insert, so the store stays bounded even when the dataset version never changes
+    def set(self, key, callback, version, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        # Write the pending access times first so the least recently used entries are the right ones
+        self.flush()
+        conn = self.connection()
+        conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     (key, callback, version, blob, len(blob), now, now))
+        conn.execute('DELETE FROM entries WHERE created < ?', (now - self.ttl,))
+
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        while total > self.max_bytes:
+            oldest = conn.execute('SELECT key, size FROM entries ORDER BY accessed LIMIT 1').fetchone()
+            if oldest is None:
+                break
+            conn.execute('DELETE FROM entries WHERE key = ?', (oldest[0],))
+            total -= oldest[1]
+
+    # Decorator to cache a callback, its inputs must be JSON-like (dropdown values, lists of columns)
+    def memoize(self, func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args):
+            if self.version_arg:
+                call = signature.bind(*args)
+                call.apply_defaults()
+                version = self.version(call.arguments[self.version_arg])
+            else:
+                version = self.version()
+
+            key = self.make_key(func.__name__, args, version)
+            found, value = self.get(key)
+            self.count(func.__name__, found)
+            if found:
+                return value
+
+            value = func(*args)
+            self.set(key, func.__name__, version, value)
+            return value
+        return wrapper
+
+    # Function to report the hit and miss counts and the size of the store
+    def report(self):
+        self.flush()
+        conn = self.connection()
+        counters = {callback: {'hits': hits, 'misses': misses}
+                    for callback, hits, misses in conn.execute('SELECT callback, hits, misses FROM counters')}
+        entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {'process': {'hits': self.hits, 'misses': self.misses},
+                'shared': counters,
+                'entries': entries,
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl}
+
+    # Function to empty the store (e.g. after the source data is reloaded)
+    def clear(self):
+        self.connection().execute('DELETE FROM entries')
+# ================================= Shared Result Cache =================================
@@ -0,0 +1,210 @@
+# ================================= Imports =================================
+# For timing, the ring buffers and the profiles
+import io
+import os
+import time
+import pstats
+import cProfile
+import threading
+from collections import defaultdict, deque
+# For keeping the callback's name when it is wrapped
+from functools import wraps
+
+# For the percentiles
+import numpy as np
+
+# For the samples of background callbacks, which run in other processes
+import diskcache
+# For the request the callback is running in
+from flask import g, has_request_context
+
+# For keeping the profiles and the shared samples next to the data cache
+from data_cache import CACHE_DIR
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Timing Settings =================================
+# Samples kept per callback (oldest are dropped)
+RING_SIZE = 1000
+
+# Percentiles reported for every measurement
+QUANTILES = [0.5, 0.95, 0.99]
+
+# What is measured for every call
+    # payload_bytes is the size sent (after compression), uncompressed_bytes the size before
+metrics = ['wall_seconds', 'cpu_seconds', 'serialize_seconds', 'payload_bytes', 'uncompressed_bytes']
+
+# Folder for the cProfile captures
+PROFILE_DIR = os.path.join(CACHE_DIR, 'profiles')
+# Profile every callback, only on a server started with PROFILE_CALLBACKS=1 (a page address cannot turn it on)
+PROFILE_CALLBACKS = os.environ.get('PROFILE_CALLBACKS') == '1'
+# Profiles kept in the folder, the oldest are removed when a new one is saved
+MAX_PROFILES = int(os.environ.get('MAX_PROFILES', 50))
+# Folder for the samples background callbacks send back to the server process
+SHARED_SAMPLES_DIR = os.path.join(CACHE_DIR, 'timing')
+# ================================= Timing Settings =================================
+
+
+
+
+
+# ================================= Callback Timer =================================
+# Records wall time, CPU time, serialize time and payload size of every callback in ring buffers
+class CallbackTimer:
+    def __init__(self, size=RING_SIZE, profile_dir=PROFILE_DIR, shared_dir=SHARED_SAMPLES_DIR,
+                 profiling=PROFILE_CALLBACKS, max_profiles=MAX_PROFILES):
+        self.size = size
+        self.profile_dir = profile_dir
+        self.profiling = profiling
+        self.max_profiles = max_profiles
+        self.samples = defaultdict(lambda: {metric: deque(maxlen=size) for metric in metrics})
+        self.lock = threading.Lock()
+        # Background callbacks run in a separate process, so they send their samples through the disk
+        self.shared = diskcache.Deque(directory=shared_dir, maxlen=size)
+
+    # Function to add one call's measurements to the ring buffers
+    def record(self, callback, sample):
+        with self.lock:
+            for metric, value in sample.items():
+                self.samples[callback][metric].append(value)
+
+    # Function to move the samples of background callbacks into this process
+    def collect_shared(self):
+        while True:
+            try:
+                callback, sample = self.shared.popleft()
+            except IndexError:
+                break
+            self.record(callback, sample)
+
+    # Function to check whether the callbacks should be profiled
+    def profile_requested(self):
+        # Set on the server only, so visitors cannot fill the disk with profiles
+        return self.profiling
+
+    # Function to save a profile so it can be opened with pstats or snakeviz
+    def save_profile(self, callback, profiler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        # Date, time and nanoseconds so profiles taken in the same second do not overwrite each other
+        stamp = f'{time.strftime("%Y%m%d-%H%M%S")}-{time.time_ns() % 10 ** 9:09d}'
+        path = os.path.join(self.profile_dir, f'{callback}-{stamp}-{os.getpid()}.prof')
+        profiler.dump_stats(path)
+        self.prune_profiles()
+        return path
+
+    # Function to remove the oldest profiles so only max_profiles are kept
+    def prune_profiles(self):
+        for name in self.profiles()[self.max_profiles:]:
+            try:
+                os.remove(os.path.join(self.profile_dir, name))
+            except FileNotFoundError:
+                # Another worker removed it first
+                pass
+
+    # Decorator to time a callback
+    def wrap(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = cProfile.Profile() if self.profile_requested() else None
+            wall_start = time.perf_counter()
+            # Thread CPU time, so other requests running at the same time are not counted
+            cpu_start = time.thread_time()
+            if profiler:
+                profiler.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if profiler:
+                    profiler.disable()
+                    self.save_profile(func.__name__, profiler)
+                sample = {'wall_seconds': time.perf_counter() - wall_start,
+                          'cpu_seconds': time.thread_time() - cpu_start}
+
+                # Serialize time and payload size are added once the response is built
+                if has_request_context():
+                    g.timed_callback = (func.__name__, sample, time.perf_counter())
+                else:
+                    self.shared.append((func.__name__, sample))
+        return wrapper
+
+    # Function run after every request, finishes the sample of the callback it ran
+    def finish_request(self, response):
+        timed = g.pop('timed_callback', None)
+        if timed is not None:
+            callback, sample, callback_end = timed
+            # Dash turns the result into JSON between the end of the callback and here
+            sample['serialize_seconds'] = time.perf_counter() - callback_end
+            sample['payload_bytes'] = response.calculate_content_length() or 0
+            sample['uncompressed_bytes'] = g.get('uncompressed_bytes', sample['payload_bytes'])
+            self.record(callback, sample)
+        return response
+
+    # Function to time every callback registered on the app from now on
+    def instrument(self, app):
+        register_callback = app.callback
+
+        def timed_callback(*args, **kwargs):
+            register = register_callback(*args, **kwargs)
+            return lambda func: register(self.wrap(func))
+
+        app.callback = timed_callback
+        app.server.after_request(self.finish_request)
+
+    # Function to get the count and percentiles of every measurement per callback
+    def report(self):
+        self.collect_shared()
+        with self.lock:
+            samples = {callback: {metric: list(values) for metric, values in buffers.items()}
+                       for callback, buffers in self.samples.items()}
+
+        report = {}
+        for callback, buffers in samples.items():
+            report[callback] = {}
+            for metric, values in buffers.items():
+                if values:
+                    percentiles = np.quantile(values, QUANTILES)
+                    report[callback][metric] = {'count': len(values), 'sum': float(np.sum(values)),
+                                                **{f'p{int(q * 100)}': float(value)
+                                                   for q, value in zip(QUANTILES, percentiles)}}
+        return report
+
+    # Function to write the report in the Prometheus text format (one summary per measurement)
+    def prometheus_text(self):
+        report = self.report()
+        lines = []
+        for metric in metrics:
+            name = f'dash_callback_{metric}'
+            lines.append(f'# TYPE {name} summary')
+            for callback, measurements in sorted(report.items()):
+                if metric not in measurements:
+                    continue
+                values = measurements[metric]
+                for q in QUANTILES:
+                    lines.append(f'{name}{{callback="{callback}",quantile="{q}"}} {values[f"p{int(q * 100)}"]}')
+                lines.append(f'{name}_sum{{callback="{callback}"}} {values["sum"]}')
+                lines.append(f'{name}_count{{callback="{callback}"}} {values["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    # Function to list the saved profiles, newest first
+    def profiles(self):
+        if not os.path.isdir(self.profile_dir):
+            return []
+        times = {}
+        for name in os.listdir(self.profile_dir):
+            try:
+                times[name] = os.path.getmtime(os.path.join(self.profile_dir, name))
+            except FileNotFoundError:
+                # Removed by another worker while listing
+                continue
+        return sorted(times, key=times.get, reverse=True)
+
+    # Function to get the slowest functions of a saved profile as text
+    def profile_summary(self, name, limit=30):
+        path = os.path.join(self.profile_dir, os.path.basename(name))
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+# ================================= Callback Timer =================================
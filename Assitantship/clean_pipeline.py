@@ -0,0 +1,214 @@
+# ================================= Imports =================================
+# For paths, the manifest and the command line
+import os
+import json
+import argparse
+
+# For handling data
+import pandas as pd
+
+# For reading the workbooks through the Arrow cache and hashing them
+from data_cache import read_excel_cached, file_content_hash, atomic_write
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Pipeline Settings =================================
+# Folder with the source workbooks
+SOURCE_DIR = '/Users/udoychowdhury/Documents/Assitantship'
+# Folder the cleaned Parquet files are written to
+OUTPUT_DIR = os.path.join(SOURCE_DIR, 'clean')
+
+# Conditional admits merged with their applications, joined to every term's registrations
+MERGED_ADMITS_FILE = 'Merged Conditionally Admitted Students.xlsx'
+# Registration workbook for each term, new terms are added here or passed on the command line
+TERM_FILES = ['Fall 2022.xlsx']
+# Conditional admits before geocoding (the sheet the dashboard's first workbook was made from)
+ADMITS_FILE = 'Conditionally Admitted Students.xlsx'
+ADMITS_SHEET = 'Conditional Admits'
+
+# Unneeded columns after the merge
+columns_to_drop = ['Major_Desc_x', 'Major_2_Desc', 'Minor_1_2', 'Minor_2_2']
+
+# Columns where a missing value means No
+no_columns = ['HOUSING_INTEREST', 'HOUS_DEP_PAID', 'FAFSA_IND']
+
+# The coordinates for each county
+county_coordinates = pd.DataFrame([
+    ('NJ', 'Ocean', 39.8359, -74.2029),
+    ('NJ', 'Gloucester', 39.7067, -75.1299),
+    ('NJ', 'Burlington', 39.8670, -74.6693),
+    ('NJ', 'Middlesex', 40.4279, -74.3960),
+    ('NJ', 'Atlantic', 39.4704, -74.4522),
+    ('NJ', 'Camden', 39.9259, -75.1196),
+    ('NJ', 'Monmouth', 40.2584, -74.1285),
+    ('NJ', 'Bergen', 40.9601, -74.0716),
+    ('NJ', 'Cape May', 39.0240, -74.9145),
+    ('NJ', 'Cumberland', 39.4070, -75.1719),
+    ('NJ', 'Sussex', 41.1381, -74.6912),
+    ('NJ', 'Essex', 40.7879, -74.3687),
+    ('NJ', 'Mercer', 40.2803, -74.7123),
+    ('NJ', 'Hudson', 40.7375, -74.0754),
+    ('NJ', 'Union', 40.6595, -74.2884),
+    ('NJ', 'Salem', 39.5560, -75.3316),
+    ('NJ', 'Somerset', 40.5656, -74.6704),
+    ('NJ', 'Morris', 40.8339, -74.6060),
+    ('NJ', 'Passaic', 41.0455, -74.2730),
+    ('NJ', 'Warren', 40.8597, -75.0037),
+    ('NJ', 'Hunterdon', 40.5795, -74.9160),
+    ('DE', 'Out of State', 39.1582, -75.5244),
+    ('CT', 'Out of State', 41.7637, -72.6851),
+    ('NY', 'Out of State', 42.6526, -73.7562),
+    ('PA', 'Out of State', 40.2698, -76.8756)
+], columns=['HS_STATE', 'HS_COUNTY', 'HS_LAT', 'HS_LONG'])
+# ================================= Pipeline Settings =================================
+
+
+
+
+
+# ================================= Cleaning Steps =================================
+# Function to fill missing values by data type in one step per type instead of a loop over columns
+def fill_by_dtype(frame, text_fill, number_fill=0):
+    # Unlike the notebook, dates are left out: filling NaT with 0 turns the column into mixed dates and numbers,
+    # which cannot be written to Parquet, so missing dates stay missing
+    text_columns = frame.select_dtypes(include='object').columns
+    number_columns = frame.select_dtypes(include='number').columns
+    fills = {**{col: text_fill for col in text_columns}, **{col: number_fill for col in number_columns}}
+    return frame.fillna(fills)
+
+# Function to merge a term's registrations with the conditional admits and clean the result
+def clean_term(term_frame, merged_admits):
+    # Merge the DataFrames
+    merged_df = pd.merge(term_frame, merged_admits, on='ID', how='inner')
+
+    # Drop unneeded columns
+    merged_df = merged_df.drop(columns=columns_to_drop, errors='ignore')
+
+    # Fill object data types with 'Null' and numeric data types with 0
+    return fill_by_dtype(merged_df, 'Null')
+
+# Function to add the latitude and longitude of each student's high school county with a join
+def geocode(frame):
+    geocoded = frame.drop(columns=['HS_LAT', 'HS_LONG'], errors='ignore').merge(
+        county_coordinates, on=['HS_STATE', 'HS_COUNTY'], how='left')
+
+    # Put HS_LAT and HS_LONG right after HS_COUNTY
+    columns = list(geocoded.columns[:-2])
+    county_index = columns.index('HS_COUNTY')
+    return geocoded[columns[:county_index + 1] + ['HS_LAT', 'HS_LONG'] + columns[county_index + 1:]]
+
+# Function to clean the conditional admits for the dashboard's first workbook
+def clean_admits(admits):
+    admits = geocode(admits)
+
+    # Fill null values with N
+    admits = admits.fillna({col: 'N' for col in no_columns if col in admits.columns})
+
+    # Make all object into null and numerical into 0 (the coordinates stay missing for unknown counties)
+    filled = fill_by_dtype(admits.drop(columns=['HS_LAT', 'HS_LONG']), 'null')
+    filled[['HS_LAT', 'HS_LONG']] = admits[['HS_LAT', 'HS_LONG']]
+    return filled[admits.columns]
+# ================================= Cleaning Steps =================================
+
+
+
+
+
+# ================================= Incremental Runs =================================
+# Function to read the manifest of what each output was built from
+def read_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, 'manifest.json')) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+# Function to save the manifest
+def write_manifest(output_dir, manifest):
+    # Written to a temporary file first, so a run killed mid-write leaves the old manifest instead of a broken one
+    def write_json(temp_path):
+        with open(temp_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+    atomic_write(os.path.join(output_dir, 'manifest.json'), write_json)
+
+# Function to get a name for a term that is safe to use in a file name
+def term_name(term_file):
+    return os.path.splitext(os.path.basename(term_file))[0].replace(' ', '_')
+
+# Function to run the pipeline, only terms whose sources changed are processed again
+def run_pipeline(source_dir=SOURCE_DIR, output_dir=OUTPUT_DIR, term_files=TERM_FILES, admits_file=ADMITS_FILE,
+                 admits_sheet=ADMITS_SHEET, force=False):
+    os.makedirs(os.path.join(output_dir, 'terms'), exist_ok=True)
+    manifest = {} if force else read_manifest(output_dir)
+    new_manifest = {}
+    processed = []
+
+    # The merged admits feed every term, so a change there means every term is processed again
+    merged_path = os.path.join(source_dir, MERGED_ADMITS_FILE)
+    merged_hash = file_content_hash(merged_path)
+    merged_admits = None
+
+    for term_file in term_files:
+        term_path = os.path.join(source_dir, term_file)
+        sources = {'term': file_content_hash(term_path), 'merged_admits': merged_hash}
+        output_path = os.path.join(output_dir, 'terms', term_name(term_file) + '.parquet')
+        new_manifest[term_file] = sources
+
+        # Same sources as last run and the output is still there, nothing to do
+        if manifest.get(term_file) == sources and os.path.exists(output_path):
+            continue
+
+        if merged_admits is None:
+            merged_admits = read_excel_cached(merged_path)
+        term_frame = clean_term(read_excel_cached(term_path), merged_admits)
+        # Record the term so the terms can be told apart once they are combined
+        term_frame.insert(0, 'Source_Term', term_name(term_file))
+        term_frame.to_parquet(output_path, index=False)
+        processed.append(term_file)
+
+    # Combine the terms into the file the dashboard reads, only when a term changed or was removed
+    full_path = os.path.join(output_dir, 'Full Conditionally Admitted Students.parquet')
+    if processed or set(manifest) - {'admits'} != set(new_manifest) or not os.path.exists(full_path):
+        terms = [pd.read_parquet(os.path.join(output_dir, 'terms', term_name(term_file) + '.parquet'))
+                 for term_file in term_files]
+        pd.concat(terms, ignore_index=True).to_parquet(full_path, index=False)
+
+    # Geocode the conditional admits when their workbook changed
+    admits_path = os.path.join(source_dir, admits_file)
+    if os.path.exists(admits_path):
+        admits_hash = {'admits': file_content_hash(admits_path), 'sheet': admits_sheet}
+        admits_output = os.path.join(output_dir, 'Conditionally Admitted Students Updated.parquet')
+        if manifest.get('admits') != admits_hash or not os.path.exists(admits_output):
+            clean_admits(read_excel_cached(admits_path, sheet_name=admits_sheet)).to_parquet(admits_output, index=False)
+            processed.append(admits_file)
+        new_manifest['admits'] = admits_hash
+
+    write_manifest(output_dir, new_manifest)
+    return processed
+# ================================= Incremental Runs =================================
+
+
+
+
+
+# ================================= Command Line =================================
+# Usage: python clean_pipeline.py --terms "Fall 2022.xlsx" "Spring 2023 Registered Students.xlsx"
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Clean the conditional admit workbooks into Parquet files.')
+    parser.add_argument('--source-dir', default=SOURCE_DIR, help='folder with the source workbooks')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='folder for the Parquet files')
+    parser.add_argument('--terms', nargs='+', default=TERM_FILES, help='registration workbook for each term')
+    parser.add_argument('--admits', default=ADMITS_FILE, help='conditional admits workbook to geocode')
+    parser.add_argument('--force', action='store_true', help='process every term again')
+    args = parser.parse_args(argv)
+
+    processed = run_pipeline(args.source_dir, args.output_dir, args.terms, args.admits, force=args.force)
+    print(f"Processed: {', '.join(processed)}" if processed else 'Everything is up to date.')
+
+
+if __name__ == '__main__':
+    main()
+# ================================= Command Line =================================
@@ -0,0 +1,406 @@
+# ================================= Imports =================================
+# For paths, the cohort list, the command line and the stale artifact folders
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import argparse
+import threading
+# For keeping the most recently used cohorts in memory
+from collections import OrderedDict
+
+# For handling data
+import pandas as pd
+
+# For reading the workbooks through the Arrow cache, hashing the sources and writing artifacts safely
+from data_cache import CACHE_DIR, ensure_cache, read_excel_cached, file_content_hash, atomic_write
+# For storing the loaded frames in compact types
+from data_model import compact_frame, text_columns, number_columns
+# The precomputed artifacts of each cohort
+from correlation_engine import pearson_matrix
+from cramers_v_engine import cramers_v_matrix
+from geo_aggregation import aggregate_counties
+from onehot_engine import encode_column
+from aggregate_cube import build_cube
+from bootstrap_ci import pearson_intervals, cramers_v_intervals, BOOTSTRAP_REPLICATES
+# For the SQL queries over the cohort's frames
+from sql_engine import SQLEngine
+# For the folder of the source workbooks and the per-term Parquet files written by the cleaning pipeline
+from clean_pipeline import SOURCE_DIR, OUTPUT_DIR
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Cohort Settings =================================
+# The two workbooks of the default cohort (every term together)
+DEFAULT_COHORT = 'All Terms'
+DEFAULT_FILE = os.path.join(SOURCE_DIR, 'Conditionally Admitted Students Updated.xlsx')
+DEFAULT_MERGE_FILE = os.path.join(SOURCE_DIR, 'Full Conditionally Admitted Students.xlsx')
+
+# Extra cohorts, a JSON list of {"name": ..., "file": ..., "merge_file": ...} (paths relative to the JSON file)
+COHORTS_FILE = os.environ.get('COHORTS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cohorts.json'))
+
+# Cohorts kept in memory at once, the least recently used one is dropped when another is opened
+MAX_LOADED_COHORTS = int(os.environ.get('MAX_LOADED_COHORTS', 2))
+
+# Seconds between checks of the cohort files, new terms and cohorts are picked up without a restart
+RESCAN_SECONDS = 5
+
+# Folder with the precomputed artifacts, one folder per cohort and data version
+ARTIFACT_DIR = os.path.join(CACHE_DIR, 'cohorts')
+
+# Admits file written by the cleaning pipeline, used for the students of each cleaned term
+CLEAN_ADMITS_FILE = 'Conditionally Admitted Students Updated.parquet'
+# ================================= Cohort Settings =================================
+
+
+
+
+
+# ================================= Cohort Sources =================================
+# Function to read a source file, the workbooks go through the Arrow cache
+def read_source(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return read_excel_cached(path)
+
+# Function to get the content hash of a source file
+def source_version(path):
+    if path.endswith('.parquet'):
+        return file_content_hash(path)
+    return ensure_cache(path)['sha256']
+
+# Function to get a name for a cohort that is safe to use as a folder name
+def folder_name(name):
+    return ''.join(char if char.isalnum() or char in '-_' else '_' for char in name)
+
+# Function to read the extra cohorts listed in the cohorts file (none if there is no file)
+def read_cohorts_file(path=COHORTS_FILE):
+    try:
+        with open(path) as cohorts_file:
+            cohorts = json.load(cohorts_file)
+    except OSError:
+        return []
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    return [{**cohort,
+             'file': os.path.join(base_dir, cohort['file']),
+             'merge_file': os.path.join(base_dir, cohort['merge_file'])} for cohort in cohorts]
+
+# Function to list one cohort per term cleaned by the pipeline (clean_pipeline.py)
+    # The term's registrations are the merged frame and the admits are limited to the students of that term
+def pipeline_cohorts(output_dir=OUTPUT_DIR):
+    admits_path = os.path.join(output_dir, CLEAN_ADMITS_FILE)
+    if not os.path.exists(admits_path):
+        return []
+
+    return [{'name': os.path.splitext(os.path.basename(term_path))[0].replace('_', ' '),
+             'file': admits_path,
+             'merge_file': term_path,
+             'same_students': True}
+            for term_path in sorted(glob.glob(os.path.join(output_dir, 'terms', '*.parquet')))]
+
+# Function to list every cohort: the default workbooks, the cohorts file and the cleaned terms
+def all_cohorts(file=DEFAULT_FILE, merge_file=DEFAULT_MERGE_FILE):
+    return [{'name': DEFAULT_COHORT, 'file': file, 'merge_file': merge_file}] + read_cohorts_file() + pipeline_cohorts()
+# ================================= Cohort Sources =================================
+
+
+
+
+
+# ================================= Cohort =================================
+# One loaded cohort: both frames, their column lists and the artifacts computed from them
+class Cohort:
+    def __init__(self, name, df, mergedf, version, artifact_dir=None):
+        self.name = name
+        self.version = version
+        # Text columns become categories or nullable strings and numbers are downcast, missing values stay missing
+        self.df = compact_frame(df)
+        self.mergedf = compact_frame(mergedf)
+
+        # Names of the Numeric and Object columns for later use, each tab reads its columns from the one frame
+        self.numerical_columns = number_columns(self.df)
+        self.object_columns = text_columns(self.df)
+        self.merge_categorical_columns = text_columns(self.mergedf)
+        self.merge_numerical_columns = number_columns(self.mergedf)
+
+        # Folder the artifacts are saved to (None keeps them in memory only)
+        self.artifact_dir = artifact_dir
+        self.artifacts = {}
+        self.lock = threading.Lock()
+        # Lock of each artifact being built, so a slow one (a bootstrap) does not hold up the others
+        self.building = {}
+
+        # SQL engine over both frames, made on the first query and unloaded with the cohort
+        self.sql = None
+
+    # Function to get an artifact, from memory, else from disk, else computed once and saved
+        # Built outside the cohort lock, threads asking for the same artifact wait for the one building it
+    def artifact(self, name, build):
+        with self.lock:
+            if name in self.artifacts:
+                return self.artifacts[name]
+            building = self.building.setdefault(name, threading.Lock())
+
+        with building:
+            with self.lock:
+                if name in self.artifacts:
+                    return self.artifacts[name]
+
+            path = os.path.join(self.artifact_dir, folder_name(name) + '.pkl') if self.artifact_dir else None
+            if path and os.path.exists(path):
+                value = pd.read_pickle(path)
+            else:
+                value = build()
+                if path:
+                    os.makedirs(self.artifact_dir, exist_ok=True)
+                    atomic_write(path, lambda temp_path: pd.to_pickle(value, temp_path))
+
+            with self.lock:
+                self.artifacts[name] = value
+                self.building.pop(name, None)
+            return value
+
+    # Function to get the Pearson correlation matrix of the numeric columns
+    def pearson(self):
+        return self.artifact('pearson', lambda: pearson_matrix(self.df, self.numerical_columns))
+
+    # Function to get the Cramer's V matrix of the object columns
+        # Skip the 'ID' column since it shows inaccurate result
+    def cramers_v(self):
+        return self.artifact('cramers_v', lambda: cramers_v_matrix(
+            self.df, [col for col in self.object_columns if col != 'ID']))
+
+    # Function to get the bootstrap intervals of every numeric column's correlation with y, once per target
+    def pearson_intervals(self, y_var, replicates=BOOTSTRAP_REPLICATES):
+        return self.artifact(f'pearson-intervals-{y_var}-{replicates}', lambda: pearson_intervals(
+            self.df, self.numerical_columns, y_var, replicates))
+
+    # Function to get the bootstrap intervals of every object column's Cramer's V with y, once per target
+    def cramers_v_intervals(self, y_var, replicates=BOOTSTRAP_REPLICATES):
+        return self.artifact(f'cramers-v-intervals-{y_var}-{replicates}', lambda: cramers_v_intervals(
+            self.df, [col for col in self.object_columns if col != 'ID'], y_var, replicates))
+
+    # Function to get the East Coast students grouped by county
+    def counties(self):
+        return self.artifact('counties', lambda: aggregate_counties(self.df))
+
+    # Function to get the one-hot encoding of a categorical column of the merged frame
+    def encoding(self, col):
+        return self.artifact(f'encoding-{col}', lambda: encode_column(self.mergedf[col]))
+
+    # Function to get the success rate cube of the merged frame, for the drilldown tab
+    def cube(self):
+        return self.artifact('cube', lambda: build_cube(self.mergedf))
+
+    # Function to get the SQL engine with the df and mergedf tables of this cohort
+    def sql_engine(self):
+        with self.lock:
+            if self.sql is None:
+                self.sql = SQLEngine({'df': self.df, 'mergedf': self.mergedf})
+            return self.sql
+
+    # Function to compute every artifact now, so opening the cohort later only reads them
+    def precompute(self):
+        self.pearson()
+        self.cramers_v()
+        self.counties()
+        self.cube()
+        for col in self.merge_categorical_columns:
+            self.encoding(col)
+# ================================= Cohort =================================
+
+
+
+
+
+# ================================= Cohort Registry =================================
+# Registry of the cohorts that can be picked in the dashboard, keeps a bounded number of them loaded
+class CohortRegistry:
+    def __init__(self, cohorts, max_loaded=MAX_LOADED_COHORTS, artifact_dir=ARTIFACT_DIR,
+                 watch_paths=(COHORTS_FILE, OUTPUT_DIR, os.path.join(OUTPUT_DIR, 'terms'))):
+        # A list of cohorts, or a function that lists them, called again whenever the cohort files change
+        self.list_cohorts = cohorts if callable(cohorts) else (lambda: cohorts)
+        # Files and folders whose changes can add or remove cohorts (the cohorts file, the cleaned terms)
+        self.watch_paths = list(watch_paths)
+        self.max_loaded = max_loaded
+        self.artifact_dir = artifact_dir
+
+        self.lock = threading.RLock()
+        self.loaded = OrderedDict()
+        # Cohorts added in memory with add(), kept since they cannot be read again from files
+        self.added = OrderedDict()
+        # Content hash of each source file by (mtime, size), so unchanged files are not hashed again
+        self.hashes = {}
+        self.cohorts = OrderedDict()
+        self.versions = {}
+        self.checked = time.monotonic()
+
+        self.scan()
+        if not self.cohorts:
+            raise FileNotFoundError(f"None of the cohort files exist: {[cohort['file'] for cohort in self.list_cohorts()]}")
+
+    # Function to get the content hash of a source file, hashed again only when its mtime or size changed
+    def file_version(self, path):
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self.hashes.get(path, (None, None))[0] != key:
+            self.hashes[path] = (key, source_version(path))
+        return self.hashes[path][1]
+
+    # Function to get the mtime and size of the watched paths and every cohort file, to tell if anything changed
+    def sources_stamp(self):
+        paths = self.watch_paths + [path for cohort in self.cohorts.values()
+                                    for path in (cohort['file'], cohort['merge_file']) if path]
+        stamp = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stamp.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append((path, None, None))
+        return stamp
+
+    # Function to list the cohorts again and work out their versions
+        # Cohorts whose files are missing are left out, the first cohort is the default (or the last added one)
+        # Loaded cohorts that changed or are gone are dropped, so they are read again when next opened
+    def scan(self):
+        with self.lock:
+            cohorts = OrderedDict((cohort['name'], cohort) for cohort in self.list_cohorts()
+                                  if os.path.exists(cohort['file']) and os.path.exists(cohort['merge_file']))
+            if cohorts:
+                # Version of each cohort (content hash of both files), artifacts and cached results are kept per version
+                versions = {name: f"{self.file_version(cohort['file'])[:12]}-{self.file_version(cohort['merge_file'])[:12]}"
+                            for name, cohort in cohorts.items()}
+            else:
+                # A scan while the files are being replaced keeps the cohorts from the last scan
+                cohorts = OrderedDict((name, cohort) for name, cohort in self.cohorts.items() if cohort['file'])
+                versions = {name: self.versions[name] for name in cohorts}
+            for name, cohort in self.added.items():
+                cohorts[name] = {'name': name, 'file': None, 'merge_file': None}
+                versions[name] = cohort.version
+
+            for name in list(self.loaded):
+                if versions.get(name) != self.versions.get(name):
+                    del self.loaded[name]
+
+            self.cohorts = cohorts
+            self.versions = versions
+            self.default = next(reversed(self.added)) if self.added else next(iter(self.cohorts), None)
+            self.current_version = '|'.join(f'{name}@{version}' for name, version in self.versions.items())
+            self.stamp = self.sources_stamp()
+
+    # Function to scan the cohorts again when the files changed, checked at most every RESCAN_SECONDS
+    def refresh(self):
+        if time.monotonic() - self.checked < RESCAN_SECONDS:
+            return
+        with self.lock:
+            self.checked = time.monotonic()
+            if self.sources_stamp() != self.stamp:
+                self.scan()
+
+    # Version of every cohort together, the shared result cache keeps its results per version
+    @property
+    def version(self):
+        self.refresh()
+        return self.current_version
+
+    # Function to get the version of one cohort (the default cohort for an unknown name), with its name
+    def cohort_version(self, name=None):
+        self.refresh()
+        with self.lock:
+            name = name if name in self.cohorts else self.default
+            return f'{name}@{self.versions[name]}'
+
+    # Function to get the names of the cohorts, for the cohort dropdown
+    def names(self):
+        self.refresh()
+        return list(self.cohorts)
+
+    # Function to get the folder of a cohort's artifacts and remove the folders of its older versions
+    def cohort_artifact_dir(self, name):
+        cohort_dir = os.path.join(self.artifact_dir, folder_name(name))
+        for old_dir in glob.glob(os.path.join(cohort_dir, '*')):
+            if os.path.basename(old_dir) != self.versions[name]:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        return os.path.join(cohort_dir, self.versions[name])
+
+    # Function to read a cohort's files
+    def load(self, name):
+        # Cohorts added in memory have no files to read
+        if name in self.added:
+            return self.added[name]
+        cohort = self.cohorts[name]
+        df = read_source(cohort['file'])
+        mergedf = read_source(cohort['merge_file'])
+        # Only the admits who registered in the term
+        if cohort.get('same_students'):
+            df = df.loc[df['ID'].isin(mergedf['ID'])].reset_index(drop=True)
+        return Cohort(name, df, mergedf, self.versions[name], self.cohort_artifact_dir(name))
+
+    # Function to get a loaded cohort by name (the default cohort for an unknown name)
+    def get(self, name=None):
+        self.refresh()
+        with self.lock:
+            name = name if name in self.cohorts else self.default
+            if name in self.loaded:
+                self.loaded.move_to_end(name)
+                return self.loaded[name]
+
+            cohort = self.load(name)
+            self.loaded[name] = cohort
+            # Drop the least recently used cohorts so only max_loaded stay in memory
+            while len(self.loaded) > self.max_loaded:
+                self.loaded.popitem(last=False)
+            return cohort
+
+    # Function to add a cohort that is already in memory (e.g. a synthetic cohort), it becomes the default
+        # The version changes with it, so results cached for the old version are not served for the new cohort
+    def add(self, cohort):
+        with self.lock:
+            self.added[cohort.name] = cohort
+            self.added.move_to_end(cohort.name)
+            self.loaded.pop(cohort.name, None)
+            self.scan()
+            self.loaded[cohort.name] = cohort
+            # Drop the least recently used cohorts so only max_loaded stay in memory
+            while len(self.loaded) > self.max_loaded:
+                self.loaded.popitem(last=False)
+
+    # Function to report the cohorts with their version and whether they are loaded
+    def report(self):
+        return {'default': self.default,
+                'max_loaded': self.max_loaded,
+                'cohorts': [{'name': name, 'version': self.versions[name], 'loaded': name in self.loaded,
+                             'file': cohort['file'], 'merge_file': cohort['merge_file']}
+                            for name, cohort in self.cohorts.items()]}
+# ================================= Cohort Registry =================================
+
+
+
+
+
+# ================================= Command Line =================================
+# Usage: python cohort_registry.py "All Terms" "Fall 2022" (every cohort when no name is given)
+    # Computes the artifacts of each cohort so the dashboard only reads them
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompute the artifacts of each cohort.')
+    parser.add_argument('names', nargs='*', help='cohorts to precompute (default: all)')
+    args = parser.parse_args(argv)
+
+    registry = CohortRegistry(all_cohorts(), max_loaded=1)
+    for name in args.names or registry.names():
+        if name not in registry.cohorts:
+            sys.exit(f'Unknown cohort: {name}')
+        registry.get(name).precompute()
+        print(f'{name}: {registry.cohort_artifact_dir(name)}')
+
+
+if __name__ == '__main__':
+    main()
+# ================================= Command Line =================================
@@ -0,0 +1,241 @@
+# ================================= Imports =================================
+# For the logistic function, the exported file, timing and the command line
+import os
+import sys
+import json
+import math
+import time
+import argparse
+
+# For handling data
+import pandas as pd
+import numpy as np
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Scorer Settings =================================
+# File the compiled scorer is exported to, next to the pipeline pickle
+SCORER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logistic_regression_scorer.json')
+
+# Largest difference from the sklearn probabilities accepted by the parity check
+PARITY_TOLERANCE = 1e-9
+# ================================= Scorer Settings =================================
+
+
+
+
+
+# ================================= Compiling The Pipeline =================================
+# Function to read the numbers a fitted pipeline uses to score, so it can be scored without sklearn
+    # Supports the pipeline trained for the dashboard: ColumnTransformer(StandardScaler, OneHotEncoder),
+    # an optional resampler (only used while fitting) and a binary LogisticRegression
+def compile_pipeline(pipeline):
+    preprocessor = pipeline.steps[0][1]
+    classifier = pipeline.steps[-1][1]
+    for name, step in pipeline.steps[1:-1]:
+        # Resamplers (RandomOverSampler) do nothing when predicting
+        if not hasattr(step, 'fit_resample'):
+            raise ValueError(f'Cannot compile pipeline step {name}: {type(step).__name__}')
+    if classifier.coef_.shape[0] != 1:
+        raise ValueError('Only a binary logistic regression can be compiled')
+
+    coef = classifier.coef_[0]
+    numeric = []
+    categorical = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == 'drop' or name == 'remainder':
+            continue
+        offset = preprocessor.output_indices_[name].start
+        kind = type(transformer).__name__
+
+        if kind == 'StandardScaler':
+            means = transformer.mean_ if transformer.with_mean else np.zeros(len(columns))
+            scales = transformer.scale_ if transformer.with_std else np.ones(len(columns))
+            for position, col in enumerate(columns):
+                numeric.append({'column': col, 'index': offset + position,
+                                'mean': float(means[position]), 'scale': float(scales[position])})
+        elif kind == 'OneHotEncoder':
+            if transformer.drop_idx_ is not None or getattr(transformer, 'infrequent_categories_', None):
+                raise ValueError('Cannot compile a OneHotEncoder that drops or groups categories')
+            for col, categories in zip(columns, transformer.categories_):
+                categorical.append({'column': col, 'categories': categories.tolist(), 'offset': offset,
+                                    'ignore_unknown': transformer.handle_unknown != 'error'})
+                offset += len(categories)
+        else:
+            raise ValueError(f'Cannot compile transformer {name}: {kind}')
+
+    return {'numeric': numeric,
+            'categorical': categorical,
+            'coef': coef.tolist(),
+            'intercept': float(classifier.intercept_[0]),
+            'classes': classifier.classes_.tolist()}
+# ================================= Compiling The Pipeline =================================
+
+
+
+
+
+# ================================= Compiled Scorer =================================
+# Logistic regression scorer built from compile_pipeline, same probabilities as pipeline.predict_proba
+class CompiledScorer:
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.classes_ = np.array(compiled['classes'])
+        self.coef = np.array(compiled['coef'], dtype='float64')
+        self.intercept = compiled['intercept']
+
+        # Scaler means and scales, and the coefficient of each numeric column
+        self.numeric_columns = [feature['column'] for feature in compiled['numeric']]
+        self.means = np.array([feature['mean'] for feature in compiled['numeric']])
+        self.scales = np.array([feature['scale'] for feature in compiled['numeric']])
+        self.numeric_coef = self.coef[[feature['index'] for feature in compiled['numeric']]]
+
+        # Column of the one-hot matrix for every category, by column
+        self.category_index = {feature['column']: {category: feature['offset'] + position
+                                                   for position, category in enumerate(feature['categories'])}
+                               for feature in compiled['categorical']}
+        self.ignore_unknown = {feature['column']: feature['ignore_unknown'] for feature in compiled['categorical']}
+        # Coefficients of each column's categories in order, for scoring a frame with category codes
+        self.category_coef = {col: (pd.Index(list(index_map)), self.coef[list(index_map.values())])
+                              for col, index_map in self.category_index.items()}
+
+        # Plain Python numbers for scoring one student without numpy
+        self.numeric_terms = [(col, mean, scale, weight) for col, mean, scale, weight
+                              in zip(self.numeric_columns, self.means.tolist(), self.scales.tolist(),
+                                     self.numeric_coef.tolist())]
+        self.category_weights = {col: {category: float(self.coef[index]) for category, index in index_map.items()}
+                                 for col, index_map in self.category_index.items()}
+
+    # Function to get the probabilities of a frame of students, [P(class 0), P(class 1)] per row
+    def predict_proba(self, frame):
+        # Same errors as the pipeline: text in a numeric column or a missing number cannot be scored
+        numbers = frame[self.numeric_columns].to_numpy(dtype='float64')
+        if np.isnan(numbers).any():
+            raise ValueError('Input contains NaN')
+        z = ((numbers - self.means) / self.scales) @ self.numeric_coef + self.intercept
+
+        for col, (categories, weights) in self.category_coef.items():
+            # Position of each value among the fitted categories, -1 for a category the encoder has not seen
+            codes = categories.get_indexer(frame[col].astype(object))
+            unknown = codes < 0
+            if unknown.any() and not self.ignore_unknown[col]:
+                raise ValueError(f'Found unknown categories {sorted(map(str, frame[col][unknown].unique()))} '
+                                 f'in column {col}')
+            # Unknown categories (when ignored) have no dummy set, so they add nothing
+            z += np.where(unknown, 0.0, weights[codes])
+
+        # exp overflows to inf for very negative z, which correctly gives a probability of 0
+        with np.errstate(over='ignore'):
+            probability = 1.0 / (1.0 + np.exp(-z))
+        return np.column_stack([1.0 - probability, probability])
+
+    # Function to get the probabilities of one student given as a dict, in plain Python (a few microseconds)
+    def predict_proba_one(self, student):
+        z = self.intercept
+        for col, mean, scale, weight in self.numeric_terms:
+            value = student[col]
+            if value is None or value != value:
+                raise ValueError('Input contains NaN')
+            z += (float(value) - mean) / scale * weight
+
+        for col, weights in self.category_weights.items():
+            weight = weights.get(student[col])
+            if weight is None:
+                if not self.ignore_unknown[col]:
+                    raise ValueError(f'Found unknown categories [{student[col]!r}] in column {col}')
+                continue
+            z += weight
+
+        # Written both ways so exp never overflows
+        if z >= 0:
+            probability = 1.0 / (1.0 + math.exp(-z))
+        else:
+            probability = math.exp(z) / (1.0 + math.exp(z))
+        return [1.0 - probability, probability]
+
+    # Function to save the scorer as JSON, it can be loaded without sklearn or joblib
+    def save(self, path=SCORER_PATH):
+        with open(path, 'w') as scorer_file:
+            json.dump(self.compiled, scorer_file, indent=2)
+
+# Function to load a scorer saved with CompiledScorer.save
+def load_scorer(path=SCORER_PATH):
+    with open(path) as scorer_file:
+        return CompiledScorer(json.load(scorer_file))
+# ================================= Compiled Scorer =================================
+
+
+
+
+
+# ================================= Parity And Latency =================================
+# Function to get the largest difference between the scorer's and the pipeline's probabilities
+def parity_error(pipeline, scorer, frame):
+    expected = pipeline.predict_proba(frame)
+    batch_error = float(np.abs(scorer.predict_proba(frame) - expected).max())
+    one_error = max(float(np.abs(np.array(scorer.predict_proba_one(student)) - expected[row]).max())
+                    for row, student in enumerate(frame.to_dict('records')))
+    return max(batch_error, one_error)
+
+# Function to get the best time per call of a function over a number of calls (seconds)
+def best_time(func, *args, repeats=5, number=100):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        times.append((time.perf_counter() - start) / number)
+    return min(times)
+
+# Function to time one student and a batch through the pipeline and the scorer
+def latency_report(pipeline, scorer, frame):
+    single = frame.iloc[[0]]
+    student = single.to_dict('records')[0]
+    return {'pipeline_single_seconds': best_time(pipeline.predict_proba, single),
+            'scorer_single_frame_seconds': best_time(scorer.predict_proba, single),
+            'scorer_single_dict_seconds': best_time(scorer.predict_proba_one, student, number=10000),
+            'pipeline_batch_seconds': best_time(pipeline.predict_proba, frame, number=3),
+            'scorer_batch_seconds': best_time(scorer.predict_proba, frame, number=3)}
+# ================================= Parity And Latency =================================
+
+
+
+
+
+# ================================= Command Line =================================
+# Usage: python compiled_scorer.py --rows 10000
+    # Exports the newest pipeline as a scorer, checks it against the pipeline and prints both latencies
+def main(argv=None):
+    # Only the exporter needs sklearn, to load the pipeline and score the synthetic cohort with it
+    from model_registry import ModelRegistry
+    from batch_prediction import feature_columns
+    from benchmarks import synthetic_cohort
+
+    parser = argparse.ArgumentParser(description='Compile the logistic regression pipeline into a scorer.')
+    parser.add_argument('--output', default=SCORER_PATH, help='JSON file to export the scorer to')
+    parser.add_argument('--rows', type=int, default=10000, help='students in the cohort used for the checks')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry()
+    pipeline = registry.get()
+    scorer = CompiledScorer(compile_pipeline(pipeline))
+    scorer.save(args.output)
+    print(f'Exported {registry.path} to {args.output}')
+
+    _, mergedf = synthetic_cohort(args.rows)
+    frame = mergedf[feature_columns]
+    error = parity_error(pipeline, load_scorer(args.output), frame)
+    print(f'Largest probability difference on {args.rows} students: {error:.2e}')
+
+    for name, seconds in latency_report(pipeline, scorer, frame).items():
+        print(f'{name:<30} {seconds * 1e6:12.2f} us')
+    if error > PARITY_TOLERANCE:
+        sys.exit(f'Parity check failed: {error:.2e} > {PARITY_TOLERANCE:.0e}')
+
+
+if __name__ == '__main__':
+    main()
+# ================================= Command Line =================================
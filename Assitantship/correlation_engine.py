@@ -0,0 +1,91 @@
+# ================================= Imports =================================
+# For handling data
+import pandas as pd
+import numpy as np
+
+# For the p-values of the correlation coefficients, scipy.stats is loaded the first time a matrix is calculated
+from lazy_imports import lazy_import
+stats = lazy_import('scipy.stats')
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Pearson Correlation Matrix =================================
+# Fewest rows with both values present for a correlation to be reported
+MIN_PAIRED_ROWS = 3
+
+# Function to calculate Pearson's r, its p-value, the row count and the OLS line for every pair of numeric columns
+    # Missing values are skipped per pair (like dropping NaN rows before pearsonr) with matrix products,
+    # so the whole matrix is one vectorized pass instead of one pearsonr call per pair
+def pearson_matrix(frame, columns):
+    columns = list(columns)
+    values = frame[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64')
+
+    # 1 where a value is present, 0 where it is missing
+    present = ~np.isnan(values)
+    weights = present.astype('float64')
+
+    # Center each column first so large values (e.g. IDs) do not lose precision, then zero the missing values
+    counts = present.sum(axis=0)
+    means = np.where(present, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    values = np.where(present, values - means, 0.0)
+
+    # Paired row counts and sums for every pair (x column i, y column j), only over rows where both exist
+    n = weights.T @ weights
+    sum_x = values.T @ weights
+    sum_xx = (values ** 2).T @ weights
+    sum_xy = values.T @ values
+
+    # Co-variation and variation of each column over the shared rows
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var_x = sum_xx - sum_x ** 2 / n
+        var_y = var_x.T
+        r = cov / np.sqrt(var_x * var_y)
+
+    # Not defined when a column is constant over the shared rows or there are too few rows
+    undefined = (n < MIN_PAIRED_ROWS) | (var_x <= 1e-12 * sum_xx) | (var_y <= 1e-12 * sum_xx.T)
+    r = np.clip(r, -1.0, 1.0)
+    r[undefined] = np.nan
+
+    # Two-sided p-value from the t distribution with n - 2 degrees of freedom (same as pearsonr)
+    dof = np.maximum(n - 2, 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = r * np.sqrt(dof / (1.0 - r ** 2))
+    p = 2 * stats.t.sf(np.abs(t), dof)
+    p[undefined] = np.nan
+
+    # OLS line of column j (y) on column i (x) over the shared rows: slope = cov / var(x), through the two means
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = cov / var_x
+        intercept = (means[None, :] + sum_x.T / n) - slope * (means[:, None] + sum_x / n)
+    # The line only needs x to vary, a constant y gives a flat line (like the OLS fit) even though r is undefined
+    no_fit = (n < 2) | (var_x <= 1e-12 * sum_xx)
+    slope[no_fit] = np.nan
+    intercept[no_fit] = np.nan
+
+    return {'r': pd.DataFrame(r, index=columns, columns=columns),
+            'p': pd.DataFrame(p, index=columns, columns=columns),
+            'n': pd.DataFrame(n.astype('int64'), index=columns, columns=columns),
+            'slope': pd.DataFrame(slope, index=columns, columns=columns),
+            'intercept': pd.DataFrame(intercept, index=columns, columns=columns)}
+
+# Function to look up r and p for one pair of columns
+def pair_correlation(matrix, x_var, y_var):
+    return matrix['r'].at[x_var, y_var], matrix['p'].at[x_var, y_var]
+
+# Function to look up the OLS line of y on x (slope, intercept) for one pair of columns
+def pair_trendline(matrix, x_var, y_var):
+    return matrix['slope'].at[x_var, y_var], matrix['intercept'].at[x_var, y_var]
+
+# Function to get the correlation of every numeric column with y, plus the columns it is not defined for
+def correlations_with(matrix, y_var):
+    results_df = pd.DataFrame({'Variable': matrix['r'].columns,
+                               'Correlation': matrix['r'][y_var].to_numpy(),
+                               'P_Value': matrix['p'][y_var].to_numpy()})
+
+    undefined = results_df['Correlation'].isna()
+    return results_df[~undefined].reset_index(drop=True), results_df.loc[undefined, 'Variable'].tolist()
+# ================================= Pearson Correlation Matrix =================================
@@ -0,0 +1,163 @@
+# ================================= Imports =================================
+# For handling data
+import pandas as pd
+import numpy as np
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Cramer's V Settings =================================
+# Most table cells (row categories x target categories) counted at once when building the matrix
+MATRIX_BATCH_CELLS = 4_000_000
+# ================================= Cramer's V Settings =================================
+
+
+
+
+
+# ================================= Integer Codes And Contingency Tables =================================
+# Function to turn a categorical column into integer codes (missing values become -1) and its categories
+    # Categories are sorted like pd.crosstab sorts them, so the tables come out in the same order
+def factorize_categories(column):
+    try:
+        return pd.factorize(column, sort=True)
+    # Columns that mix numbers and text cannot be sorted, keep them in order of appearance
+    except TypeError:
+        return pd.factorize(column, sort=False)
+
+# Function to turn a categorical column into integer codes and the number of categories
+def factorize_column(column):
+    codes, categories = factorize_categories(column)
+    return codes, len(categories)
+
+# Function to factorize every column once
+def factorize_columns(frame, columns):
+    return {col: factorize_column(frame[col]) for col in columns}
+
+# Function to build the contingency table of two coded columns with a single bincount
+def contingency_table(x_codes, x_size, y_codes, y_size):
+    # Rows where either value is missing are left out (pd.crosstab does the same)
+    both = (x_codes >= 0) & (y_codes >= 0)
+    combined = x_codes[both].astype('int64') * y_size + y_codes[both]
+    table = np.bincount(combined, minlength=x_size * y_size).reshape(x_size, y_size)
+
+    # Drop categories that only appear next to missing values so the shape matches pd.crosstab
+    return table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+# ================================= Integer Codes And Contingency Tables =================================
+
+
+
+
+
+# ================================= Cramer's V =================================
+# Function to calculate the chi-squared statistic of a contingency table
+    # Same steps and order as stats.chi2_contingency(table, correction=False) so the result is bit-identical
+def chi2_statistic(table):
+    observed = np.asarray(table, dtype=np.float64)
+
+    # Degenerate table with only one row or column, chi2_contingency returns 0 here
+    if min(observed.shape) < 2:
+        return 0.0
+
+    # Expected frequencies from the row and column totals
+    expected = (observed.sum(axis=1, keepdims=True) * observed.sum(axis=0, keepdims=True)) / observed.sum()
+    terms = (np.asarray(table) - expected) ** 2 / expected
+    return terms.sum()
+
+# Function to calculate Cramer's V from a contingency table
+def cramers_v_from_table(table):
+    chi2 = chi2_statistic(table)
+
+    # Total number of observations
+    N = np.sum(table)
+
+    # Calculate the minimum dimension minus one (for Cramer's V formula)
+    min_dim = min(table.shape) - 1
+
+    # A single category gives 0 / 0 which is NaN, the same as before (without the warning)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt((chi2 / N) / np.float64(min_dim))
+
+# Function to Calulcate Cramers V values for categorical variables
+def calculate_cramers_v(x, y):
+    x_codes, x_size = factorize_column(x)
+    y_codes, y_size = factorize_column(y)
+    return cramers_v_from_table(contingency_table(x_codes, x_size, y_codes, y_size))
+
+# Function to calculate Cramer's V of one coded column against a batch of coded columns at once
+def cramers_v_batch(x_codes, x_size, y_codes, y_sizes):
+    # y_codes is (rows, targets), every target's table is a block of columns in one (x categories, cells) array
+    # A target with no values still gets one (empty) column so every block has a start
+    sizes = np.maximum(y_sizes, 1)
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    total = int(sizes.sum())
+
+    # Rows where either value is missing are left out of that table (pd.crosstab does the same)
+    present = (x_codes >= 0)[:, None] & (y_codes >= 0)
+    cells = x_codes[:, None].astype('int64') * total + starts + y_codes
+    counts = np.bincount(cells[present], minlength=max(x_size, 1) * total).reshape(-1, total).astype('float64')
+
+    # Row totals per table, column totals and the number of students of every table
+    row_totals = np.add.reduceat(counts, starts, axis=1)
+    column_totals = counts.sum(axis=0)
+    n = row_totals.sum(axis=0)
+    block = np.repeat(np.arange(len(sizes)), sizes)
+
+    # Chi-squared of every table, categories only seen next to missing values are left out like pd.crosstab
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = row_totals[:, block] * column_totals / n[block]
+        terms = np.where(expected > 0, (counts - expected) ** 2 / expected, 0.0)
+        chi2 = np.add.reduceat(terms.sum(axis=0), starts)
+
+        # Degenerate tables with only one row or column have a chi-squared of 0 (chi2_contingency does the same)
+        used_columns = np.add.reduceat((column_totals > 0).astype('int64'), starts)
+        min_dim = np.minimum((row_totals > 0).sum(axis=0), used_columns) - 1
+        chi2 = np.where(min_dim < 1, 0.0, chi2)
+        # A single category gives 0 / 0 which is NaN, the same as the table by table result
+        return np.sqrt((chi2 / n) / min_dim)
+
+# Function to calculate Cramer's V for every pair of columns at once
+def cramers_v_matrix(frame, columns):
+    # Only the upper triangle is computed (Cramer's V of a pair is the same both ways) and mirrored
+    # Each column's targets are counted together in batches of up to MATRIX_BATCH_CELLS table cells
+    columns = list(columns)
+    coded = factorize_columns(frame, columns)
+    codes = np.column_stack([coded[col][0] for col in columns]) if columns else np.empty((len(frame), 0), 'int64')
+    sizes = np.array([coded[col][1] for col in columns], dtype='int64')
+    matrix = np.full((len(columns), len(columns)), np.nan)
+
+    for i, x_col in enumerate(columns):
+        x_codes, x_size = coded[x_col]
+        start = i
+        while start < len(columns):
+            # Add targets while their tables fit in the batch (always at least one)
+            end = start + 1
+            cells = max(x_size, 1) * max(sizes[start], 1)
+            while end < len(columns) and cells + max(x_size, 1) * max(sizes[end], 1) <= MATRIX_BATCH_CELLS:
+                cells += max(x_size, 1) * max(sizes[end], 1)
+                end += 1
+
+            values = cramers_v_batch(x_codes, x_size, codes[:, start:end], sizes[start:end])
+            # Rows are the variables and columns are the targets
+            matrix[i, start:end] = values
+            matrix[start:end, i] = values
+            start = end
+
+    return pd.DataFrame(matrix, index=columns, columns=columns)
+
+# Function to get Cramer's V of every variable against y from the matrix (the old cramer_v_for_all_vars result)
+def cramers_v_row(matrix, y_var):
+    # Make y variable first
+    results = [{'Variable': y_var, 'Cramers_V': 1.0}]
+    results += [{'Variable': col, 'Cramers_V': value} for col, value in matrix[y_var].items()]
+    return pd.DataFrame(results)
+
+# Function to calculate Cramer's V values for all variables when y is picked
+def cramer_v_for_all_vars(df, y_var):
+    # Skip the 'ID' column since it shows inaccurate result
+    columns = [col for col in df.columns if col != 'ID']
+    matrix = cramers_v_matrix(df, columns if y_var in columns else columns + [y_var])
+    return cramers_v_row(matrix.loc[columns], y_var)
+# ================================= Cramer's V =================================
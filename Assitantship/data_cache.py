@@ -0,0 +1,181 @@
+# ================================= Imports =================================
+# For file paths, timestamps and the command line benchmark
+import os
+import sys
+import json
+import time
+# For hashing the content of the Excel workbooks
+import hashlib
+
+# For handling data
+import pandas as pd
+
+# For the columnar Arrow file that is memory-mapped on later starts
+import pyarrow as pa
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Cache Settings =================================
+# Folder that holds the converted Arrow files, kept next to the dashboard
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+
+# Read the workbooks in 1 MB blocks when hashing so big files do not load into memory at once
+HASH_BLOCK_SIZE = 1024 * 1024
+# ================================= Cache Settings =================================
+
+
+
+
+
+# ================================= Functions For The Cache =================================
+# Function to hash the content of a source file
+def file_content_hash(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+# Function to get the paths of the Arrow file and its manifest for a source file
+def cache_paths(path, cache_dir=CACHE_DIR):
+    # Name the cache after the workbook so it is easy to find, plus a hash of its full path so
+    # workbooks with the same name in different folders (e.g. two Fall 2022.xlsx) do not share a cache
+    stem = os.path.splitext(os.path.basename(path))[0].replace(' ', '_')
+    stem += '-' + hashlib.sha256(os.path.realpath(path).encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, stem + '.arrow'), os.path.join(cache_dir, stem + '.json')
+
+# Function to read the manifest saved with the Arrow file (None if there is no cache yet)
+def read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+# Function to write a file atomically so another worker never reads half of it
+def atomic_write(path, write):
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    write(temp_path)
+    os.replace(temp_path, path)
+
+# Function to make an Excel frame storable as typed Arrow columns
+    # Arrow columns have one type, so object columns that mix numbers and text are stored as text
+    # (a zip code column of 8401 and '08401-1234' comes back as '8401' and '08401-1234')
+def to_arrow_table(frame):
+    frame = frame.copy()
+    for col in frame.columns:
+        # Object columns that mix numbers and text (e.g. a zip code column) cannot be typed, store them as text
+        if frame[col].dtype == 'object':
+            values = frame[col].dropna()
+            if values.map(type).nunique() > 1:
+                frame[col] = frame[col].where(frame[col].isna(), frame[col].astype(str))
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+# Function to convert a workbook into an Arrow file and record what it was built from
+def build_cache(path, arrow_path, manifest_path, content_hash, read_kwargs):
+    frame = pd.read_excel(path, **read_kwargs)
+    table = to_arrow_table(frame)
+
+    # Write the table as an uncompressed Arrow IPC file so it can be memory-mapped
+    def write_arrow(temp_path):
+        with pa.OSFile(temp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    atomic_write(arrow_path, write_arrow)
+
+    # Save the mtime, size and hash the Arrow file was built from
+    stat = os.stat(path)
+    manifest = {'source': os.path.abspath(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                'sha256': content_hash, 'read_kwargs': read_kwargs, 'rows': frame.shape[0]}
+    write_manifest(manifest_path, manifest)
+    return manifest
+
+# Function to save a manifest
+def write_manifest(manifest_path, manifest):
+    def write_json(temp_path):
+        with open(temp_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+    atomic_write(manifest_path, write_json)
+
+# Function to make sure the Arrow file for a workbook is up to date and return its manifest
+def ensure_cache(path, cache_dir=CACHE_DIR, **read_kwargs):
+    os.makedirs(cache_dir, exist_ok=True)
+    arrow_path, manifest_path = cache_paths(path, cache_dir)
+    manifest = read_manifest(manifest_path)
+    stat = os.stat(path)
+
+    # Same mtime and size as last time, so the workbook did not change and there is no need to hash it
+    if (manifest is not None and os.path.exists(arrow_path) and manifest.get('read_kwargs') == read_kwargs
+            and manifest['mtime_ns'] == stat.st_mtime_ns and manifest['size'] == stat.st_size):
+        return manifest
+
+    # The mtime changed, only rebuild if the content actually changed (e.g. the file was just copied again)
+    content_hash = file_content_hash(path)
+    if (manifest is not None and os.path.exists(arrow_path) and manifest.get('read_kwargs') == read_kwargs
+            and manifest['sha256'] == content_hash):
+        manifest.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        write_manifest(manifest_path, manifest)
+        return manifest
+
+    return build_cache(path, arrow_path, manifest_path, content_hash, read_kwargs)
+
+# Function to read a workbook through the cache, same result as pd.read_excel(path)
+    # except that columns mixing numbers and text come back as text (see to_arrow_table)
+def read_excel_cached(path, cache_dir=CACHE_DIR, **read_kwargs):
+    ensure_cache(path, cache_dir, **read_kwargs)
+    arrow_path, _ = cache_paths(path, cache_dir)
+
+    # Memory-map the Arrow file so the OS page cache is shared between workers
+    with pa.memory_map(arrow_path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+# Function to get the content hash of a cached workbook, used as the dataset version
+def source_hash(path, cache_dir=CACHE_DIR):
+    _, manifest_path = cache_paths(path, cache_dir)
+    manifest = read_manifest(manifest_path)
+    return manifest['sha256'] if manifest else file_content_hash(path)
+# ================================= Functions For The Cache =================================
+
+
+
+
+
+# ================================= Startup Benchmark =================================
+# Function to time loading the workbooks from Excel against loading them from the cache
+def benchmark_startup(paths, repeats=5, cache_dir=CACHE_DIR):
+    results = []
+    for path in paths:
+        # Make sure the cache exists first so only warm starts are measured
+        ensure_cache(path, cache_dir)
+
+        excel_times = []
+        cached_times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            pd.read_excel(path)
+            excel_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            read_excel_cached(path, cache_dir)
+            cached_times.append(time.perf_counter() - start)
+
+        results.append({'File': os.path.basename(path),
+                        'Excel (s)': min(excel_times),
+                        'Cached (s)': min(cached_times),
+                        'Speedup': min(excel_times) / min(cached_times)})
+    return pd.DataFrame(results)
+# ================================= Startup Benchmark =================================
+
+
+
+
+
+# ================================= Run the Benchmark =================================
+# Usage: python data_cache.py "Conditionally Admitted Students Updated.xlsx" "Full Conditionally Admitted Students.xlsx"
+if __name__ == '__main__':
+    print(benchmark_startup(sys.argv[1:]).to_string(index=False))
+# ================================= Run the Benchmark =================================
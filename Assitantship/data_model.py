@@ -0,0 +1,73 @@
+# ================================= Imports =================================
+# For handling data
+import pandas as pd
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Data Model Settings =================================
+# Text columns with at most this share of distinct values are stored as 'category'
+    # e.g. Ethnicity, Major_x, Instructional_Method, HS_STATE, FIRST_GEN_IND
+CATEGORY_MAX_SHARE = 0.5
+
+# Nullable text type for the remaining text columns, missing values are pd.NA instead of 'NULL'
+TEXT_DTYPE = 'string[pyarrow]'
+# ================================= Data Model Settings =================================
+
+
+
+
+
+# ================================= Compact Columns =================================
+# Function to store one column in the smallest type that keeps its values
+def compact_column(column):
+    # Whole numbers go to the smallest integer type, numbers with missing values stay float (NaN)
+    if pd.api.types.is_numeric_dtype(column.dtype) and not pd.api.types.is_bool_dtype(column.dtype):
+        return pd.to_numeric(column, downcast='integer')
+
+    if column.dtype == 'object':
+        present = column.dropna()
+        # Columns that mix numbers and text are left as they are
+        if not present.map(type).eq(str).all():
+            return column
+        if present.nunique() <= CATEGORY_MAX_SHARE * len(column):
+            return column.astype('category')
+        return column.astype(TEXT_DTYPE)
+
+    # Dates and booleans already have compact types with their own missing value
+    return column
+
+# Function to compact every column of a frame
+def compact_frame(frame):
+    return pd.DataFrame({col: compact_column(frame[col]) for col in frame.columns}, index=frame.index)
+
+# Function to get the text (categorical) columns of a frame
+def text_columns(frame):
+    return list(frame.select_dtypes(include=['object', 'category', 'string']).columns)
+
+# Function to get the numeric columns of a frame
+def number_columns(frame):
+    return list(frame.select_dtypes(include='number').columns)
+# ================================= Compact Columns =================================
+
+
+
+
+
+# ================================= Memory Report =================================
+# Function to report the bytes of every column and the total of every frame
+    # frames maps a name to a frame, e.g. {'df': df, 'mergedf': mergedf}
+def memory_report(frames):
+    report = {}
+    for name, frame in frames.items():
+        usage = frame.memory_usage(deep=True, index=True)
+        report[name] = {
+            'rows': len(frame),
+            'bytes': int(usage.sum()),
+            'columns': {col: {'dtype': str(frame[col].dtype), 'bytes': int(usage[col])} for col in frame.columns}
+        }
+    report['total_bytes'] = sum(frame_report['bytes'] for frame_report in report.values())
+    return report
+# ================================= Memory Report =================================
@@ -0,0 +1,112 @@
+# ================================= Imports =================================
+# For encoding numeric arrays as binary, and the signature of the rest of the layout
+import json
+import base64
+import hashlib
+
+# For handling data
+import numpy as np
+
+# For sending only the parts of a figure that changed
+from dash import Patch
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Payload Settings =================================
+# Shorter numeric arrays stay plain JSON lists, the base64 wrapper is not worth it for a few numbers
+MIN_BINARY_LENGTH = 16
+
+# Typed array codes plotly.js understands (int64 is not one of them)
+typed_array_codes = {'float64': 'f8', 'float32': 'f4', 'int32': 'i4', 'int16': 'i2', 'int8': 'i1',
+                     'uint32': 'u4', 'uint16': 'u2', 'uint8': 'u1'}
+
+# Layout parts that change between figures of the same kind, they are sent with every Patch
+    # When any other part (the template, the map view, ...) differs the whole figure is sent instead
+varying_layout_keys = ['title', 'annotations', 'shapes', 'legend', 'xaxis', 'yaxis', 'coloraxis', 'uirevision',
+                       'height']
+# ================================= Payload Settings =================================
+
+
+
+
+
+# ================================= Typed Arrays =================================
+# Function to turn a numeric array into a plotly.js typed array ({'dtype', 'bdata', 'shape'}), None if it cannot be
+def typed_array(values):
+    if isinstance(values, (list, tuple)):
+        # Lists of text or mixed values stay as they are
+        if not all(isinstance(value, (int, float, np.number)) and not isinstance(value, bool) for value in values):
+            return None
+    array = np.asarray(values)
+    if array.dtype.kind not in 'iuf' or array.size < MIN_BINARY_LENGTH:
+        return None
+
+    # Integers too large for int32 and other unsupported types are sent as float64
+    if array.dtype.name not in typed_array_codes:
+        fits_int32 = array.dtype.kind in 'iu' and np.abs(array).max() < 2 ** 31
+        array = array.astype('int32' if fits_int32 else 'float64')
+
+    return {'dtype': typed_array_codes[array.dtype.name],
+            'bdata': base64.b64encode(np.ascontiguousarray(array).tobytes()).decode('ascii'),
+            'shape': ','.join(str(size) for size in array.shape)}
+
+# Function to replace every numeric array inside a trace with a typed array
+def encode_trace(trace):
+    encoded = {}
+    for key, value in trace.items():
+        if isinstance(value, dict):
+            encoded[key] = encode_trace(value)
+        elif isinstance(value, (list, tuple, np.ndarray)):
+            encoded[key] = typed_array(value) or value
+        else:
+            encoded[key] = value
+    return encoded
+
+# Function to get a figure as a dict with its numeric arrays sent as base64 binary instead of JSON numbers
+def compact_figure(figure):
+    figure = figure.to_plotly_json() if hasattr(figure, 'to_plotly_json') else dict(figure)
+    return {**figure, 'data': [encode_trace(trace) for trace in figure.get('data', [])]}
+# ================================= Typed Arrays =================================
+
+
+
+
+
+# ================================= Partial Updates =================================
+# Function to get a short hash of the layout parts that are not sent with a Patch
+def layout_signature(layout):
+    # Same encoder as the figures so numpy arrays and dates hash by their values
+    from plotly.utils import PlotlyJSONEncoder
+    fixed = {key: value for key, value in layout.items() if key not in varying_layout_keys}
+    return hashlib.sha256(json.dumps(fixed, sort_keys=True, cls=PlotlyJSONEncoder).encode()).hexdigest()[:16]
+
+# Function to describe the traces and the fixed layout of a figure, figures with the same shape can be updated in place
+def figure_shape(figure):
+    traces = '|'.join(trace.get('type', 'scatter') for trace in figure.get('data', []))
+    if not traces:
+        return ''
+    return f"{traces}#{layout_signature(figure.get('layout', {}))}"
+
+# Function to get the update to send for a figure, a Patch when the graph already shows a figure of the same shape
+    # Returns (figure or Patch, shape), the shape is kept in a dcc.Store next to the graph
+def figure_update(figure, previous_shape=None):
+    figure = compact_figure(figure)
+    shape = figure_shape(figure)
+    if previous_shape is None or previous_shape != shape or not shape:
+        return figure, shape
+
+    # Same traces and fixed layout as before: replace the traces and the changing layout parts
+    patch = Patch()
+    for index, trace in enumerate(figure['data']):
+        patch['data'][index] = trace
+    layout = figure.get('layout', {})
+    for key in varying_layout_keys:
+        if key in layout:
+            patch['layout'][key] = layout[key]
+        else:
+            del patch['layout'][key]
+    return patch, shape
+# ================================= Partial Updates =================================
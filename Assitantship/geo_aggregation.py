@@ -0,0 +1,60 @@
+# ================================= Imports =================================
+# For handling data
+import pandas as pd
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Geo Settings =================================
+# Filter to include only the East Coast portion of United States
+east_coast_states = ['ME', 'NH', 'MA', 'RI', 'CT', 'NY', 'NJ', 'PA', 'DE', 'MD', 'VA', 'NC', 'SC', 'GA', 'FL']
+
+# Columns every county point is grouped by
+geo_keys = ['HS_STATE', 'HS_COUNTY', 'HS_LAT', 'HS_LONG']
+# ================================= Geo Settings =================================
+
+
+
+
+
+# ================================= County Aggregation =================================
+# Function to get the numeric version of every column ('NULL' text becomes NaN), dates are left out
+def numeric_columns(frame):
+    return frame.select_dtypes(exclude=['datetime', 'datetimetz']).apply(pd.to_numeric, errors='coerce')
+
+# Function to get the numeric columns that can weight the map (summed per county)
+def weight_columns(frame):
+    numeric = numeric_columns(frame)
+    return [col for col in numeric.columns
+            if col not in geo_keys and col != 'ID' and numeric[col].notna().any()]
+
+# Function to group the East Coast students into one weighted point per county
+    # Gives the student count plus the sum and mean of every numeric column per county
+def aggregate_counties(frame):
+    east_coast = frame.loc[frame['HS_STATE'].isin(east_coast_states)]
+    numeric = numeric_columns(east_coast.drop(columns=geo_keys + ['ID'], errors='ignore'))
+    columns = [col for col in numeric.columns if numeric[col].notna().any()]
+    numeric = numeric[columns]
+
+    # Add the grouping keys back, with the coordinates as numbers
+    numeric[['HS_STATE', 'HS_COUNTY']] = east_coast[['HS_STATE', 'HS_COUNTY']]
+    numeric[['HS_LAT', 'HS_LONG']] = numeric_columns(east_coast[['HS_LAT', 'HS_LONG']])
+    # Students without coordinates cannot be placed on the map
+    numeric = numeric.dropna(subset=['HS_LAT', 'HS_LONG'])
+
+    # Only the counties that have students (HS_STATE and HS_COUNTY can be categories)
+    grouped = numeric.groupby(geo_keys, sort=False, observed=True)
+    counties = grouped.size().rename('Count').to_frame()
+    counties = counties.join(grouped[columns].sum().add_suffix(' (sum)'))
+    counties = counties.join(grouped[columns].mean().add_suffix(' (mean)'))
+    return counties.reset_index()
+
+# Function to get the column of the county frame used as the map weight
+    # The number of students unless a numeric variable is picked, then that variable summed per county
+def weight_column(counties, x_var):
+    if x_var and f'{x_var} (sum)' in counties.columns:
+        return f'{x_var} (sum)'
+    return 'Count'
+# ================================= County Aggregation =================================
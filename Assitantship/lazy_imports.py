@@ -0,0 +1,26 @@
+# ================================= Imports =================================
+# For loading modules the first time they are used
+import sys
+import importlib.util
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Lazy Imports =================================
+# Function to import a module that is only loaded when one of its names is first used
+    # e.g. px = lazy_import('plotly.express') costs nothing until px.scatter is called
+def lazy_import(name):
+    # Already loaded (or already lazy), use it as it is
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+# ================================= Lazy Imports =================================
@@ -0,0 +1,166 @@
+# ================================= Imports =================================
+# For file paths, timing and memory usage
+import os
+import json
+import glob
+import time
+import threading
+
+# For handling data
+import numpy as np
+
+# For hashing the pickle, used as the model version
+from data_cache import file_content_hash
+# For scoring single students without going through sklearn
+from compiled_scorer import CompiledScorer, compile_pipeline
+# For ingesting logistic regression model, joblib (and sklearn through the pickle) load with the first model
+from lazy_imports import lazy_import
+joblib = lazy_import('joblib')
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Registry Settings =================================
+# Folders searched for the pipeline: next to the dashboard and the models folder written by retraining
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIRS = [MODEL_DIR, os.path.join(MODEL_DIR, 'models')]
+MODEL_PATTERN = 'logistic_regression_pipeline*.pkl'
+
+# How often to look for a new pickle (seconds), so a new version is picked up without a restart
+RELOAD_CHECK_SECONDS = 5
+# ================================= Registry Settings =================================
+
+
+
+
+
+# ================================= Memory Helpers =================================
+# Function to get the resident memory of this process in bytes
+def resident_bytes():
+    try:
+        # Linux: second field of statm is the resident page count
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        # Other systems: fall back to the peak resident size
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reports bytes, Linux reports kilobytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+# Function to add up the numpy arrays held by a fitted pipeline (coefficients, scaler means, etc.)
+def array_bytes(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(array_bytes(value, seen) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(array_bytes(value, seen) for value in obj)
+    if hasattr(obj, '__dict__'):
+        return array_bytes(vars(obj), seen)
+    return 0
+# ================================= Memory Helpers =================================
+
+
+
+
+
+# ================================= Model Registry =================================
+# Function to read the metrics saved next to a pickle by retrain_model.py (None for a pickle trained by hand)
+def read_metrics(path):
+    try:
+        with open(os.path.splitext(path)[0] + '.json') as metrics_file:
+            metrics = json.load(metrics_file)
+    except (OSError, ValueError):
+        return None
+    return {'created': metrics.get('created'), 'best_params': metrics.get('best_params'),
+            'cv_roc_auc': metrics.get('cv', {}).get('roc_auc', {}).get('mean'),
+            'holdout': metrics.get('holdout')}
+
+# Registry that loads the newest pipeline pickle on first use and reloads it when a new version appears
+class ModelRegistry:
+    def __init__(self, model_dirs=MODEL_DIRS, pattern=MODEL_PATTERN, mmap_mode='r'):
+        self.model_dirs = model_dirs
+        self.pattern = pattern
+        self.mmap_mode = mmap_mode
+
+        self.lock = threading.Lock()
+        self.pipeline = None
+        self.path = None
+        self.mtime_ns = None
+        self.last_check = 0.0
+        # Pipeline the compiled scorer was built from, and the scorer
+        self.compiled = (None, None)
+        # Load time and memory for every version loaded by this process
+        self.versions = []
+
+    # Function to find the newest pickle in the model folders
+    def newest_path(self):
+        paths = [path for model_dir in self.model_dirs for path in glob.glob(os.path.join(model_dir, self.pattern))]
+        if not paths:
+            raise FileNotFoundError(f'No {self.pattern} found in {self.model_dirs}')
+        return max(paths, key=os.path.getmtime)
+
+    # Function to load a pickle and record how long it took and how much memory it uses
+    def load(self, path):
+        rss_before = resident_bytes()
+        start = time.perf_counter()
+
+        # Memory-map the numpy arrays in the pickle so forked workers share the same pages
+        pipeline = joblib.load(path, mmap_mode=self.mmap_mode)
+
+        load_seconds = time.perf_counter() - start
+        self.versions.append({'version': f'{os.path.basename(path)}@{file_content_hash(path)[:12]}',
+                              'path': path,
+                              'loaded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                              'load_seconds': round(load_seconds, 4),
+                              'file_bytes': os.path.getsize(path),
+                              'array_bytes': array_bytes(pipeline),
+                              'resident_delta_bytes': resident_bytes() - rss_before,
+                              'metrics': read_metrics(path)})
+
+        self.pipeline = pipeline
+        self.path = path
+        self.mtime_ns = os.stat(path).st_mtime_ns
+
+    # Function to get the pipeline, loading it the first time and reloading it if the pickle changed
+    def get(self):
+        now = time.monotonic()
+        if self.pipeline is not None and now - self.last_check < RELOAD_CHECK_SECONDS:
+            return self.pipeline
+
+        with self.lock:
+            self.last_check = now
+            path = self.newest_path()
+            if path != self.path or os.stat(path).st_mtime_ns != self.mtime_ns:
+                self.load(path)
+            return self.pipeline
+
+    # Function to get the pipeline compiled into a CompiledScorer, compiled again when a new version is loaded
+    def scorer(self):
+        pipeline = self.get()
+        with self.lock:
+            if self.compiled[0] is not pipeline:
+                self.compiled = (pipeline, CompiledScorer(compile_pipeline(pipeline)))
+            return self.compiled[1]
+
+    # Function to force a reload on the next prediction
+    def reload(self):
+        with self.lock:
+            self.last_check = 0.0
+            self.path = None
+        return self.get()
+
+    # Function to report the loaded versions with their load time and size
+    def report(self):
+        current = self.versions[-1]['version'] if self.versions else None
+        return {'current_version': current, 'versions': self.versions}
+# ================================= Model Registry =================================
@@ -0,0 +1,115 @@
+# ================================= Imports =================================
+# For handling data
+import pandas as pd
+import numpy as np
+
+# For turning a categorical column into integer codes, sorted like pd.get_dummies sorts them
+from cramers_v_engine import factorize_categories
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= One-Hot Encodings =================================
+# Function to encode a categorical column once
+    # The codes are the one-hot encoding in compact form: row r has a 1 in dummy column codes[r] (none if -1)
+def encode_column(column):
+    codes, categories = factorize_categories(column)
+
+    return {'labels': [f'{column.name}_{category}' for category in categories],
+            'codes': codes.astype('int32'),
+            'counts': np.bincount(codes[codes >= 0], minlength=len(categories))}
+
+# Function to expand an encoding into the dense uint8 dummy matrix (same values as pd.get_dummies)
+def dummy_matrix(encoding):
+    matrix = np.zeros((len(encoding['codes']), len(encoding['labels'])), dtype='uint8')
+    rows = np.flatnonzero(encoding['codes'] >= 0)
+    matrix[rows, encoding['codes'][rows]] = 1
+    return matrix
+# ================================= One-Hot Encodings =================================
+
+
+
+
+
+# ================================= Correlation Blocks =================================
+# Function to correlate every dummy of one column with every dummy of another column
+    # For 0/1 columns Pearson's r only needs the co-occurrence counts, so one bincount replaces get_dummies + corr
+def dummy_dummy_block(x_encoding, y_encoding):
+    x_codes, y_codes = x_encoding['codes'], y_encoding['codes']
+    x_size, y_size = len(x_encoding['labels']), len(y_encoding['labels'])
+    n = len(x_codes)
+
+    # Number of rows that have dummy i of x and dummy j of y
+    both = (x_codes >= 0) & (y_codes >= 0)
+    together = np.bincount(x_codes[both].astype('int64') * y_size + y_codes[both],
+                           minlength=x_size * y_size).reshape(x_size, y_size).astype('float64')
+
+    x_count = x_encoding['counts'].astype('float64')[:, None]
+    y_count = y_encoding['counts'].astype('float64')[None, :]
+
+    # r = (n * n_ij - n_i * n_j) / sqrt(n_i (n - n_i) * n_j (n - n_j)), NaN when a dummy is always 0 or 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (n * together - x_count * y_count) / np.sqrt(x_count * (n - x_count) * y_count * (n - y_count))
+
+    return pd.DataFrame(r, index=x_encoding['labels'], columns=y_encoding['labels'])
+
+# Function to correlate every dummy of one column with a numeric column
+    # Rows where the numeric value is missing are skipped, the same as DataFrame.corr()
+def dummy_numeric_block(encoding, numeric):
+    values = pd.to_numeric(numeric, errors='coerce').to_numpy(dtype='float64')
+    present = ~np.isnan(values)
+    codes = encoding['codes'][present]
+    values = values[present]
+    size = len(encoding['labels'])
+
+    # Center first so the sums below do not lose precision
+    n = len(values)
+    values = values - values.mean() if n else values
+
+    # Per dummy: number of rows and the sum of the numeric column over those rows
+    has_dummy = codes >= 0
+    count = np.bincount(codes[has_dummy], minlength=size).astype('float64')
+    total = np.bincount(codes[has_dummy], weights=values[has_dummy], minlength=size)
+    sum_squares = (values ** 2).sum()
+
+    # r = (n * sum_i - n_i * sum) / sqrt(n_i (n - n_i) * (n * sum_squares - sum^2)), the total sum is 0 after centering
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (n * total) / np.sqrt(count * (n - count) * n * sum_squares)
+    # A dummy that is always 0 or 1, or a constant numeric column, has no correlation
+    r[(count == 0) | (count == n) | (sum_squares == 0)] = np.nan
+
+    return pd.Series(r, index=encoding['labels'], name=numeric.name)
+# ================================= Correlation Blocks =================================
+
+
+
+
+
+# ================================= Heatmap Matrix =================================
+# Function to sort a correlation matrix the way the heatmap shows it
+def sort_by_numeric(corr, numeric_name):
+    corr = corr.sort_values(by=numeric_name, axis=1, ascending=False)
+    return corr.sort_values(by=numeric_name, axis=0, ascending=True)
+
+# Function to get the correlations of the selected dummies with the numeric column only (the 'first_col' view)
+def first_column_correlations(numeric_blocks, numeric_name):
+    column = pd.concat(numeric_blocks + [pd.Series({numeric_name: 1.0}, name=numeric_name)])
+    return column.sort_values(ascending=True).to_frame()
+
+# Function to put the full correlation matrix together from blocks
+    # dummy_blocks[(a, b)] is the block for columns a and b, numeric_blocks[a] the block of a with the numeric column
+def full_correlations(selected_columns, dummy_blocks, numeric_blocks, numeric_name):
+    rows = []
+    for a in selected_columns:
+        row = [dummy_blocks[(a, b)] for b in selected_columns] + [numeric_blocks[a].to_frame()]
+        rows.append(pd.concat(row, axis=1))
+
+    # Last row is the numeric column against every dummy, then itself
+    numeric_row = pd.concat([numeric_blocks[a] for a in selected_columns]).to_frame().T
+    numeric_row[numeric_name] = 1.0
+    rows.append(numeric_row)
+
+    return sort_by_numeric(pd.concat(rows, axis=0), numeric_name)
+# ================================= Heatmap Matrix =================================
@@ -0,0 +1,106 @@
+# ================================= Imports =================================
+# For compressing responses, and the compressed scripts kept in memory
+import gzip
+import threading
+from collections import OrderedDict
+
+# For the size of the response before compression
+from flask import g, request
+
+# Brotli compresses JSON better than gzip, used when it is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Compression Settings =================================
+# Responses smaller than this are sent as they are (bytes)
+MIN_SIZE = 500
+
+# Compression levels, fast enough to run on every callback response
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Types compressed on every response (callback responses and the layout), they change from one response to the next
+dynamic_types = ['application/json']
+
+# Types of the static files (plotly.js and the other component scripts), compressed once per file and kept
+static_types = ['application/javascript', 'text/javascript', 'text/css']
+
+# Most bytes of compressed static files kept in memory, the least recently used are dropped
+STATIC_CACHE_BYTES = 64 * 1024 * 1024
+# ================================= Compression Settings =================================
+
+
+
+
+
+# ================================= Response Compression =================================
+# Function to pick the encoding the browser accepts, brotli first
+def accepted_encoding():
+    accepted = request.headers.get('Accept-Encoding', '').lower()
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+# Function to compress a body with an encoding
+def compress_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+# Compressed static files by (ETag, encoding), so each script is only compressed once per server process
+static_cache = OrderedDict()
+static_cache_lock = threading.Lock()
+
+# Function to get the compressed body of a static file, from memory when the same file was compressed before
+def compressed_static(response, body, encoding):
+    # Fingerprinted Dash scripts have no ETag, a hash of the body is still far cheaper than compressing it
+    if response.get_etag()[0] is None:
+        response.add_etag()
+    key = (response.get_etag()[0], encoding)
+    with static_cache_lock:
+        if key in static_cache:
+            static_cache.move_to_end(key)
+            return static_cache[key]
+
+    compressed = compress_body(body, encoding)
+    with static_cache_lock:
+        static_cache[key] = compressed
+        # Drop the least recently used files over the size limit
+        while sum(len(value) for value in static_cache.values()) > STATIC_CACHE_BYTES and len(static_cache) > 1:
+            static_cache.popitem(last=False)
+    return compressed
+
+# Function to compress a response when the browser accepts it, the size before is kept in g.uncompressed_bytes
+def compress_response(response):
+    # Streamed responses (files, the batch prediction CSV) and already encoded responses are left alone
+    static = response.mimetype in static_types
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or not (static or response.mimetype in dynamic_types)):
+        return response
+
+    encoding = accepted_encoding()
+    body = response.get_data()
+    g.uncompressed_bytes = len(body)
+    if encoding is None or len(body) < MIN_SIZE:
+        return response
+
+    compressed = compressed_static(response, body, encoding) if static else compress_body(body, encoding)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = len(compressed)
+    response.vary.add('Accept-Encoding')
+    return response
+
+# Function to compress every response of a Flask server
+def compress_responses(server):
+    server.after_request(compress_response)
+# ================================= Response Compression =================================
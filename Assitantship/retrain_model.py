@@ -0,0 +1,221 @@
+# ================================= Imports =================================
+# For paths, the version stamp, the metrics file, the cache folder of each run and the command line
+import os
+import json
+import time
+import pickle
+import shutil
+import tempfile
+import argparse
+import platform
+
+# For handling data
+import pandas as pd
+import numpy as np
+
+# For the pipeline, the cross-validated search and the metrics
+import sklearn
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score, confusion_matrix
+from imblearn.pipeline import Pipeline as ImbPipeline
+from imblearn.over_sampling import RandomOverSampler
+# For running the folds on every core and caching the fitted preprocessing
+import joblib
+
+# For reading the cleaned data, hashing it and writing the files safely
+from data_cache import CACHE_DIR, read_excel_cached, file_content_hash, atomic_write
+# Columns the pipeline is trained on
+from batch_prediction import numerical_features, categorical_features, feature_columns
+# The folder the model registry loads new versions from
+from model_registry import MODEL_DIRS
+# Cleaned data written by clean_pipeline.py, and the workbook the dashboard reads when it has not run
+from clean_pipeline import OUTPUT_DIR
+from cohort_registry import DEFAULT_MERGE_FILE
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Training Settings =================================
+# Cleaned cohort data the pipeline is trained on (the workbook is used if the cleaning pipeline has not run)
+TRAINING_FILE = os.path.join(OUTPUT_DIR, 'Full Conditionally Admitted Students.parquet')
+
+# A student counts as successful with an overall GPA of 3.0 or higher
+GPA_THRESHOLD = 3.0
+
+# Folder the new versions are saved to, the dashboard picks up the newest pickle in it
+OUTPUT_MODEL_DIR = MODEL_DIRS[1]
+
+# Stratified folds of the cross-validation and the share held out for the final check
+N_SPLITS = 5
+TEST_SIZE = 0.25
+RANDOM_STATE = 42
+
+# Cores used for the folds (-1 is every core)
+N_JOBS = -1
+
+# Values tried for the regularization of the logistic regression
+param_grid = {'classifier__C': [0.01, 0.1, 1.0, 10.0, 100.0]}
+
+# Metrics of every fold, the best model is the one with the highest ROC AUC
+scoring = {'roc_auc': 'roc_auc', 'f1': 'f1', 'accuracy': 'accuracy', 'balanced_accuracy': 'balanced_accuracy'}
+REFIT_METRIC = 'roc_auc'
+
+# Folder for the fitted preprocessing, reused by every candidate trained on the same fold
+    # Each run caches in its own subfolder, removed when the run ends so the folder does not grow with every retrain
+PREPROCESSING_CACHE_DIR = os.path.join(CACHE_DIR, 'training')
+# ================================= Training Settings =================================
+
+
+
+
+
+# ================================= Training Data =================================
+# Function to read the cleaned cohort and add the success_by_gpa target
+def read_training_data(path=None):
+    if path is None:
+        path = TRAINING_FILE if os.path.exists(TRAINING_FILE) else DEFAULT_MERGE_FILE
+    frame = pd.read_parquet(path) if path.endswith('.parquet') else read_excel_cached(path)
+
+    # Students without a GPA or a feature cannot be used
+    frame = frame.dropna(subset=feature_columns + ['Overall_GPA'])
+    target = (frame['Overall_GPA'] >= GPA_THRESHOLD).astype(int)
+    return frame[feature_columns], target, path
+# ================================= Training Data =================================
+
+
+
+
+
+# ================================= Pipeline =================================
+# Function to build the same pipeline as logisticRegression.ipynb
+    # memory caches the fitted preprocessing, so candidates trained on the same fold do not fit it again
+    # Categories missing from a fold's training rows are ignored instead of failing the fold
+def build_pipeline(memory=None):
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), numerical_features),
+            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
+        ])
+
+    return ImbPipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('sampler', RandomOverSampler(random_state=RANDOM_STATE)),
+        ('classifier', LogisticRegression(random_state=RANDOM_STATE, max_iter=1000))
+    ], memory=memory)
+
+# Function to get the metrics of a fitted pipeline on held out students
+def holdout_metrics(pipeline, features, target):
+    probabilities = pipeline.predict_proba(features)[:, list(pipeline.classes_).index(1)]
+    predictions = pipeline.predict(features)
+    return {'roc_auc': float(roc_auc_score(target, probabilities)),
+            'f1': float(f1_score(target, predictions)),
+            'accuracy': float(accuracy_score(target, predictions)),
+            'confusion_matrix': confusion_matrix(target, predictions).tolist()}
+
+# Function to run the cross-validated search on every core and evaluate the best pipeline on the held out part
+def train(features, target, n_splits=N_SPLITS, n_jobs=N_JOBS, cache_dir=PREPROCESSING_CACHE_DIR):
+    x_train, x_test, y_train, y_test = train_test_split(features, target, test_size=TEST_SIZE,
+                                                        random_state=RANDOM_STATE, stratify=target)
+
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=RANDOM_STATE)
+    os.makedirs(cache_dir, exist_ok=True)
+    run_cache_dir = tempfile.mkdtemp(prefix='run-', dir=cache_dir)
+    memory = joblib.Memory(run_cache_dir, verbose=0)
+    search = GridSearchCV(build_pipeline(memory), param_grid, scoring=scoring, refit=REFIT_METRIC, cv=folds,
+                          n_jobs=n_jobs, return_train_score=False)
+
+    # Every (candidate, fold) pair is a separate job on the loky process pool
+    start = time.perf_counter()
+    try:
+        with joblib.parallel_backend('loky', n_jobs=n_jobs):
+            search.fit(x_train, y_train)
+    finally:
+        # The cached preprocessing is only reused within this search
+        shutil.rmtree(run_cache_dir, ignore_errors=True)
+    seconds = time.perf_counter() - start
+
+    # Leave out the cache so the saved pipeline does not point to a folder on this machine
+    pipeline = search.best_estimator_
+    pipeline.memory = None
+
+    best = search.best_index_
+    metrics = {'best_params': search.best_params_,
+               'cv': {name: {'mean': float(search.cv_results_[f'mean_test_{name}'][best]),
+                             'std': float(search.cv_results_[f'std_test_{name}'][best]),
+                             'folds': [float(search.cv_results_[f'split{fold}_test_{name}'][best])
+                                       for fold in range(n_splits)]}
+                      for name in scoring},
+               'candidates': [{'params': params, 'mean_roc_auc': float(score)} for params, score
+                              in zip(search.cv_results_['params'], search.cv_results_['mean_test_roc_auc'])],
+               'holdout': holdout_metrics(pipeline, x_test, y_test),
+               'train_rows': len(x_train),
+               'test_rows': len(x_test),
+               'positive_share': float(np.mean(target)),
+               'search_seconds': round(seconds, 3)}
+    return pipeline, metrics
+# ================================= Pipeline =================================
+
+
+
+
+
+# ================================= Saving Versions =================================
+# Function to save a new version of the pipeline with its metrics next to it
+    # The metrics are written first, so the dashboard never sees a pickle without them
+def save_version(pipeline, metrics, data_path, output_dir=OUTPUT_MODEL_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    version = time.strftime('%Y%m%d-%H%M%S')
+    model_path = os.path.join(output_dir, f'logistic_regression_pipeline_{version}.pkl')
+    metrics_path = os.path.splitext(model_path)[0] + '.json'
+
+    metrics = {'version': version,
+               'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'data': {'path': data_path, 'sha256': file_content_hash(data_path)},
+               'versions': {'python': platform.python_version(), 'sklearn': sklearn.__version__,
+                            'pandas': pd.__version__, 'numpy': np.__version__},
+               **metrics}
+
+    def write_json(temp_path):
+        with open(temp_path, 'w') as metrics_file:
+            json.dump(metrics, metrics_file, indent=2)
+    atomic_write(metrics_path, write_json)
+    atomic_write(model_path, lambda temp_path: joblib.dump(pipeline, temp_path, protocol=pickle.HIGHEST_PROTOCOL))
+    return model_path, metrics_path
+# ================================= Saving Versions =================================
+
+
+
+
+
+# ================================= Command Line =================================
+# Usage: python retrain_model.py --folds 5 --jobs -1
+    # The dashboard loads the new pickle from the models folder within a few seconds, no restart needed
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Retrain the GPA success classifier and save a new version.')
+    parser.add_argument('--data', help='cleaned cohort (Parquet or Excel), default: the cleaning pipeline output')
+    parser.add_argument('--folds', type=int, default=N_SPLITS, help='stratified cross-validation folds')
+    parser.add_argument('--jobs', type=int, default=N_JOBS, help='cores to use (-1 for every core)')
+    parser.add_argument('--output-dir', default=OUTPUT_MODEL_DIR, help='folder to save the new version to')
+    args = parser.parse_args(argv)
+
+    features, target, data_path = read_training_data(args.data)
+    print(f'Training on {len(features)} students from {data_path}')
+    pipeline, metrics = train(features, target, args.folds, args.jobs)
+
+    model_path, metrics_path = save_version(pipeline, metrics, data_path, args.output_dir)
+    print(f"Best parameters: {metrics['best_params']} ({metrics['search_seconds']} s)")
+    for name, values in metrics['cv'].items():
+        print(f"  cv {name:<18} {values['mean']:.4f} +/- {values['std']:.4f}")
+    for name in ['roc_auc', 'f1', 'accuracy']:
+        print(f"  holdout {name:<13} {metrics['holdout'][name]:.4f}")
+    print(f'Saved {model_path} and {metrics_path}')
+
+
+if __name__ == '__main__':
+    main()
+# ================================= Command Line =================================
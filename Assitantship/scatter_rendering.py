@@ -0,0 +1,149 @@
+# ================================= Imports =================================
+# For handling data
+import pandas as pd
+import numpy as np
+
+# For interactive plotting, loaded the first time a scatter plot is drawn
+from lazy_imports import lazy_import
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Scatter Settings =================================
+# Above this many points the scatter is drawn with WebGL (scattergl) instead of SVG markers
+SCATTERGL_THRESHOLD = 5000
+
+# Most points sent to the browser in the downsampled view
+MAX_POINTS = 5000
+
+# Grid used to keep the density of the points when downsampling and for the density view
+GRID_BINS = 100
+
+# Options for the scatter mode dropdown
+scatter_modes = [
+    {'label': 'Auto (downsample large cohorts)', 'value': 'auto'},
+    {'label': 'All Points', 'value': 'points'},
+    {'label': 'Downsampled', 'value': 'downsampled'},
+    {'label': 'Density (binned)', 'value': 'density'}
+]
+# ================================= Scatter Settings =================================
+
+
+
+
+
+# ================================= Downsampling =================================
+# Function to pick at most max_points rows while keeping the shape of the point cloud
+    # Every grid cell keeps the same share of its points (at least one), so dense areas stay dense
+    # and lone outliers are never dropped
+def downsample_positions(x, y, max_points=MAX_POINTS, bins=GRID_BINS, seed=0):
+    if len(x) <= max_points:
+        return np.arange(len(x))
+
+    # Grid cell of every point
+    x_cell = np.clip(((x - x.min()) / (np.ptp(x) or 1) * bins).astype('int64'), 0, bins - 1)
+    y_cell = np.clip(((y - y.min()) / (np.ptp(y) or 1) * bins).astype('int64'), 0, bins - 1)
+    cell = x_cell * bins + y_cell
+
+    # Points to keep in each cell: one from every occupied cell, then the same share of the rest
+    counts = np.bincount(cell, minlength=bins * bins)
+    occupied = np.count_nonzero(counts)
+    share = max(0, max_points - occupied) / max(1, len(x) - occupied)
+    quota = 1 + np.floor((counts - 1) * share).astype('int64')
+
+    # Shuffle, then rank the points inside each cell and keep the first ones up to the quota
+    order = np.lexsort((np.random.default_rng(seed).random(len(x)), cell))
+    sorted_cells = cell[order]
+    first_in_cell = np.searchsorted(sorted_cells, sorted_cells, side='left')
+    rank = np.arange(len(order)) - first_in_cell
+
+    return np.sort(order[rank < quota[sorted_cells]])
+# ================================= Downsampling =================================
+
+
+
+
+
+# ================================= Scatter Figure =================================
+# Function to get the rows with both values present, inside the zoomed ranges if given
+def visible_points(frame, x_var, y_var, x_range=None, y_range=None):
+    points = frame[[x_var, y_var]].apply(pd.to_numeric, errors='coerce').dropna()
+    if x_range:
+        points = points[points[x_var].between(*x_range)]
+    if y_range:
+        points = points[points[y_var].between(*y_range)]
+    return points
+
+# Function to create the scatter plot with its closed-form OLS line
+    # slope and intercept come from the correlation matrix, so no model is fitted here
+def scatter_figure(frame, x_var, y_var, title, slope, intercept, mode='auto', x_range=None, y_range=None):
+    points = visible_points(frame, x_var, y_var, x_range, y_range)
+    # As float64 so small downcast integer columns cannot overflow in the grid math
+    x = points[x_var].to_numpy(dtype='float64')
+    y = points[y_var].to_numpy(dtype='float64')
+
+    if mode == 'density':
+        # Count the points in a grid instead of sending every point
+        fig = px.density_heatmap(points, x=x_var, y=y_var, nbinsx=GRID_BINS, nbinsy=GRID_BINS,
+                                 title=title, color_continuous_scale='Greys')
+    else:
+        # Thin out large cohorts unless every point was asked for
+        if mode in ('auto', 'downsampled'):
+            keep = downsample_positions(x, y)
+            if len(keep) < len(x):
+                title += f' (showing {len(keep)} of {len(x)} points, zoom in for full resolution)'
+            points = points.iloc[keep]
+
+        # WebGL draws large numbers of points much faster than SVG
+        render_mode = 'webgl' if len(points) > SCATTERGL_THRESHOLD else 'svg'
+        fig = px.scatter(points, x=x_var, y=y_var, title=title, render_mode=render_mode)
+
+        # Update scatter points to black
+        fig.update_traces(marker=dict(color='black'))
+
+    # Add the OLS line across the visible x values
+    if len(x) and not np.isnan(slope):
+        line_x = np.array([x.min(), x.max()])
+        fig.add_trace(go.Scatter(x=line_x, y=intercept + slope * line_x, mode='lines', showlegend=False,
+                                 # OLS line in red
+                                 line=dict(color='red'),
+                                 # Configure the hover option to not show anything only show coordinates
+                                     # Extra removes additional information since there was excess information before
+                                 hovertemplate='(%{x}, %{y:.2f})<extra></extra>'))
+
+    # Keep the zoomed view when the zoomed points are drawn again
+    if x_range:
+        fig.update_xaxes(range=list(x_range))
+    if y_range:
+        fig.update_yaxes(range=list(y_range))
+    fig.update_layout(uirevision=f'{x_var}-{y_var}')
+
+    return fig
+
+# Function to read the zoomed ranges from a graph's relayoutData
+    # Returns (x_range, y_range), both None when the zoom was reset, or None if the axes did not change
+def zoom_ranges(relayout_data):
+    if not relayout_data:
+        return None
+    # Double click resets the zoom
+    if relayout_data.get('xaxis.autorange') or relayout_data.get('yaxis.autorange'):
+        return None, None
+
+    x_range = y_range = None
+    if 'xaxis.range[0]' in relayout_data:
+        x_range = (relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]'])
+    elif 'xaxis.range' in relayout_data:
+        x_range = tuple(relayout_data['xaxis.range'])
+    if 'yaxis.range[0]' in relayout_data:
+        y_range = (relayout_data['yaxis.range[0]'], relayout_data['yaxis.range[1]'])
+    elif 'yaxis.range' in relayout_data:
+        y_range = tuple(relayout_data['yaxis.range'])
+
+    if x_range is None and y_range is None:
+        return None
+    return x_range, y_range
+# ================================= Scatter Figure =================================
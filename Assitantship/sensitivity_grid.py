@@ -0,0 +1,60 @@
+# ================================= Imports =================================
+# For handling data
+import pandas as pd
+import numpy as np
+
+# Columns the logistic regression pipeline was trained on
+from batch_prediction import feature_columns
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Sensitivity Settings =================================
+# Values tried for each swept feature (fewer for whole-number features with a small range)
+SWEEP_POINTS = 25
+# ================================= Sensitivity Settings =================================
+
+
+
+
+
+# ================================= What-If Grid =================================
+# Function to get the values a feature is swept over, evenly spaced between its lowest and highest value
+    # Whole-number features (credits, scores) are swept over whole numbers only
+def sweep_values(column, points=SWEEP_POINTS):
+    values = pd.to_numeric(column, errors='coerce').dropna()
+    if values.empty:
+        return np.array([])
+
+    sweep = np.linspace(values.min(), values.max(), points)
+    if np.allclose(values, np.round(values)):
+        sweep = np.unique(np.round(sweep))
+    return sweep
+
+# Function to build one frame with a row for every combination of the swept values
+    # Every other feature keeps the student's value, x changes fastest so the result reshapes to (y, x)
+def build_grid(student, x_feature, x_values, y_feature=None, y_values=None):
+    if y_feature:
+        y_grid, x_grid = np.meshgrid(y_values, x_values, indexing='ij')
+        sweeps = {x_feature: x_grid.ravel(), y_feature: y_grid.ravel()}
+    else:
+        sweeps = {x_feature: np.asarray(x_values)}
+
+    rows = len(next(iter(sweeps.values())))
+    grid = pd.DataFrame({col: np.repeat(np.array([student[col]], dtype=object), rows)
+                         for col in feature_columns if col not in sweeps})
+    for col, values in sweeps.items():
+        grid[col] = values
+    return grid[feature_columns]
+
+# Function to score the whole grid with one predict_proba call
+    # Returns the probability of a GPA of 3.0 or higher, shaped (len(y_values), len(x_values)) for two features
+def grid_probabilities(model, student, x_feature, x_values, y_feature=None, y_values=None):
+    grid = build_grid(student, x_feature, x_values, y_feature, y_values)
+    probabilities = model.predict_proba(grid)[:, list(model.classes_).index(1)]
+    if y_feature:
+        return probabilities.reshape(len(y_values), len(x_values))
+    return probabilities
+# ================================= What-If Grid =================================
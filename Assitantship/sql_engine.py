@@ -0,0 +1,132 @@
+# ================================= Imports =================================
+# For the SQLite fallback, the query timeout and one query at a time per engine
+import time
+import sqlite3
+import threading
+
+# For handling data
+import pandas as pd
+
+# DuckDB queries the frames in place (zero-copy) and runs group-bys vectorized, used when it is installed
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= SQL Settings =================================
+# Rows returned when no limit is given, and the most rows a query can return
+DEFAULT_ROWS = 1000
+MAX_ROWS = 10000
+
+# Queries running longer than this are stopped (seconds)
+QUERY_TIMEOUT_SECONDS = 10
+
+# Statements that can be run, the tables are read only
+query_keywords = ['select', 'with']
+
+# SQLite checks the timeout every this many virtual machine steps
+SQLITE_PROGRESS_STEPS = 10000
+# ================================= SQL Settings =================================
+
+
+
+
+
+# ================================= Query Checks =================================
+# Function to check that a query is a single SELECT (or WITH ... SELECT) and strip the trailing semicolon
+def clean_query(sql):
+    sql = (sql or '').strip().rstrip(';').strip()
+    if not sql:
+        raise ValueError('Enter a query')
+    if ';' in sql:
+        raise ValueError('Run one statement at a time')
+    if sql.split(None, 1)[0].lower() not in query_keywords:
+        raise ValueError('Only SELECT queries can be run')
+    return sql
+
+# Function to get the rows limit to use, between 1 and MAX_ROWS
+def row_limit(limit):
+    return min(max(int(limit or DEFAULT_ROWS), 1), MAX_ROWS)
+
+# Function to make a frame storable in SQLite (categories and Arrow strings become plain text)
+def sqlite_frame(frame):
+    return pd.DataFrame({col: frame[col].astype(object) if frame[col].dtype in ('category', 'string') else frame[col]
+                         for col in frame.columns})
+# ================================= Query Checks =================================
+
+
+
+
+
+# ================================= SQL Engine =================================
+# In-process SQL engine over a cohort's frames, each frame is a table named after it (df, mergedf)
+class SQLEngine:
+    def __init__(self, frames):
+        # One query at a time per connection
+        self.lock = threading.Lock()
+
+        if duckdb is not None:
+            self.engine = 'duckdb'
+            self.conn = duckdb.connect(':memory:')
+            # Views over the frames, the data is not copied
+            for name, frame in frames.items():
+                self.conn.register(name, frame)
+            # Queries cannot read or write files
+            self.conn.execute('SET enable_external_access = false')
+        else:
+            # SQLite copies the frames into an in-memory database once
+            self.engine = 'sqlite'
+            self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+            for name, frame in frames.items():
+                sqlite_frame(frame).to_sql(name, self.conn, index=False)
+            self.conn.execute('PRAGMA query_only = ON')
+
+    # Function to run a query with the duckdb connection, stopped by interrupt() after the timeout
+    def run_duckdb(self, query, timeout):
+        timer = threading.Timer(timeout, self.conn.interrupt)
+        timer.start()
+        try:
+            return self.conn.execute(query).df()
+        except duckdb.InterruptException:
+            raise ValueError(f'The query took longer than {timeout} seconds')
+        except duckdb.Error as error:
+            raise ValueError(str(error))
+        finally:
+            timer.cancel()
+
+    # Function to run a query with the SQLite connection, stopped by the progress handler after the timeout
+    def run_sqlite(self, query, timeout):
+        deadline = time.monotonic() + timeout
+        self.conn.set_progress_handler(lambda: time.monotonic() > deadline, SQLITE_PROGRESS_STEPS)
+        try:
+            return pd.read_sql_query(query, self.conn)
+        except (sqlite3.Error, pd.errors.DatabaseError) as error:
+            if time.monotonic() > deadline:
+                raise ValueError(f'The query took longer than {timeout} seconds')
+            # pandas wraps the SQLite error in a message repeating the query, show the SQLite one
+            raise ValueError(str(error.__cause__ or error))
+        finally:
+            self.conn.set_progress_handler(None, 0)
+
+    # Function to run a SELECT query and get at most limit rows
+        # Returns (result frame, whether more rows matched than were returned, seconds taken)
+    def query(self, sql, limit=DEFAULT_ROWS, timeout=QUERY_TIMEOUT_SECONDS):
+        limit = row_limit(limit)
+        # One extra row tells whether the result was cut off
+        query = f'SELECT * FROM ({clean_query(sql)}) AS query LIMIT {limit + 1}'
+
+        with self.lock:
+            start = time.perf_counter()
+            if self.engine == 'duckdb':
+                result = self.run_duckdb(query, timeout)
+            else:
+                result = self.run_sqlite(query, timeout)
+            seconds = time.perf_counter() - start
+
+        return result.head(limit), len(result) > limit, seconds
+# ================================= SQL Engine =================================
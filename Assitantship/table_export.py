@@ -0,0 +1,64 @@
+# ================================= Imports =================================
+# For the Parquet file written into memory one row group at a time
+import io
+
+# For writing the chunks as Parquet row groups
+import pyarrow as pa
+import pyarrow.parquet as pq
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Export Settings =================================
+# Rows written per chunk, so only one chunk is ever held as text or Arrow data
+EXPORT_CHUNK_ROWS = 50000
+
+# File types the table can be exported to, with their media type
+export_formats = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+# ================================= Export Settings =================================
+
+
+
+
+
+# ================================= Streaming Export =================================
+# Function to yield the matching rows as CSV, one chunk at a time (header only in the first chunk)
+def csv_chunks(frame, positions, chunk_rows=EXPORT_CHUNK_ROWS):
+    # No matching rows still gives a file with the header
+    if len(positions) == 0:
+        yield frame.iloc[:0].to_csv(index=False).encode()
+    for start in range(0, len(positions), chunk_rows):
+        chunk = frame.iloc[positions[start: start + chunk_rows]]
+        yield chunk.to_csv(index=False, header=(start == 0)).encode()
+
+# Function to yield the matching rows as a Parquet file, one row group per chunk
+    # The bytes written for each row group are sent on straight away, the footer comes last
+def parquet_chunks(frame, positions, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Same schema for every chunk (categories stay dictionary columns)
+    schema = pa.Schema.from_pandas(frame.iloc[:0], preserve_index=False)
+    buffer = io.BytesIO()
+
+    # Function to take the bytes written so far out of the buffer
+    def written():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    with pq.ParquetWriter(buffer, schema) as writer:
+        for start in range(0, len(positions), chunk_rows):
+            chunk = frame.iloc[positions[start: start + chunk_rows]]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield written()
+    yield written()
+
+# Function to get the chunks of an export in the requested format
+def export_chunks(frame, positions, export_format, chunk_rows=EXPORT_CHUNK_ROWS):
+    if export_format not in export_formats:
+        raise ValueError(f"Export as one of: {', '.join(export_formats)}")
+    if export_format == 'parquet':
+        return parquet_chunks(frame, positions, chunk_rows)
+    return csv_chunks(frame, positions, chunk_rows)
+# ================================= Streaming Export =================================
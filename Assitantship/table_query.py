@@ -0,0 +1,145 @@
+# ================================= Imports =================================
+# For handling data
+import pandas as pd
+import numpy as np
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Filter Query Parsing =================================
+# Operators the DataTable writes into filter_query
+operators = [['ge ', '>='],
+             ['le ', '<='],
+             ['lt ', '<'],
+             ['gt ', '>'],
+             ['ne ', '!='],
+             ['eq ', '='],
+             ['contains '],
+             ['datestartswith ']]
+
+# Every spelling of each operator ('ge ', '>=' and 's>='), the longest first so '>=' is not read as '>'
+operator_spellings = sorted([(spelling, operator_type[0].strip())
+                             for operator_type in operators
+                             for spelling in operator_type[:1] + [prefix + symbol for symbol in operator_type[1:]
+                                                                  for prefix in ('s', '')]],
+                            key=lambda spelling: len(spelling[0]), reverse=True)
+
+# Function to split one part of the filter query into column name, operator and value
+def split_filter_part(filter_part):
+    # e.g. '{AGE} s>= 18' becomes ('AGE', 'ge', 18.0)
+    # The operator is only read right after the column name, so a value holding 'ge ' or '<' is left alone
+    filter_part = filter_part.strip()
+    close = filter_part.find('}')
+    if not filter_part.startswith('{') or close < 0:
+        return [None] * 3
+    name = filter_part[1: close]
+    rest = filter_part[close + 1:].lstrip()
+
+    for spelling, operator in operator_spellings:
+        if rest.startswith(spelling):
+            value_part = rest[len(spelling):].strip()
+            v0 = value_part[0] if value_part else ''
+
+            # Quoted values are always text, remove the quotes and any escaped quotes inside
+            if len(value_part) > 1 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+                value = value_part[1: -1].replace('\\' + v0, v0)
+            else:
+                # Unquoted values are numbers when they can be
+                try:
+                    value = float(value_part)
+                except ValueError:
+                    value = value_part
+
+            # Return the short operator name (e.g. 'ge') so every spelling is handled the same
+            return name, operator, value
+
+    return [None] * 3
+
+# Function to get the values of a column in a form that can be compared to the filter value
+def comparable_values(column, value):
+    # Object columns hold numbers next to 'NULL', compare them as numbers when the filter is a number
+    if isinstance(value, float) and not pd.api.types.is_numeric_dtype(column):
+        return pd.to_numeric(column, errors='coerce')
+    # Category columns are unordered, compare their text so '<' and '>' work like on the text columns
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.astype(object)
+    return column
+
+# Function to get a True/False mask of the rows that match one part of the filter query
+def filter_part_mask(frame, filter_part):
+    col_name, operator, filter_value = split_filter_part(filter_part)
+
+    # Ignore parts that cannot be read or refer to columns that do not exist
+    if col_name not in frame.columns:
+        return None
+
+    column = frame[col_name]
+    if operator in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
+        values = comparable_values(column, filter_value)
+        # Same comparison methods as pandas, e.g. column.ge(18)
+        try:
+            return getattr(values, operator)(filter_value).fillna(False)
+        # Text compared against a number column (e.g. '{AGE} > abc') matches nothing
+        except TypeError:
+            return pd.Series(False, index=frame.index)
+    if operator == 'contains':
+        return column.astype(str).str.contains(str(filter_value), regex=False)
+    if operator == 'datestartswith':
+        return column.astype(str).str.startswith(str(filter_value))
+    return None
+# ================================= Filter Query Parsing =================================
+
+
+
+
+
+# ================================= Filter, Sort and Page =================================
+# Function to get the row positions that match the filter query, in the requested sort order
+def filter_and_sort_positions(frame, filter_query='', sort_by=()):
+    # Start with every row
+    mask = np.ones(len(frame), dtype=bool)
+
+    # Combine each part of the filter query with AND, the same way the DataTable does
+    for filter_part in (filter_query or '').split(' && '):
+        if filter_part.strip():
+            part_mask = filter_part_mask(frame, filter_part)
+            if part_mask is not None:
+                mask &= part_mask.to_numpy(dtype=bool)
+
+    positions = np.flatnonzero(mask)
+
+    # Sort only the matching rows
+    sort_by = [sort for sort in sort_by if sort['column_id'] in frame.columns]
+    if sort_by and len(positions):
+        matching = frame.iloc[positions]
+        order = matching.reset_index(drop=True).sort_values(
+            [sort['column_id'] for sort in sort_by],
+            ascending=[sort['direction'] == 'asc' for sort in sort_by],
+            # Stable sort so rows with the same value keep their original order
+            kind='mergesort',
+            key=sort_key).index.to_numpy()
+        positions = positions[order]
+
+    return positions
+
+# Function to make object columns sortable when they mix numbers and 'NULL'
+def sort_key(column):
+    if column.dtype == 'object':
+        numeric = pd.to_numeric(column, errors='coerce')
+        # Sort as numbers if the column holds numbers, 'NULL' rows go last
+        if numeric.notna().any():
+            return numeric
+        return column.astype(str)
+    return column
+
+# Function to get the records of one page of the table
+def page_records(frame, positions, page_current, page_size):
+    start = page_current * page_size
+    return frame.iloc[positions[start: start + page_size]].to_dict('records')
+
+# Function to get the number of pages for the matching rows (at least 1 so the table still shows)
+def page_count(positions, page_size):
+    return max(1, int(np.ceil(len(positions) / page_size)))
+# ================================= Filter, Sort and Page =================================
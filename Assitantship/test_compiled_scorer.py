@@ -0,0 +1,79 @@
+# ================================= Imports =================================
+# For copying the pipeline and building the test cohort once
+import copy
+from functools import lru_cache
+
+# For handling data
+import numpy as np
+import pytest
+
+# Pipeline the dashboard scores with, and the scorer compiled from it
+from model_registry import ModelRegistry
+from compiled_scorer import CompiledScorer, compile_pipeline
+from batch_prediction import feature_columns
+from benchmarks import synthetic_cohort
+# ================================= Imports =================================
+
+
+
+
+
+# ================================= Test Data =================================
+# Function to get the students the scorer is checked on, synthetic cohorts so the test runs on any machine
+@lru_cache(maxsize=1)
+def sample_frames():
+    return {f'seed-{seed}': synthetic_cohort(2000, seed)[1][feature_columns] for seed in (0, 1)}
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return ModelRegistry().get()
+
+# Function to give the first student of a frame a major the encoder has never seen
+def with_unknown_major(frame):
+    frame = frame.copy()
+    frame['Major_x'] = frame['Major_x'].astype(object)
+    frame.loc[0, 'Major_x'] = 'Not A Major'
+    return frame
+# ================================= Test Data =================================
+
+
+
+
+
+# ================================= Parity Tests =================================
+# The scorer gives the pipeline's probabilities for a frame and for one student at a time
+@pytest.mark.parametrize('name', list(sample_frames()))
+def test_predict_proba_matches_pipeline(pipeline, name):
+    frame = sample_frames()[name]
+    scorer = CompiledScorer(compile_pipeline(pipeline))
+    expected = pipeline.predict_proba(frame)
+
+    assert np.allclose(scorer.predict_proba(frame), expected, rtol=0, atol=1e-9)
+    one = np.array([scorer.predict_proba_one(student) for student in frame.to_dict('records')])
+    assert np.allclose(one, expected, rtol=0, atol=1e-9)
+
+# An unknown category is an error for both, as the encoder was fitted with handle_unknown='error'
+def test_unknown_category_raises_like_pipeline(pipeline):
+    frame = with_unknown_major(sample_frames()['seed-0'].head(20))
+    scorer = CompiledScorer(compile_pipeline(pipeline))
+
+    with pytest.raises(ValueError):
+        pipeline.predict_proba(frame)
+    with pytest.raises(ValueError):
+        scorer.predict_proba(frame)
+    with pytest.raises(ValueError):
+        scorer.predict_proba_one(frame.to_dict('records')[0])
+
+# An unknown category adds nothing for both when the encoder ignores unknown categories
+def test_unknown_category_ignored_like_pipeline(pipeline):
+    pipeline = copy.deepcopy(pipeline)
+    encoder = pipeline.steps[0][1].named_transformers_['cat']
+    encoder.handle_unknown = 'ignore'
+    frame = with_unknown_major(sample_frames()['seed-0'].head(20))
+    scorer = CompiledScorer(compile_pipeline(pipeline))
+    expected = pipeline.predict_proba(frame)
+
+    assert np.allclose(scorer.predict_proba(frame), expected, rtol=0, atol=1e-9)
+    one = np.array([scorer.predict_proba_one(student) for student in frame.to_dict('records')])
+    assert np.allclose(one, expected, rtol=0, atol=1e-9)
+# ================================= Parity Tests =================================